@@ -0,0 +1,172 @@
+# vciso-backend/app/api/dependencies.py
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from fastapi import Depends, HTTPException, Request
+from app.core.health_monitor import HealthMonitor
+from app.core.http_client import get_openai_client
+from app.core.tokenizer import get_encoding
+from app.core.vector_db import VectorDBService
+from app.services.gap_analyzer import GapAnalyzer
+from app.services.plan_generator import PlanGeneratorService
+
+# dependencies.py - Application services, built lazily and owned by the app
+# The endpoint modules used to build PlanGeneratorService and GapAnalyzer at import.
+# GapAnalyzer's VectorDBService listed (and could create) Pinecone indexes, so the
+# app could not even be imported without the network, and every worker paid for it
+# before serving.
+
+# How the code works:
+# 1. ServiceContainer builds each service on first use. The lifespan handler in
+#    main.py creates one container per app (app.state.services) and starts warm_up.
+#    Construction happens under a lock: the sync dependencies run in FastAPI's
+#    threadpool and warm-up connects from a worker thread, so concurrent first uses
+#    would otherwise each build their own service (and OpenAI/Pinecone clients).
+# 2. Endpoints receive services through FastAPI dependencies (get_plan_service,
+#    get_gap_analyzer, get_health_monitor); tests can swap them with
+#    app.dependency_overrides. A service that cannot be configured (e.g. no
+#    OPENAI_API_KEY) answers 503 instead of an unhandled 500.
+# 3. warm_up runs its checks concurrently in the background: connecting to the
+#    vector index (describe stats), loading the tokenizer and building the plan
+#    service. Requests are served meanwhile; a request that needs a service first
+#    simply builds or connects it.
+# 4. readiness() reports each check (pending, ok, failed) for /health/ready, while
+#    /health/live only says the process is up.
+# 5. health_monitor (app/core/health_monitor.py) probes the vector DB and OpenAI in
+#    the background for the gap-analysis health endpoint; the lifespan starts it.
+#    The container owns the vector DB client and hands it to the gap analyzer, so
+#    the monitor and warm-up never build services that need an OpenAI API key.
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+OK = "ok"
+FAILED = "failed"
+
+
+class ServiceContainer:
+    """The app's services, each built on first use"""
+
+    def __init__(self):
+        self._plan_service: Optional[PlanGeneratorService] = None
+        self._gap_analyzer: Optional[GapAnalyzer] = None
+        self._vector_db: Optional[VectorDBService] = None
+        self._health_monitor: Optional[HealthMonitor] = None
+        self.checks: Dict[str, Dict[str, Any]] = {}
+        self._warm_up_task: Optional[asyncio.Task] = None
+        # Reentrant: the gap analyzer and health monitor build the vector DB client
+        self._lock = threading.RLock()
+
+    @property
+    def plan_service(self) -> PlanGeneratorService:
+        if self._plan_service is None:
+            with self._lock:
+                if self._plan_service is None:
+                    self._plan_service = PlanGeneratorService()
+        return self._plan_service
+
+    @property
+    def gap_analyzer(self) -> GapAnalyzer:
+        if self._gap_analyzer is None:
+            with self._lock:
+                if self._gap_analyzer is None:
+                    self._gap_analyzer = GapAnalyzer(self.vector_db)
+        return self._gap_analyzer
+
+    @property
+    def vector_db(self) -> VectorDBService:
+        """The vector DB client shared with the gap analyzer (one connection setup for the app)"""
+        if self._vector_db is None:
+            with self._lock:
+                if self._vector_db is None:
+                    self._vector_db = VectorDBService()
+        return self._vector_db
+
+    @property
+    def health_monitor(self) -> HealthMonitor:
+        if self._health_monitor is None:
+            with self._lock:
+                if self._health_monitor is None:
+                    self._health_monitor = HealthMonitor(self.vector_db, get_openai_client)
+        return self._health_monitor
+
+    def start_warm_up(self) -> asyncio.Task:
+        """Run warm_up in the background (once)"""
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.ensure_future(self.warm_up())
+        return self._warm_up_task
+
+    async def warm_up(self):
+        """Run every warm-up check concurrently; failures are recorded, not raised"""
+        checks: Dict[str, Callable[[], Awaitable[Any]]] = {
+            "vector_db": lambda: asyncio.to_thread(self.vector_db.connect),
+            "tokenizer": lambda: asyncio.to_thread(get_encoding),
+            "plan_service": self._build_plan_service,
+        }
+        for name in checks:
+            self.checks[name] = {"status": PENDING}
+        await asyncio.gather(*(self._run_check(name, check) for name, check in checks.items()))
+
+    async def _build_plan_service(self):
+        return self.plan_service
+
+    async def _run_check(self, name: str, check: Callable[[], Awaitable[Any]]):
+        started = time.perf_counter()
+        try:
+            await check()
+        except Exception as e:
+            logger.warning(f"Warm-up check {name} failed: {e}")
+            self.checks[name] = {"status": FAILED, "error": str(e)}
+        else:
+            self.checks[name] = {"status": OK}
+        self.checks[name]["seconds"] = round(time.perf_counter() - started, 3)
+
+    def readiness(self) -> Dict[str, Any]:
+        """{"ready": bool, "checks": {...}}: ready once every warm-up check passed"""
+        ready = bool(self.checks) and all(check["status"] == OK for check in self.checks.values())
+        return {"ready": ready, "checks": dict(self.checks)}
+
+    async def close(self):
+        """Stop the health monitor and a warm-up still in progress"""
+        if self._health_monitor is not None:
+            await self._health_monitor.stop()
+        if self._warm_up_task is not None and not self._warm_up_task.done():
+            self._warm_up_task.cancel()
+            try:
+                await self._warm_up_task
+            except asyncio.CancelledError:
+                pass
+
+
+def get_services(request: Request) -> ServiceContainer:
+    """The app's ServiceContainer (created here when the lifespan handler did not run)"""
+    services = getattr(request.app.state, "services", None)
+    if services is None:
+        services = request.app.state.services = ServiceContainer()
+    return services
+
+
+def _unavailable(name: str, error: ValueError) -> HTTPException:
+    """A 503 for a service whose configuration is missing (the details stay in the log)"""
+    logger.error(f"{name} is not configured: {error}")
+    return HTTPException(status_code=503, detail=f"{name} is not configured")
+
+
+def get_plan_service(services: ServiceContainer = Depends(get_services)) -> PlanGeneratorService:
+    try:
+        return services.plan_service
+    except ValueError as e:
+        raise _unavailable("Plan generation", e)
+
+
+def get_gap_analyzer(services: ServiceContainer = Depends(get_services)) -> GapAnalyzer:
+    try:
+        return services.gap_analyzer
+    except ValueError as e:
+        raise _unavailable("Gap analysis", e)
+
+
+def get_health_monitor(services: ServiceContainer = Depends(get_services)) -> HealthMonitor:
+    return services.health_monitor
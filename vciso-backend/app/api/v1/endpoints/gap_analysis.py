@@ -1,16 +1,17 @@
 # vciso-backend/app/api/v1/endpoints/gap_analysis.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from app.schemas.gap_schema import GapAnalysisRequest, GapAnalysisResponse
+from app.api.dependencies import get_gap_analyzer, get_health_monitor
+from app.core.health_monitor import HEALTHY, HealthMonitor
 from app.services.gap_analyzer import GapAnalyzer
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-gap_analyzer = GapAnalyzer()
 
 @router.post("/analyze", response_model=GapAnalysisResponse)
-async def analyze_plan(request: GapAnalysisRequest):
+async def analyze_plan(request: GapAnalysisRequest, gap_analyzer: GapAnalyzer = Depends(get_gap_analyzer)):
     """
     Analyze an IR plan and identify gaps against frameworks
     
@@ -58,22 +59,17 @@ async def analyze_plan(request: GapAnalysisRequest):
         )
 
 @router.get("/health")
-async def health_check():
-    """Health check for gap analysis service"""
-    try:
-        # Test vector DB connectivity
-        from app.core.vector_db import VectorDBService
-        vector_db = VectorDBService()
-        stats = vector_db.index.describe_index_stats()
-        
-        return {
-            "status": "healthy",
-            "vector_db_status": "connected",
-            "total_vectors": stats.total_vector_count
-        }
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        raise HTTPException(
-            status_code=503,
-            detail="Gap analysis service unhealthy"
-        )
\ No newline at end of file
+async def health_check(response: Response, monitor: HealthMonitor = Depends(get_health_monitor)):
+    """Health of the gap analysis dependencies, from the background health monitor
+
+    Returns the last snapshot (vector DB, OpenAI reachability, vector count) and its
+    age without contacting any dependency; 503 unless the last refresh was healthy.
+    """
+    snapshot = monitor.snapshot()
+    vector_db = snapshot.checks.get("vector_db", {})
+    if snapshot.status != HEALTHY:
+        response.status_code = 503
+    return {
+        **snapshot.to_dict(),
+        "vector_db_status": "connected" if vector_db.get("status") == "ok" else "unavailable",
+    }
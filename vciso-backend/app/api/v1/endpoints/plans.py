@@ -1,7 +1,10 @@
 # /app/api/v1/endpoints/plans.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from app.schemas.plan_schema import OnboardingRequest, PlanResponse
+from app.api.dependencies import get_plan_service
 from app.services.plan_generator import PlanGeneratorService
+import json
 import logging
 
 # plans.py - API endpoint for generating IR plans
@@ -12,30 +15,44 @@ import logging
 # Endpoint to generate IR plan
 # POST /generate
 # Request Body: OnboardingRequest
+# Query: use_cache (default true) - set false to bypass the plan cache
 # Response Body: PlanResponse
 # Errors: 400 (Validation Error), 500 (Internal Server Error)
 
+# Endpoint to stream an IR plan as it is generated
+# POST /generate/stream
+# Request Body: OnboardingRequest
+# Response Body: text/event-stream with "delta", "done" and "error" events
+# Errors: 400 (Validation Error or rejected by the guardrails, before streaming starts)
+
+# Endpoint to report plan cache effectiveness
+# GET /cache/stats
+# Response Body: hit rates of the exact and semantic plan caches, LLM time saved
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-plan_service = PlanGeneratorService()
 
 # How the code works:
 # 1. The endpoint accepts a POST request with onboarding data.
 # 2. It converts the request data into the OnboardingData model.
-# 3. It calls the PlanGeneratorService to generate the IR plan.
+# 3. It calls the PlanGeneratorService (injected by get_plan_service, built on first use) to generate the IR plan.
 # 4. It returns the generated plan in the response.
 # 5. It handles validation errors and other exceptions, logging them appropriately.
 
 @router.post("/generate", response_model=PlanResponse)
-async def generate_plan(request: OnboardingRequest):
+async def generate_plan(
+    request: OnboardingRequest,
+    use_cache: bool = True,
+    plan_service: PlanGeneratorService = Depends(get_plan_service)
+):
     """Generate IR plan from onboarding data"""
     try:
         # Convert request schema to OnboardingData model
         onboarding_data = request.to_onboarding_data()
         
         # Generate plan
-        plan = await plan_service.generate(onboarding_data)
+        plan = await plan_service.generate(onboarding_data, use_cache=use_cache)
         
         return PlanResponse(
             success=True,
@@ -47,4 +64,62 @@ async def generate_plan(request: OnboardingRequest):
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating plan: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to generate plan: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to generate plan: {str(e)}")
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Event (data is JSON so Markdown newlines survive)"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/generate/stream")
+async def generate_plan_stream(
+    request: OnboardingRequest,
+    use_cache: bool = True,
+    plan_service: PlanGeneratorService = Depends(get_plan_service)
+):
+    """Stream IR plan Markdown over Server-Sent Events
+
+    Events:
+    - delta: {"text": "..."}  redacted Markdown, in order
+    - done:  {"metadata": {...}, "usage": {...}, "validation": {...}}
+    - error: {"detail": "..."}  generation failed mid-stream
+
+    The guardrails run before the response starts, so a rejected request is a 400
+    like on /generate rather than an error event.
+    """
+    try:
+        onboarding_data = request.to_onboarding_data()
+        validated_prompt = await plan_service.validate_request(onboarding_data)
+    except ValueError as e:
+        logger.error(f"Validation error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error validating plan request: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to generate plan: {str(e)}")
+
+    async def event_stream():
+        try:
+            async for event, data in plan_service.generate_stream(
+                onboarding_data, use_cache=use_cache, validated_prompt=validated_prompt
+            ):
+                yield _sse_event(event, data)
+        except Exception as e:
+            # Internal error text (URLs, keys, stack details) stays in the server log
+            logger.error(f"Error streaming plan: {e}", exc_info=True)
+            yield _sse_event("error", {"detail": "Failed to generate plan"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx)
+        },
+    )
+
+
+@router.get("/cache/stats")
+async def plan_cache_stats(plan_service: PlanGeneratorService = Depends(get_plan_service)):
+    """Plan cache hit rates and latency saved by semantic reuse"""
+    return plan_service.cache_stats()
@@ -1,6 +1,7 @@
 # vciso-backend/app/config.py
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
+import json
 import os
 from dotenv import load_dotenv
 
@@ -29,11 +30,82 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o")
     OPENAI_MAX_TOKENS: int = int(os.getenv("OPENAI_MAX_TOKENS", "4000"))
     OPENAI_TEMPERATURE: float = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")  # API base URL override, e.g. the stand-in server (empty = OpenAI)
+
+    # Model Routing (task profiles; see app/core/task_profiles.py)
+    OPENAI_PLAN_MODEL: str = os.getenv("OPENAI_PLAN_MODEL", os.getenv("OPENAI_MODEL", "gpt-4o"))  # Full plan generation
+    OPENAI_PLAN_MAX_TOKENS: int = int(os.getenv("OPENAI_PLAN_MAX_TOKENS", os.getenv("OPENAI_MAX_TOKENS", "4000")))
+    OPENAI_PLAN_TEMPERATURE: float = float(os.getenv("OPENAI_PLAN_TEMPERATURE", os.getenv("OPENAI_TEMPERATURE", "0.7")))
+    OPENAI_PLAN_INPUT_TOKENS: int = int(os.getenv("OPENAI_PLAN_INPUT_TOKENS", "8000"))  # Prompt budget (system + user) in tokens
+    OPENAI_PLAN_SECTION_MODEL: str = os.getenv("OPENAI_PLAN_SECTION_MODEL", os.getenv("OPENAI_MODEL", "gpt-4o"))  # One plan section (parallel generation)
+    OPENAI_PLAN_SECTION_MAX_TOKENS: int = int(os.getenv("OPENAI_PLAN_SECTION_MAX_TOKENS", "1000"))
+    OPENAI_PLAN_SECTION_TEMPERATURE: float = float(os.getenv("OPENAI_PLAN_SECTION_TEMPERATURE", os.getenv("OPENAI_TEMPERATURE", "0.7")))
+    OPENAI_PLAN_SECTION_INPUT_TOKENS: int = int(os.getenv("OPENAI_PLAN_SECTION_INPUT_TOKENS", "8000"))
+    OPENAI_GAP_SECTION_MODEL: str = os.getenv("OPENAI_GAP_SECTION_MODEL", "gpt-4o-mini")  # Gap JSON for one plan section
+    OPENAI_GAP_SECTION_MAX_TOKENS: int = int(os.getenv("OPENAI_GAP_SECTION_MAX_TOKENS", "1500"))
+    OPENAI_GAP_SECTION_TEMPERATURE: float = float(os.getenv("OPENAI_GAP_SECTION_TEMPERATURE", "0.3"))
+    OPENAI_GAP_SECTION_INPUT_TOKENS: int = int(os.getenv("OPENAI_GAP_SECTION_INPUT_TOKENS", "12000"))
+    OPENAI_CLASSIFY_MODEL: str = os.getenv("OPENAI_CLASSIFY_MODEL", "gpt-4o-mini")  # VALID/INVALID request screening
+    OPENAI_CLASSIFY_MAX_TOKENS: int = int(os.getenv("OPENAI_CLASSIFY_MAX_TOKENS", "5"))
+    OPENAI_CLASSIFY_TEMPERATURE: float = float(os.getenv("OPENAI_CLASSIFY_TEMPERATURE", "0"))
+    OPENAI_CLASSIFY_INPUT_TOKENS: int = int(os.getenv("OPENAI_CLASSIFY_INPUT_TOKENS", "2000"))
+    OPENAI_SUMMARIZE_MODEL: str = os.getenv("OPENAI_SUMMARIZE_MODEL", "gpt-4o-mini")  # Short summaries
+    OPENAI_SUMMARIZE_MAX_TOKENS: int = int(os.getenv("OPENAI_SUMMARIZE_MAX_TOKENS", "800"))
+    OPENAI_SUMMARIZE_TEMPERATURE: float = float(os.getenv("OPENAI_SUMMARIZE_TEMPERATURE", "0.3"))
+    OPENAI_SUMMARIZE_INPUT_TOKENS: int = int(os.getenv("OPENAI_SUMMARIZE_INPUT_TOKENS", "8000"))
+    OPENAI_ESCALATION_MODEL: str = os.getenv("OPENAI_ESCALATION_MODEL", os.getenv("OPENAI_MODEL", "gpt-4o"))  # Retry model when output fails validation (empty = no retry)
+    MIN_COMPLETION_TOKENS: int = int(os.getenv("MIN_COMPLETION_TOKENS", "256"))  # Context window left for the answer, or the call is refused
+    PLAN_SECTION_OUTPUT_TOKENS: int = int(os.getenv("PLAN_SECTION_OUTPUT_TOKENS", "450"))  # Expected output per plan section; sets max_tokens of plan calls
+
+    # Outbound HTTP Connection Pool (shared by all OpenAI clients)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))  # Open connections across all requests
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))  # Idle connections kept for reuse
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))  # Seconds an idle connection is kept
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # Seconds to establish a connection
+    HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", "120"))  # Seconds between bytes (long plans stream slowly)
+    HTTP_WRITE_TIMEOUT: float = float(os.getenv("HTTP_WRITE_TIMEOUT", "30"))  # Seconds to send a request
+    HTTP_POOL_TIMEOUT: float = float(os.getenv("HTTP_POOL_TIMEOUT", "10"))  # Seconds to wait for a free connection
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "true").lower() == "true"  # Used when the h2 package is installed
+
+    # OpenAI Rate Limits (per model, 0 = unlimited; shared by all clients in the process)
+    # Each model has its own quota; set the account tier's limits per model, e.g.
+    # {"gpt-4o": {"rpm": 500, "tpm": 30000}, "gpt-4o-mini": {"rpm": 500, "tpm": 200000}}
+    OPENAI_MODEL_RATE_LIMITS: Dict[str, Dict[str, int]] = json.loads(os.getenv("OPENAI_MODEL_RATE_LIMITS", "{}"))
+    OPENAI_RPM_LIMIT: int = int(os.getenv("OPENAI_RPM_LIMIT", "0"))  # Chat requests per minute, for models not listed above
+    OPENAI_TPM_LIMIT: int = int(os.getenv("OPENAI_TPM_LIMIT", "0"))  # Chat tokens per minute (prompt + max_tokens), likewise
+    EMBEDDING_RPM_LIMIT: int = int(os.getenv("EMBEDDING_RPM_LIMIT", "3000"))  # Embedding requests per minute
+    EMBEDDING_TPM_LIMIT: int = int(os.getenv("EMBEDDING_TPM_LIMIT", "1000000"))  # Embedding tokens per minute
+    OPENAI_RATE_LIMIT_HEADROOM: float = float(os.getenv("OPENAI_RATE_LIMIT_HEADROOM", "0.9"))  # Fraction of the quota to use
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "5"))  # Retries on 429, 5xx and connection errors
+
+    # Pricing (USD per 1M tokens), merged over app/core/pricing.py defaults
+    MODEL_PRICING: Dict[str, Dict[str, float]] = json.loads(os.getenv("MODEL_PRICING", "{}"))
+
+    # Hedged Requests (enabled per call site)
+    OPENAI_HEDGE_PERCENTILE: float = float(os.getenv("OPENAI_HEDGE_PERCENTILE", "95"))  # Send a duplicate after this latency percentile
+    OPENAI_HEDGE_MIN_SAMPLES: int = int(os.getenv("OPENAI_HEDGE_MIN_SAMPLES", "20"))  # Latencies needed before the percentile is trusted
+    OPENAI_HEDGE_DELAY_SECONDS: float = float(os.getenv("OPENAI_HEDGE_DELAY_SECONDS", "20"))  # Hedge delay until then
+
+    # Plan Cache Settings
+    PLAN_CACHE_ENABLED: bool = os.getenv("PLAN_CACHE_ENABLED", "true").lower() == "true"
+    PLAN_CACHE_MAX_ENTRIES: int = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "256"))  # Plans kept in memory (LRU)
+    PLAN_CACHE_TTL_SECONDS: int = int(os.getenv("PLAN_CACHE_TTL_SECONDS", "3600"))  # Seconds before a cached plan expires
+    PLAN_SEMANTIC_CACHE_ENABLED: bool = os.getenv("PLAN_SEMANTIC_CACHE_ENABLED", "false").lower() == "true"  # Reuse plans of similar profiles
+    PLAN_SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("PLAN_SEMANTIC_CACHE_THRESHOLD", "0.95"))  # Min cosine similarity of profile fingerprints
+    PLAN_LOCAL_SECTIONS: bool = os.getenv("PLAN_LOCAL_SECTIONS", "true").lower() == "true"  # Render team and appendices from onboarding data
+    PLAN_PARALLEL_SECTIONS: bool = os.getenv("PLAN_PARALLEL_SECTIONS", "false").lower() == "true"  # Generate sections as concurrent LLM calls
+    GUARDRAIL_ESCALATION_MARGIN: float = float(os.getenv("GUARDRAIL_ESCALATION_MARGIN", "0.05"))  # Local classifier margins below this ask the classify model
+    ENTITY_REDACTOR_CACHE_SIZE: int = int(os.getenv("ENTITY_REDACTOR_CACHE_SIZE", "64"))  # Tenant name dictionaries kept compiled (LRU)
+
+    # Health Monitor
+    HEALTH_CHECK_INTERVAL_SECONDS: float = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "30"))  # Seconds between dependency probes
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "5"))  # Per-probe timeout
 
     # Vector Database Settings
     PINECONE_API_KEY: str = os.getenv("PINECONE_API_KEY", "")
     PINECONE_ENVIRONMENT: str = os.getenv("PINECONE_ENVIRONMENT", "us-west1-gcp-free")
     PINECONE_INDEX_NAME: str = os.getenv("PINECONE_INDEX_NAME", "vciso-frameworks")
+    PINECONE_HOST: str = os.getenv("PINECONE_HOST", "")  # Control plane URL override, e.g. the stand-in server (empty = Pinecone)
     
     # Embedding Settings
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
@@ -42,6 +114,24 @@ class Settings(BaseSettings):
     # RAG Settings
     RAG_TOP_K: int = int(os.getenv("RAG_TOP_K", "5"))  # Top K chunks to retrieve
     RAG_SIMILARITY_THRESHOLD: float = float(os.getenv("RAG_SIMILARITY_THRESHOLD", "0.7"))
+
+    # Indexing Settings
+    INDEXER_MAX_WORKERS: int = int(os.getenv("INDEXER_MAX_WORKERS", "0"))  # 0 = one worker per CPU core
+    INDEXER_PAGES_PER_TASK: int = int(os.getenv("INDEXER_PAGES_PER_TASK", "10"))  # Pages parsed per worker task
+    INDEXER_CHUNK_TOKENS: int = int(os.getenv("INDEXER_CHUNK_TOKENS", "400"))  # Max tokens per chunk
+    INDEXER_CHUNK_OVERLAP_TOKENS: int = int(os.getenv("INDEXER_CHUNK_OVERLAP_TOKENS", "50"))  # Overlap within a section
+    INDEXER_DEDUP_THRESHOLD: float = float(os.getenv("INDEXER_DEDUP_THRESHOLD", "0.85"))  # Jaccard similarity for near-duplicates (0 = off)
+    INDEXER_DEDUP_NUM_PERM: int = int(os.getenv("INDEXER_DEDUP_NUM_PERM", "128"))  # MinHash signature size
+    INDEXER_QUEUE_SIZE: int = int(os.getenv("INDEXER_QUEUE_SIZE", "8"))  # Max batches buffered between stages
+    INDEXER_EMBED_BATCH_SIZE: int = int(os.getenv("INDEXER_EMBED_BATCH_SIZE", "100"))  # Texts per embeddings request
+    INDEXER_EMBED_CONCURRENCY: int = int(os.getenv("INDEXER_EMBED_CONCURRENCY", "4"))  # Concurrent embeddings requests
+    INDEXER_MANIFEST_PATH: str = os.getenv("INDEXER_MANIFEST_PATH", "app/data/index_manifest.json")  # Hashes from the last indexing run
+
+    # Vector Upsert Settings
+    VECTOR_UPSERT_MAX_BYTES: int = int(os.getenv("VECTOR_UPSERT_MAX_BYTES", "1800000"))  # Stay under the 2MB request limit
+    VECTOR_UPSERT_MAX_BATCH: int = int(os.getenv("VECTOR_UPSERT_MAX_BATCH", "100"))  # Max vectors per upsert request
+    VECTOR_UPSERT_CONCURRENCY: int = int(os.getenv("VECTOR_UPSERT_CONCURRENCY", "4"))  # Concurrent upsert requests
+    VECTOR_DELETE_MAX_BATCH: int = int(os.getenv("VECTOR_DELETE_MAX_BATCH", "1000"))  # Max IDs per delete request
     
     # Pydantic Configuration
     class Config:
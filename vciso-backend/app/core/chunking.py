@@ -0,0 +1,218 @@
+# vciso-backend/app/core/chunking.py
+import re
+from bisect import bisect_right
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+from app.core.tokenizer import DEFAULT_ENCODING, get_encoding
+
+# chunking.py - Structure-aware, token-sized document chunker
+# Framework PDFs are chunked as one continuous document rather than page by page,
+# so sentences and sections that cross a page break stay together.
+
+# How the code works:
+# 1. Running headers and footers (lines repeated on most pages) are dropped.
+# 2. The remaining page texts are joined, remembering where each page starts.
+# 3. Lines like "3.2.4 Containment" or "Appendix A—Scenarios" become section headings.
+# 4. Body text is split into sentences, and sentences are packed into chunks of
+#    at most max_tokens tokens. A new section starts a new chunk unless the
+#    current chunk is still tiny, and chunks inside a section overlap slightly.
+# 5. Each chunk records its section and the pages it spans.
+
+HEADING_PATTERN = re.compile(
+    r"^(?:"
+    r"\d{1,2}(?:\.\d{1,2})*\.?"  # 3 / 3. / 3.2.4
+    r"|Appendix [A-Z]\.?[\s—–-]*"  # Appendix A—
+    r")\s*[A-Z][^\n]{1,80}$"
+)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+DOT_LEADER = re.compile(r"\.{4,}|(?:\. ){4,}")
+
+
+def is_heading(line: str) -> bool:
+    """Check whether a line looks like a numbered section or appendix heading"""
+    line = line.strip()
+    if not HEADING_PATTERN.match(line) or DOT_LEADER.search(line):
+        return False
+    # Headings are short titles, not sentences
+    return len(line.split()) <= 12 and not line.endswith((".", ",", ";", ":", "?"))
+
+
+class StructuredChunker:
+    """Split a multi-page document into section-aware, token-sized chunks"""
+
+    def __init__(
+        self,
+        max_tokens: int = 400,
+        overlap_tokens: int = 50,
+        min_tokens: int = 80,
+        encoding_name: str = DEFAULT_ENCODING
+    ):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min_tokens
+        self.encoding = get_encoding(encoding_name)
+
+    def chunk_pages(self, pages: List[Tuple[int, str]]) -> List[Dict[str, Any]]:
+        """
+        Chunk a document given as (page_number, text) pairs in page order
+
+        Returns:
+        [
+            {
+                "text": "3.2.4 Containment\nContainment is important before...",
+                "section": "3.2.4 Containment",
+                "page_start": 35,
+                "page_end": 36
+            },
+            ...
+        ]
+        """
+        document, page_offsets, page_numbers = self._join_pages(pages)
+        units = self._split_units(document)
+        chunks = self._pack_units(units)
+
+        return [
+            {
+                "text": document[start:end].strip(),
+                "section": section,
+                "page_start": page_numbers[bisect_right(page_offsets, start) - 1],
+                "page_end": page_numbers[bisect_right(page_offsets, end - 1) - 1],
+            }
+            for start, end, section in chunks
+            if document[start:end].strip()
+        ]
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def _join_pages(self, pages: List[Tuple[int, str]]) -> Tuple[str, List[int], List[int]]:
+        """Concatenate pages without running headers/footers, tracking page offsets"""
+        page_lines = [(page, (text or "").splitlines()) for page, text in pages]
+        running = self._running_lines([lines for _, lines in page_lines])
+
+        parts, page_offsets, page_numbers = [], [], []
+        offset = 0
+        for page, lines in page_lines:
+            text = "\n".join(
+                line.rstrip() for line in lines
+                if self._normalize_line(line) not in running
+            )
+            page_offsets.append(offset)
+            page_numbers.append(page)
+            parts.append(text + "\n")
+            offset += len(text) + 1
+
+        return "".join(parts), page_offsets, page_numbers
+
+    def _running_lines(self, pages: List[List[str]]) -> set:
+        """Lines that open or close most pages (headers, footers, page numbers)"""
+        if len(pages) < 3:
+            return set()
+
+        counts = Counter()
+        for lines in pages:
+            edges = [line for line in lines[:2] + lines[-2:] if line.strip()]
+            counts.update({self._normalize_line(line) for line in edges})
+
+        threshold = max(3, len(pages) // 2)
+        return {line for line, count in counts.items() if count >= threshold}
+
+    @staticmethod
+    def _normalize_line(line: str) -> str:
+        # Page numbers differ on every page, so compare lines with digits masked
+        return re.sub(r"\d+", "#", line.strip())
+
+    def _split_units(self, document: str) -> List[Tuple[int, int, int, Optional[str], bool]]:
+        """
+        Break the document into (start, end, tokens, section, is_heading) units:
+        heading lines, and sentences of the body text between them.
+        """
+        units = []
+        section = None
+        body_start = None
+        offset = 0
+
+        def flush_body(end: int):
+            if body_start is None:
+                return
+            for start, stop in self._sentences(document, body_start, end):
+                units.extend(self._sized_units(document, start, stop, section))
+
+        for line in document.splitlines(keepends=True):
+            if is_heading(line):
+                flush_body(offset)
+                body_start = None
+                section = line.strip()
+                stop = offset + len(line.rstrip())
+                units.append((offset, stop, self.count_tokens(line), section, True))
+            elif body_start is None and line.strip():
+                body_start = offset
+            offset += len(line)
+
+        flush_body(offset)
+        return units
+
+    @staticmethod
+    def _sentences(document: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """Sentence spans within document[start:end]"""
+        spans = []
+        for match in SENTENCE_END.finditer(document, start, end):
+            if match.start() > start:
+                spans.append((start, match.start()))
+            start = match.end()
+        if document[start:end].strip():
+            spans.append((start, end))
+        return spans
+
+    def _sized_units(self, document: str, start: int, end: int, section: Optional[str]):
+        """Split a sentence that is longer than max_tokens on word boundaries"""
+        tokens = self.count_tokens(document[start:end])
+        if tokens <= self.max_tokens:
+            return [(start, end, tokens, section, False)]
+
+        units = []
+        piece_start, piece_tokens = start, 0
+        for word in re.finditer(r"\S+\s*", document[start:end]):
+            word_tokens = self.count_tokens(word.group())
+            if piece_tokens and piece_tokens + word_tokens > self.max_tokens:
+                units.append((piece_start, start + word.start(), piece_tokens, section, False))
+                piece_start, piece_tokens = start + word.start(), 0
+            piece_tokens += word_tokens
+        units.append((piece_start, end, piece_tokens, section, False))
+        return units
+
+    def _pack_units(self, units) -> List[Tuple[int, int, Optional[str]]]:
+        """Greedily pack units into chunks of at most max_tokens"""
+        chunks = []
+        current: List[Tuple[int, int, int, Optional[str], bool]] = []
+        current_tokens = 0
+
+        def emit():
+            body = [unit for unit in current if not unit[4]] or current
+            chunks.append((current[0][0], current[-1][1], body[0][3]))
+
+        for unit in units:
+            _, _, tokens, _, heading = unit
+            section_break = heading and current_tokens >= self.min_tokens
+            if current and (section_break or current_tokens + tokens > self.max_tokens):
+                emit()
+                # Overlap only within a section; a new section starts clean
+                current = [] if heading else self._overlap(current, self.max_tokens - tokens)
+                current_tokens = sum(u[2] for u in current)
+            current.append(unit)
+            current_tokens += tokens
+
+        if current:
+            emit()
+        return chunks
+
+    def _overlap(self, units, budget: int):
+        """Trailing sentences (up to overlap_tokens) carried into the next chunk"""
+        budget = min(self.overlap_tokens, budget)
+        carried, tokens = [], 0
+        for unit in reversed(units):
+            if unit[4] or tokens + unit[2] > budget:
+                break
+            carried.insert(0, unit)
+            tokens += unit[2]
+        return carried
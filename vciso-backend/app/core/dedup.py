@@ -0,0 +1,127 @@
+# vciso-backend/app/core/dedup.py
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# dedup.py - Near-duplicate detection with MinHash and locality-sensitive hashing
+# NIST, CISA and SANS repeat long passages of the same incident response guidance.
+# This module finds chunks whose text is nearly identical so the indexer can keep
+# a single canonical copy.
+
+# How the code works:
+# 1. MinHasher turns a text into a set of word shingles (overlapping 5-word runs)
+#    and compresses that set into a fixed-size MinHash signature. The fraction of
+#    equal positions in two signatures estimates the Jaccard similarity of the texts.
+# 2. NearDuplicateIndex splits each signature into bands. Texts that share any band
+#    are candidates, so only a handful of signatures are compared per lookup
+#    instead of the whole corpus.
+# 3. Candidates above the similarity threshold are reported as duplicates.
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD = re.compile(r"\w+")
+
+
+class MinHasher:
+    """Compute MinHash signatures of texts"""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Fixed seed: signatures are stored in the index manifest and compared across runs
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> List[str]:
+        words = _WORD.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            return [" ".join(words)] if words else []
+        return [
+            " ".join(words[i:i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        ]
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature (num_perm uint32 values) of a text"""
+        shingles = self.shingles(text)
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64).astype(np.uint32)
+
+        hashes = np.array(
+            [zlib.crc32(shingle.encode("utf-8")) for shingle in set(shingles)],
+            dtype=np.uint64
+        )
+        # Universal hashing: (a * h + b) mod p, one row per permutation
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def to_hex(signature: np.ndarray) -> str:
+        return signature.astype("<u4").tobytes().hex()
+
+    @staticmethod
+    def from_hex(value: str) -> np.ndarray:
+        return np.frombuffer(bytes.fromhex(value), dtype="<u4").astype(np.uint32)
+
+
+def estimate_similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return float(np.mean(sig_a == sig_b))
+
+
+def optimal_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) so the LSH collision curve's midpoint,
+    (1 / bands) ** (1 / rows), sits just below the similarity threshold.
+    """
+    best = (num_perm, 1)
+    best_error = float("inf")
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if bands == 0:
+            break
+        midpoint = (1 / bands) ** (1 / rows)
+        # Prefer a midpoint slightly below the threshold (fewer missed duplicates)
+        error = abs(midpoint - (threshold - 0.05))
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class NearDuplicateIndex:
+    """LSH index that maps each text to the first near-identical text it saw"""
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 128):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = optimal_bands(num_perm, threshold)
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key: str, signature: np.ndarray):
+        """Register a canonical text"""
+        self._signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, []).append(key)
+
+    def find(self, signature: np.ndarray) -> Optional[str]:
+        """Return the most similar registered key above the threshold, if any"""
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(band_key, ()))
+
+        best_key, best_score = None, self.threshold
+        for key in candidates:
+            score = estimate_similarity(signature, self._signatures[key])
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
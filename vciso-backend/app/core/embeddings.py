@@ -1,8 +1,10 @@
 # vciso-backend/app/core/embeddings.py
-from openai import AsyncOpenAI
 from typing import List
 import logging
 from app.config import settings
+from app.core.http_client import get_openai_client
+from app.core.metrics import EMBEDDING_DURATION, EMBEDDING_TOKENS, current_endpoint
+from app.core.rate_limiter import estimate_embedding_tokens, get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -10,17 +12,35 @@ class EmbeddingService:
     """Generate embeddings for text using OpenAI API"""
     
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        # Shared client and connection pool (see http_client.py)
+        self.client = get_openai_client()
         self.model = settings.EMBEDDING_MODEL
         self.dimension = settings.EMBEDDING_DIMENSION
+        self.rate_limiter = get_rate_limiter(
+            f"embeddings:{self.model}",
+            requests_per_minute=settings.EMBEDDING_RPM_LIMIT,
+            tokens_per_minute=settings.EMBEDDING_TPM_LIMIT,
+        )
+    
+    async def _create(self, input):
+        texts = [input] if isinstance(input, str) else input
+        tokens = estimate_embedding_tokens(texts)
+        labels = {"endpoint": current_endpoint.get(), "model": self.model}
+        with EMBEDDING_DURATION.time(**labels):
+            raw = await self.rate_limiter.call(
+                lambda: self.client.embeddings.with_raw_response.create(
+                    model=self.model,
+                    input=input
+                ),
+                tokens=tokens
+            )
+        EMBEDDING_TOKENS.inc(tokens, **labels)
+        return raw.parse()
     
     async def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for a single text"""
         try:
-            response = await self.client.embeddings.create(
-                model=self.model,
-                input=text
-            )
+            response = await self._create(text)
             return response.data[0].embedding
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
@@ -29,10 +49,7 @@ class EmbeddingService:
     async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for multiple texts (batch)"""
         try:
-            response = await self.client.embeddings.create(
-                model=self.model,
-                input=texts
-            )
+            response = await self._create(texts)
             return [data.embedding for data in response.data]
         except Exception as e:
             logger.error(f"Error generating batch embeddings: {e}")
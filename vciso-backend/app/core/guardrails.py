@@ -1,6 +1,12 @@
 # /app/core/guardrails.py
+import hashlib
 import re
-from typing import Dict, Pattern
+import regex
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, Pattern, Tuple
+from app.config import settings
 
 # guardrails.py - Module for PII redaction and detection
 # PII redaction and detection utilities - in simple, it means removing or identifying personally identifiable information from text.
@@ -8,32 +14,376 @@ from typing import Dict, Pattern
 # It uses regular expressions to find and replace PII in the input text.
 
 # How the code works:
-# 1. The PII_Redactor class initializes with regex patterns for different PII types.
+# 1. The PII_Redactor class compiles the patterns for the different PII types into
+#    one alternation with a named group per type, so a text is scanned once however
+#    many types there are.
 # 2. The redact method takes a text input and replaces any detected PII with a placeholder.
-# 3. The contains_pii method checks if the input text contains any PII.
+#    redact_with_spans also returns where each PII match was and its type.
+# 3. The contains_pii method checks if the input text contains any PII (one search).
+#
+# Overlap rules: matches never overlap. Scanning left to right, the match that starts
+# first wins; when several types match at the same position, the earlier type in
+# PII_PATTERNS wins (email, credit_card, ssn, phone: most specific first, so a card
+# number is never split into a phone number plus leftover digits). After a match,
+# scanning resumes at its end.
+#
+# 4. stream() returns a StreamingRedactor for text that arrives in chunks (streamed
+#    LLM output). It emits redacted text as soon as no PII match can still start in
+#    it and holds back only the tail where one could, so the concatenated output
+#    equals redact() of the whole document.
+# 5. EntityRedactor redacts a tenant's own names (employees, vendors, hostnames), which
+#    no regex can describe. It is an Aho-Corasick automaton over word tokens, built
+#    once per tenant dictionary and cached (get_entity_redactor). Passing it to
+#    redact / redact_with_spans / stream folds it into the same scan: the combined PII
+#    pattern is extended with a tokenizer, so one pass over the text yields both the
+#    PII matches and the tokens the automaton steps through. Matching is case-
+#    insensitive, on word boundaries and linear in the text length whatever the size
+#    of the dictionary. Entities never span a PII match; among overlapping entities
+#    the leftmost wins, then the longest.
+
+# Order matters: it is the tie-break for matches starting at the same position
+PII_PATTERNS: Dict[str, str] = {
+    "email": r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    "credit_card": r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b',
+    "ssn": r'\b\d{3}-\d{2}-\d{4}\b',
+    "phone": r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
+}
+
+# Every character the PII patterns can consume. A match is only final once a character
+# outside this set follows it: until then more input could extend or replace it.
+PII_ALPHABET = r"A-Za-z0-9._%+@| -"
+
+
+def combined_pii_pattern() -> str:
+    """PII_PATTERNS as one alternation with a named group per type.
+
+    A plain alternation of the patterns is slower than one pass per pattern, since
+    every alternative is tried at every position. All patterns start at a word
+    boundary, so the boundary is checked once, and the digit-led types are only
+    tried where a digit follows.
+    """
+    bodies = {}
+    for name, pattern in PII_PATTERNS.items():
+        if not pattern.startswith(r"\b"):
+            raise ValueError(f"PII pattern {name} must start at a word boundary")
+        bodies[name] = pattern[2:]
+    other = [f"(?P<{name}>{body})" for name, body in bodies.items() if not body.startswith(r"\d")]
+    digits = [f"(?P<{name}>{body})" for name, body in bodies.items() if body.startswith(r"\d")]
+    return r"\b(?:" + "|".join(other + [r"(?=\d)(?:" + "|".join(digits) + ")"]) + ")"
+
+
+# Shorter entity names are ignored
+MIN_ENTITY_LENGTH = 2
+
+# Word, whitespace run, or single other character
+_TOKEN_PATTERN = r"\w+|\s+|[^\w\s]"
+_TOKENS = re.compile(_TOKEN_PATTERN)
+
+
+def _normalize_token(token: str) -> str:
+    """Case-folded token; every whitespace run is the same token"""
+    return " " if token[0].isspace() else token.casefold()
+
+
+def entity_tokens(name: str) -> List[str]:
+    """Normalized tokens of an entity name"""
+    return [_normalize_token(token) for token in _TOKENS.findall(name.strip())]
+
+
+@dataclass(frozen=True)
+class PIISpan:
+    """One redacted match: its type and [start, end) offsets in the original text"""
+    pii_type: str
+    start: int
+    end: int
+
+
+@dataclass
+class RedactionResult:
+    text: str
+    spans: List[PIISpan] = field(default_factory=list)
+
 
 class PII_Redactor:
     def __init__(self):
-        # Regex patterns for common PII
-        self.patterns: Dict[str, Pattern] = {
-            "email": re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),
-            "phone": re.compile(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'),
-            "ssn": re.compile(r'\b\d{3}-\d{2}-\d{4}\b'),
-            "credit_card": re.compile(r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b'),
-        }
-    
-    def redact(self, text: str) -> str:
-        """Redact PII from text"""
-        redacted = text
-        
-        for pii_type, pattern in self.patterns.items():
-            redacted = pattern.sub(f"[{pii_type.upper()}_REDACTED]", redacted)
-        
-        return redacted
-    
+        # Regex patterns for common PII, kept per type for callers that need one
+        self.patterns: Dict[str, Pattern] = {name: re.compile(p) for name, p in PII_PATTERNS.items()}
+        self.combined: Pattern = re.compile(combined_pii_pattern())
+        self.placeholders: Dict[str, str] = {name: f"[{name.upper()}_REDACTED]" for name in PII_PATTERNS}
+        # The PII alternation followed by a tokenizer: one pass yields PII and entity tokens
+        self.scanner: Pattern = re.compile(combined_pii_pattern() + "|" + _TOKEN_PATTERN)
+
+    def redact(self, text: str, entities: Optional["EntityRedactor"] = None) -> str:
+        """Redact PII (and the entities' names, if given) from text"""
+        if entities is not None:
+            return self.redact_with_spans(text, entities).text
+        placeholders = self.placeholders
+        return self.combined.sub(lambda match: placeholders[match.lastgroup], text)
+
+    def redact_with_spans(self, text: str, entities: Optional["EntityRedactor"] = None) -> RedactionResult:
+        """Redact PII (and the entities' names, if given) and report each match's type and position"""
+        if entities is None:
+            spans = [PIISpan(match.lastgroup, *match.span()) for match in self.combined.finditer(text)]
+        else:
+            spans, _ = self.scan(text, 0, len(text), entities)
+        return RedactionResult(text=self.apply(text, 0, len(text), spans, entities), spans=spans)
+
     def contains_pii(self, text: str) -> bool:
         """Check if text contains PII"""
-        for pattern in self.patterns.values():
-            if pattern.search(text):
-                return True
-        return False
\ No newline at end of file
+        return self.combined.search(text) is not None
+
+    def stream(self, entities: Optional["EntityRedactor"] = None) -> "StreamingRedactor":
+        """Redactor for one stream of text chunks"""
+        return StreamingRedactor(self, entities)
+
+    def scan(
+        self, text: str, pos: int, endpos: int, entities: "EntityRedactor"
+    ) -> Tuple[List[PIISpan], int]:
+        """PII and entity spans in text[pos:endpos], in order, and where an entity could still be open
+
+        The second value is the start of the longest run of tokens at the end that is
+        a proper prefix of some entity name (endpos if there is none): more text could
+        still turn it into a match.
+        """
+        spans: List[PIISpan] = []
+        candidates: List[Tuple[int, int, str]] = []
+        starts: List[int] = []
+        # The automaton step is inlined: this loop runs once per token
+        goto, fail, matches = entities._goto, entities._fail, entities._match
+        state = 0
+        for match in self.scanner.finditer(text, pos, endpos):
+            kind = match.lastgroup
+            if kind is not None:
+                # Entities never span a PII match
+                spans.append(PIISpan(kind, *match.span()))
+                state = 0
+                starts.clear()
+                continue
+            token = match.group()
+            token = " " if token[0].isspace() else token.casefold()
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            starts.append(match.start())
+            found = matches[state]
+            if found:
+                length, entity_type = found
+                candidates.append((starts[-length], match.end(), entity_type))
+
+        # Leftmost, then longest; overlapping later candidates are dropped
+        candidates.sort(key=lambda c: (c[0], -c[1]))
+        last_end = pos
+        for start, end, entity_type in candidates:
+            if start >= last_end:
+                spans.append(PIISpan(entity_type, start, end))
+                last_end = end
+        spans.sort(key=lambda span: span.start)
+
+        open_tokens = entities.open_at(state)
+        return spans, (starts[-open_tokens] if open_tokens else endpos)
+
+    def apply(
+        self, text: str, pos: int, endpos: int, spans: List[PIISpan], entities: Optional["EntityRedactor"] = None
+    ) -> str:
+        """text[pos:endpos] with every span replaced by its placeholder"""
+        parts = []
+        last = pos
+        for span in spans:
+            parts.append(text[last:span.start])
+            parts.append(self.placeholders.get(span.pii_type) or entities.placeholders[span.pii_type])
+            last = span.end
+        parts.append(text[last:endpos])
+        return "".join(parts)
+
+
+class StreamingRedactor:
+    """Incremental PII redaction whose output matches whole-document redaction.
+
+    feed() returns the redacted text that is safe to send now; flush() returns the
+    rest at the end of the stream. Uses the regex module's partial matching: a partial
+    match at the end of the buffer marks where PII could still be completing (e.g. an
+    email address split across two chunks). A complete match is held back too while
+    only PII_ALPHABET characters follow it, since more input could still extend it
+    ("a@b.com" + ".au") or make it fail (a phone number followed by more digits).
+    Then everything from the start of that run of PII_ALPHABET characters is held:
+    regex reports a complete match in preference to an earlier partial one, and a
+    match starting earlier in the run could still complete.
+
+    With an EntityRedactor, the tokens at the end of the settled text that could
+    still grow into an entity name ("Jane" while "Jane Smith" is in the dictionary)
+    are held back as well.
+    """
+
+    _pattern = regex.compile(combined_pii_pattern())
+    _boundary = regex.compile(f"[^{PII_ALPHABET}]")
+    _last_boundary = regex.compile(f"(?r)[^{PII_ALPHABET}]")
+
+    def __init__(self, redactor: PII_Redactor, entities: Optional["EntityRedactor"] = None):
+        self._redactor = redactor
+        self._entities = entities
+        # Pending text, preceded by the last emitted character (if any) so word
+        # boundaries at the start of the pending text are judged correctly
+        self._buffer = ""
+        self._start = 0
+
+    def feed(self, text: str) -> str:
+        if not text:
+            return ""
+        self._buffer += text
+        buffer, pos = self._buffer, self._start
+        spans, end = self._settled(buffer, pos)
+        if self._entities is not None:
+            spans, open_from = self._redactor.scan(buffer, pos, end, self._entities)
+            spans = [span for span in spans if span.start < open_from]
+            end = max([open_from] + [span.end for span in spans])
+        out = self._redactor.apply(buffer, pos, end, spans, self._entities)
+        self._keep(end)
+        return out
+
+    def flush(self) -> str:
+        """Redact and return everything still held back (end of stream)"""
+        buffer, pos = self._buffer, self._start
+        if self._entities is None:
+            spans = [PIISpan(match.lastgroup, *match.span()) for match in self._pattern.finditer(buffer, pos)]
+        else:
+            spans, _ = self._redactor.scan(buffer, pos, len(buffer), self._entities)
+        out = self._redactor.apply(buffer, pos, len(buffer), spans, self._entities)
+        self._buffer, self._start = "", 0
+        return out
+
+    def _settled(self, buffer: str, pos: int) -> Tuple[List[PIISpan], int]:
+        """PII matches in buffer[pos:] that no further input can change, and where the undecided tail starts"""
+        spans = []
+        while True:
+            match = self._pattern.search(buffer, pos, partial=True)
+            if match is None:
+                return spans, len(buffer)
+            start, end = match.span()
+            if match.partial:
+                return spans, start
+            if not self._boundary.search(buffer, end):
+                boundary = self._last_boundary.search(buffer, pos, start)
+                return spans, boundary.end() if boundary else pos
+            spans.append(PIISpan(match.lastgroup, start, end))
+            pos = end
+
+    def _keep(self, index: int):
+        """Hold back buffer[index:], keeping one character of context before it"""
+        if index == 0:
+            return
+        self._buffer = self._buffer[index - 1:]
+        self._start = 1
+
+
+class EntityRedactor:
+    """Aho-Corasick automaton over the word tokens of a tenant's entity names.
+
+    entities: entity type (e.g. "employee") -> names. A name listed under several
+    types keeps the first. Names are matched case-insensitively and only as whole
+    tokens ("Ann" does not match inside "Annual"); any run of whitespace matches
+    any other. Build once per dictionary (see get_entity_redactor): construction
+    is linear in the total length of the names.
+    """
+
+    def __init__(self, entities: Mapping[str, Iterable[str]]):
+        self.placeholders: Dict[str, str] = {kind: f"[{kind.upper()}_REDACTED]" for kind in entities}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (token count, type) of the longest name ending there, and the
+        # token count of the longest suffix that is a proper prefix of some name
+        self._match: List[Optional[Tuple[int, str]]] = [None]
+        self._open: List[int] = [0]
+        self.size = 0
+        for kind, names in entities.items():
+            for name in names:
+                self._add(kind, name)
+        self._link()
+
+    def _add(self, kind: str, name: str):
+        tokens = entity_tokens(name)
+        # One-character names would redact ordinary words
+        if len(name.strip()) < MIN_ENTITY_LENGTH or not any(t[0].isalnum() for t in tokens):
+            return
+        state = 0
+        for token in tokens:
+            following = self._goto[state].get(token)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][token] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._match.append(None)
+                self._open.append(0)
+            state = following
+        if self._match[state] is None:
+            self._match[state] = (len(tokens), kind)
+            self.size += 1
+
+    def _link(self):
+        """Failure links in breadth-first order, inheriting matches along them"""
+        depth = [0] * len(self._goto)
+        queue = deque([0])
+        while queue:
+            state = queue.popleft()
+            if state and not self._goto[state]:
+                self._open[state] = self._open[self._fail[state]]
+            else:
+                self._open[state] = depth[state]
+            for token, child in self._goto[state].items():
+                depth[child] = depth[state] + 1
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[child] = target if state else 0
+                if self._match[child] is None:
+                    self._match[child] = self._match[self._fail[child]]
+                queue.append(child)
+
+    def step(self, state: int, token: str) -> int:
+        """State after one more normalized token"""
+        goto, fail = self._goto, self._fail
+        while state and token not in goto[state]:
+            state = fail[state]
+        return goto[state].get(token, 0)
+
+    def match_at(self, state: int) -> Optional[Tuple[int, str]]:
+        """(token count, type) of the longest name ending at this state"""
+        return self._match[state]
+
+    def open_at(self, state: int) -> int:
+        """Token count of the longest suffix at this state that more tokens could complete"""
+        return self._open[state]
+
+
+_entity_redactors: "OrderedDict[str, EntityRedactor]" = OrderedDict()
+_entity_lock = threading.Lock()
+
+
+def get_entity_redactor(tenant: str, entities: Mapping[str, Iterable[str]]) -> Optional[EntityRedactor]:
+    """The tenant's EntityRedactor, built on first use and cached (LRU) until its names change
+
+    Returns None when there are no names to redact.
+    """
+    entities = {kind: sorted({name.strip() for name in names if name and name.strip()}) for kind, names in entities.items()}
+    if not any(entities.values()):
+        return None
+
+    digest = hashlib.sha256()
+    for kind, names in entities.items():
+        digest.update(kind.encode() + b"\0" + "\0".join(names).encode() + b"\1")
+    key = f"{tenant.strip().lower()}:{digest.hexdigest()}"
+
+    with _entity_lock:
+        redactor = _entity_redactors.get(key)
+        if redactor is not None:
+            _entity_redactors.move_to_end(key)
+            return redactor
+
+    redactor = EntityRedactor(entities)
+    with _entity_lock:
+        _entity_redactors[key] = redactor
+        _entity_redactors.move_to_end(key)
+        while len(_entity_redactors) > settings.ENTITY_REDACTOR_CACHE_SIZE:
+            _entity_redactors.popitem(last=False)
+    return redactor
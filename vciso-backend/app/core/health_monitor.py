@@ -0,0 +1,154 @@
+# vciso-backend/app/core/health_monitor.py
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.config import settings
+
+# health_monitor.py - Background probes of the app's external dependencies
+# Orchestrators poll the health endpoint every few seconds. Probing the vector DB on
+# each poll blocked the event loop (the Pinecone client is synchronous) and sent
+# the vector DB as many requests as there were polls.
+
+# How the code works:
+# 1. HealthMonitor.refresh probes every dependency concurrently, each with a
+#    timeout: the vector DB (index stats, which also gives the vector count, in a
+#    worker thread) and OpenAI reachability (listing models). The OpenAI client is
+#    built inside its probe, so a missing API key is a failed check, not a crash.
+# 2. The results replace the cached HealthSnapshot in one assignment, so readers
+#    never see a half-updated snapshot.
+# 3. A timed-out vector DB probe keeps running in its thread (threads cannot be
+#    cancelled). Until it finishes, later refreshes report it as still running
+#    instead of starting another thread, so a hung index cannot pile up threads.
+# 4. start() runs refresh every HEALTH_CHECK_INTERVAL_SECONDS in a background task
+#    owned by the app's lifespan; stop() cancels it.
+# 5. snapshot() returns the cached result and its age without any I/O.
+
+logger = logging.getLogger(__name__)
+
+HEALTHY = "healthy"
+UNHEALTHY = "unhealthy"
+STARTING = "starting"
+
+
+@dataclass(frozen=True)
+class HealthSnapshot:
+    status: str
+    checks: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    total_vectors: Optional[int] = None
+    checked_at: Optional[float] = None  # time.time() of the refresh
+    monotonic_at: Optional[float] = None  # time.monotonic() of the refresh, for the age
+
+    def to_dict(self) -> Dict[str, Any]:
+        age = None if self.monotonic_at is None else round(time.monotonic() - self.monotonic_at, 3)
+        return {
+            "status": self.status,
+            "checks": self.checks,
+            "total_vectors": self.total_vectors,
+            "checked_at": self.checked_at,
+            "age_seconds": age,
+        }
+
+
+class HealthMonitor:
+    """Periodically probe the vector DB and OpenAI; serve the last result from memory
+
+    vector_db: VectorDBService (its blocking connect() is run in a thread)
+    openai_client_factory: returns the AsyncOpenAI client (called in the probe),
+        or None to skip the OpenAI probe
+    """
+
+    def __init__(
+        self,
+        vector_db,
+        openai_client_factory: Optional[Callable[[], Any]] = None,
+        interval: Optional[float] = None,
+        timeout: Optional[float] = None
+    ):
+        self.vector_db = vector_db
+        self.openai_client_factory = openai_client_factory
+        self.interval = interval if interval is not None else settings.HEALTH_CHECK_INTERVAL_SECONDS
+        self.timeout = timeout if timeout is not None else settings.HEALTH_CHECK_TIMEOUT_SECONDS
+        self._snapshot = HealthSnapshot(status=STARTING)
+        self._task: Optional[asyncio.Task] = None
+        self._vector_db_probe: Optional[asyncio.Future] = None
+
+    def snapshot(self) -> HealthSnapshot:
+        """The last refresh result (status "starting" before the first one)"""
+        return self._snapshot
+
+    async def refresh(self) -> HealthSnapshot:
+        probes: Dict[str, Callable[[], Awaitable[Any]]] = {
+            "vector_db": self._connect_vector_db,
+        }
+        if self.openai_client_factory is not None:
+            probes["openai"] = self._list_openai_models
+
+        results = await asyncio.gather(*(self._probe(name, probe) for name, probe in probes.items()))
+        outcomes = dict(zip(probes, results))
+        checks = {name: check for name, (check, _) in outcomes.items()}
+
+        stats = outcomes["vector_db"][1]
+        total_vectors = getattr(stats, "total_vector_count", None)
+        status = HEALTHY if all(check["status"] == "ok" for check in checks.values()) else UNHEALTHY
+        self._snapshot = HealthSnapshot(
+            status=status,
+            checks=checks,
+            total_vectors=total_vectors,
+            checked_at=time.time(),
+            monotonic_at=time.monotonic(),
+        )
+        return self._snapshot
+
+    async def _connect_vector_db(self):
+        """connect() in a thread, unless the previous (timed-out) call is still running"""
+        if self._vector_db_probe is not None and not self._vector_db_probe.done():
+            raise RuntimeError("previous probe still running")
+        self._vector_db_probe = asyncio.ensure_future(asyncio.to_thread(self.vector_db.connect))
+        # Retrieve the outcome of a probe nobody awaits any more (after a timeout)
+        self._vector_db_probe.add_done_callback(lambda f: f.cancelled() or f.exception())
+        # Shielded: a timeout stops the wait, the thread finishes on its own
+        return await asyncio.shield(self._vector_db_probe)
+
+    async def _list_openai_models(self):
+        return await self.openai_client_factory().models.list()
+
+    async def _probe(self, name: str, probe: Callable[[], Awaitable[Any]]):
+        """(check, result): check holds the status and latency; result is None on failure"""
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(probe(), self.timeout)
+        except asyncio.TimeoutError:
+            check, result = {"status": "error", "error": f"timed out after {self.timeout:g}s"}, None
+        except Exception as e:
+            check, result = {"status": "error", "error": str(e)}, None
+        else:
+            check = {"status": "ok"}
+        check["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if check["status"] != "ok":
+            logger.warning(f"Health probe {name} failed: {check['error']}")
+        return check, result
+
+    def start(self) -> asyncio.Task:
+        """Refresh now and then every interval, in the background (once)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return self._task
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health refresh failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
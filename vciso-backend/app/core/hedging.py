@@ -0,0 +1,112 @@
+# vciso-backend/app/core/hedging.py
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+# hedging.py - Hedged requests to cut tail latency
+# A few upstream calls take several times longer than usual. Instead of waiting
+# them out, a hedged call sends a duplicate once the first attempt is slower than
+# most recent calls, and uses whichever answer arrives first.
+
+# How the code works:
+# 1. LatencyTracker keeps a sliding window of recent latencies per call site and
+#    reports a percentile (e.g. p95) once it has enough samples.
+# 2. hedged() starts the first leg. If it has not finished after `delay` seconds,
+#    a second leg starts. The first leg to succeed wins and the other is cancelled.
+#    If one leg fails, the other still gets a chance to finish. should_hedge can
+#    veto the duplicate, e.g. while the rate limiter is already queueing callers.
+# 3. Latencies of both legs are recorded. A cancelled leg records the time it ran,
+#    a lower bound, so slow calls still push the percentile up.
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Sliding window of call latencies"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Nearest-rank percentile, or None until min_samples latencies are recorded"""
+        if len(self._samples) < max(self.min_samples, 1):
+            return None
+        ordered = sorted(self._samples)
+        rank = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+        return ordered[min(rank, len(ordered) - 1)]
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+
+
+def get_latency_tracker(name: str, min_samples: int = 20) -> LatencyTracker:
+    """Process-wide latency tracker for a call site, created on first use"""
+    tracker = _trackers.get(name)
+    if tracker is None:
+        tracker = _trackers[name] = LatencyTracker(min_samples=min_samples)
+    return tracker
+
+
+async def hedged(
+    leg: Callable[[], Awaitable[T]],
+    delay: float,
+    tracker: Optional[LatencyTracker] = None,
+    on_cancelled: Optional[Callable[["asyncio.Task[Any]"], None]] = None,
+    should_hedge: Optional[Callable[[], bool]] = None
+) -> Tuple[T, bool]:
+    """
+    Run leg(), starting a duplicate if the first has not finished after `delay` seconds.
+
+    Returns (result, hedged) where hedged tells whether a second leg was started.
+    on_cancelled is called with the task of each leg cancelled after a hedge was sent
+    (the loser, or both legs if the caller is cancelled). Legs run in their own tasks,
+    so leg() can tag asyncio.current_task() to tell on_cancelled how far it got.
+    """
+
+    async def timed_leg() -> T:
+        started = time.perf_counter()
+        try:
+            return await leg()
+        finally:
+            if tracker is not None:
+                tracker.record(time.perf_counter() - started)
+
+    legs = [asyncio.ensure_future(timed_leg())]
+    try:
+        done, _ = await asyncio.wait(legs, timeout=delay)
+        if done:
+            return legs[0].result(), False
+        if should_hedge is not None and not should_hedge():
+            return await legs[0], False
+
+        logger.info(f"No response after {delay:.2f}s, sending hedged request")
+        legs.append(asyncio.ensure_future(timed_leg()))
+        pending = set(legs)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), True
+                error = task.exception()
+        raise error
+    finally:
+        # Losers, or every leg if our caller was cancelled. A lone first leg was
+        # never raced against a hedge, so cancelling it is not hedge waste.
+        for task in legs:
+            if not task.done():
+                task.cancel()
+                if on_cancelled is not None and len(legs) > 1:
+                    on_cancelled(task)
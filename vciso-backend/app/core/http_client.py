@@ -0,0 +1,85 @@
+# vciso-backend/app/core/http_client.py
+import logging
+from typing import Optional
+import httpx
+from openai import AsyncOpenAI
+from app.config import settings
+
+# http_client.py - Shared outbound HTTP connection pool
+# Every OpenAI-backed service used to build its own AsyncOpenAI client, each with
+# its own connection pool, so TLS handshakes were repeated and the total number of
+# open connections depended on how many services happened to exist.
+
+# How the code works:
+# 1. get_http_client() lazily creates one httpx.AsyncClient for the process: a
+#    keep-alive pool with configured connection limits, explicit connect/read/
+#    write/pool timeouts, and HTTP/2 when the h2 package is installed.
+# 2. get_openai_client() lazily creates one AsyncOpenAI on top of that pool.
+#    OpenAIClient and EmbeddingService share it. SDK retries are disabled because
+#    the rate limiter owns retries. OPENAI_BASE_URL redirects it, e.g. to the
+#    offline stand-in server (app/scripts/stand_in_server.py).
+# 3. close_http_clients() closes the pool. The app calls it on shutdown and
+#    scripts call it when they finish. The next get_* call builds a fresh pool.
+
+logger = logging.getLogger(__name__)
+
+_http_client: Optional[httpx.AsyncClient] = None
+_openai_client: Optional[AsyncOpenAI] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (installed with httpx[http2])
+        return True
+    except ImportError:
+        return False
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The process-wide pooled HTTP client"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        http2 = settings.HTTP2_ENABLED and _http2_available()
+        if settings.HTTP2_ENABLED and not http2:
+            logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+
+        _http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.HTTP_CONNECT_TIMEOUT,
+                read=settings.HTTP_READ_TIMEOUT,
+                write=settings.HTTP_WRITE_TIMEOUT,
+                pool=settings.HTTP_POOL_TIMEOUT,
+            ),
+            follow_redirects=True,
+        )
+    return _http_client
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """The process-wide AsyncOpenAI client, on the shared connection pool"""
+    global _openai_client
+    if _openai_client is None or _http_client is None or _http_client.is_closed:
+        # Retries are handled by the rate limiter so they respect the shared quota
+        _openai_client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL or None,
+            max_retries=0,
+            http_client=get_http_client(),
+        )
+    return _openai_client
+
+
+async def close_http_clients():
+    """Close the shared connection pool (idempotent)"""
+    global _http_client, _openai_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+        logger.info("Closed shared HTTP client")
+    _http_client = None
+    _openai_client = None
@@ -1,8 +1,19 @@
 # /app/core/llm_client.py
-from openai import AsyncOpenAI
-from typing import Optional, Dict, Any
+import asyncio
+from typing import Optional, Dict, Any, AsyncIterator, Callable, List, Set
 import logging
+import time
 from app.config import settings
+from app.core.metrics import (
+    LLM_COST, LLM_ESCALATIONS, LLM_REQUEST_DURATION, LLM_REQUESTS, LLM_TOKENS, current_endpoint
+)
+from app.core.pricing import estimate_cost
+from app.core.http_client import get_openai_client
+from app.core.rate_limiter import get_rate_limiter
+from app.core.hedging import get_latency_tracker, hedged
+from app.core.task_profiles import get_task_profile
+from app.core.token_budget import completion_budget
+from app.core.tokenizer import count_message_tokens
 
 # llm_client.py - Module for interacting with OpenAI API
 # This module provides a client for generating incident response plans using OpenAI's language models.
@@ -14,77 +25,337 @@ from app.config import settings
 # 1. The OpenAIClient class initializes with API key, model, and max tokens from settings.
 # 2. The generate_plan method sends a request to the OpenAI API with system and user prompts.
 # 3. It processes the response to extract the generated plan text.
-# 4. It logs token usage for cost tracking based on the model used.
+# 4. It logs token usage for cost tracking based on the model used, including input
+#    tokens served from the provider's prompt cache (billed at a discount).
+# 5. The stream_plan method returns a PlanStream that yields the plan text as it is generated.
+# 6. Every request goes through the process-wide rate limiter for the model, which
+#    queues callers under that model's RPM/TPM quota (OPENAI_MODEL_RATE_LIMITS) and
+#    owns retries (the SDK's are disabled).
+# 7. Call sites that pass hedge=True get a duplicate request when the first is slower
+#    than the configured latency percentile for that call site; the first answer wins.
+# 8. Latency, outcome, tokens and cost of every call are recorded in the metrics
+#    registry, labelled by endpoint, model and call site. Prices come from pricing.py.
+# 9. complete(task, ...) routes each call by task profile (task_profiles.py): short
+#    structured tasks go to a small model, and output that fails the caller's
+#    validator is retried once on the escalation (large) model.
+# 10. max_tokens is set per call by completion_budget (token_budget.py) from the
+#    output the caller expects, the profile's cap and the room left in the context
+#    window; prompts over the task's input budget are refused before sending.
 
 logger = logging.getLogger(__name__)
 
+# Process-wide input token totals, to report the share served from the prompt cache
+_usage_totals = {"prompt_tokens": 0, "cached_tokens": 0}
+
+
+class PlanStream:
+    """Async iterator over streamed completion text.
+
+    `usage` is populated once the stream has been fully consumed.
+    """
+
+    def __init__(self, client: "OpenAIClient", stream, call_site: str, started: float, model: str):
+        self._client = client
+        self._stream = stream
+        self._call_site = call_site
+        self._started = started
+        self._model = model
+        self.usage = None
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        try:
+            async for chunk in self._stream:
+                # With include_usage, the final chunk has usage and no choices
+                if chunk.usage:
+                    self.usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            logger.error(f"OpenAI streaming error: {e}")
+            self._client._record_call(self._call_site, self._started, "error", self._model)
+            raise
+
+        self._client._record_call(self._call_site, self._started, "success", self._model)
+        self._client._log_usage(self.usage, self._call_site, self._model)
+
+
 class OpenAIClient:
     def __init__(self):
         if not settings.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY is not set in environment variables")
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        # Shared client and connection pool (see http_client.py)
+        self.client = get_openai_client()
+        # Default model for accounting; each call uses its task profile's model
         self.model = settings.OPENAI_MODEL
-        self.max_tokens = settings.OPENAI_MAX_TOKENS
+    
+    def _rate_limiter(self, model: str):
+        """The model's own limiter, at its OPENAI_MODEL_RATE_LIMITS entry (or the defaults)"""
+        limits = settings.OPENAI_MODEL_RATE_LIMITS.get(model, {})
+        return get_rate_limiter(
+            f"chat:{model}",
+            requests_per_minute=limits.get("rpm", settings.OPENAI_RPM_LIMIT),
+            tokens_per_minute=limits.get("tpm", settings.OPENAI_TPM_LIMIT),
+        )
     
     async def generate_plan(
         self, 
         system_prompt: str, 
         user_prompt: str,
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        hedge: bool = False,
+        call_site: str = "plan",
+        expected_output_tokens: Optional[int] = None
+    ) -> str:
+        """Generate IR plan using OpenAI (the "plan" task profile)
+        
+        hedge: send a duplicate request if this one is slow (see _hedged_request)
+        call_site: name of the caller, used to keep latency statistics per call site
+        """
+        return await self.complete(
+            "plan",
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=temperature,
+            hedge=hedge,
+            call_site=call_site,
+            expected_output_tokens=expected_output_tokens
+        )
+    
+    async def complete(
+        self,
+        task: str,
+        system_prompt: str,
+        user_prompt: str,
+        validate: Optional[Callable[[str], Any]] = None,
+        temperature: Optional[float] = None,
+        hedge: bool = False,
+        call_site: Optional[str] = None,
+        expected_output_tokens: Optional[int] = None
     ) -> str:
-        """Generate IR plan using OpenAI"""
+        """Run a chat completion with the model, max_tokens and temperature of `task`
         
+        validate: raises if the output is unusable (e.g. invalid JSON). The call is then
+            repeated once on OPENAI_ESCALATION_MODEL. The last output is returned either
+            way, so callers still handle invalid output.
+        temperature: overrides the profile's temperature
+        call_site: defaults to the task name
+        expected_output_tokens: output size the caller expects; lowers max_tokens below
+            the profile's cap (see token_budget.completion_budget)
+        """
+        profile = get_task_profile(task)
+        call_site = call_site or task
         if temperature is None:
-            temperature = settings.OPENAI_TEMPERATURE
+            temperature = profile.temperature
+        
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        prompt_tokens = count_message_tokens(messages)
+        max_tokens = completion_budget(profile, prompt_tokens, expected_output_tokens)
+        text = await self._complete(profile.model, max_tokens, temperature, messages, hedge, call_site, prompt_tokens)
+        if validate is None:
+            return text
         
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
+            validate(text)
+            return text
+        except Exception as e:
+            escalation_model = settings.OPENAI_ESCALATION_MODEL
+            if not escalation_model or escalation_model == profile.model:
+                return text
+            logger.warning(
+                f"{call_site}: output of {profile.model} failed validation ({e}); retrying on {escalation_model}"
+            )
+            LLM_ESCALATIONS.inc(call_site=call_site, model=profile.model, escalation_model=escalation_model)
+        
+        max_tokens = completion_budget(profile, prompt_tokens, expected_output_tokens, model=escalation_model)
+        return await self._complete(escalation_model, max_tokens, temperature, messages, hedge, call_site, prompt_tokens)
+    
+    async def _complete(
+        self,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        messages: List[Dict[str, str]],
+        hedge: bool,
+        call_site: str,
+        prompt_tokens: int
+    ) -> str:
+        """Send one chat completion through the model's rate limiter and record it"""
+        rate_limiter = self._rate_limiter(model)
+        tokens = prompt_tokens + max_tokens
+        started = time.perf_counter()
+        
+        # Hedge legs that got past the rate limiter, i.e. were actually sent
+        sent_legs: Set[asyncio.Task] = set()
+        
+        def send():
+            sent_legs.add(asyncio.current_task())
+            return self.client.chat.completions.with_raw_response.create(
+                model=model,
+                max_tokens=max_tokens,
                 temperature=temperature,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ]
+                messages=messages
             )
+        
+        async def request():
+            raw = await rate_limiter.call(send, tokens=tokens)
+            return raw.parse()
+        
+        try:
+            if hedge:
+                response = await self._hedged_request(request, call_site, prompt_tokens, model, max_tokens, sent_legs)
+            else:
+                response = await request()
             
             # Extract text from response
-            plan_text = response.choices[0].message.content
+            text = response.choices[0].message.content
             
-            if not plan_text:
+            if not text:
                 raise ValueError("Empty response from OpenAI API")
             
             # Log usage for cost tracking
-            self._log_usage(response.usage)
+            self._record_call(call_site, started, "success", model)
+            self._log_usage(response.usage, call_site, model)
             
-            return plan_text
+            return text
             
         except Exception as e:
             logger.error(f"OpenAI API error: {e}")
+            self._record_call(call_site, started, "error", model)
             raise
     
-    def _log_usage(self, usage):
-        """Log token usage for cost tracking"""
+    async def stream_plan(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: Optional[float] = None,
+        call_site: str = "plan_stream",
+        expected_output_tokens: Optional[int] = None
+    ) -> PlanStream:
+        """Start a streaming IR plan generation; iterate the result for text deltas"""
+        
+        profile = get_task_profile("plan")
+        if temperature is None:
+            temperature = profile.temperature
+        
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        prompt_tokens = count_message_tokens(messages)
+        max_tokens = completion_budget(profile, prompt_tokens, expected_output_tokens)
+        started = time.perf_counter()
+        
+        try:
+            raw = await self._rate_limiter(profile.model).call(
+                lambda: self.client.chat.completions.with_raw_response.create(
+                    model=profile.model,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                ),
+                tokens=prompt_tokens + max_tokens
+            )
+            stream = raw.parse()
+        except Exception as e:
+            logger.error(f"OpenAI API error: {e}")
+            self._record_call(call_site, started, "error", profile.model)
+            raise
+        
+        return PlanStream(self, stream, call_site, started, profile.model)
+    
+    async def _hedged_request(
+        self,
+        request,
+        call_site: str,
+        prompt_tokens: int,
+        model: str,
+        max_tokens: int,
+        sent_legs: Set[asyncio.Task]
+    ):
+        """Run request, hedging with a duplicate after the call site's latency percentile
+        
+        Both legs pass through the rate limiter. A cancelled leg that was sent (it is in
+        sent_legs) is logged with its estimated prompt cost, since OpenAI bills it
+        without returning usage; one still queued in the limiter cost nothing.
+        """
+        tracker = get_latency_tracker(f"{model}:{call_site}", settings.OPENAI_HEDGE_MIN_SAMPLES)
+        delay = tracker.percentile(settings.OPENAI_HEDGE_PERCENTILE)
+        if delay is None:
+            delay = settings.OPENAI_HEDGE_DELAY_SECONDS
+        
+        tokens = prompt_tokens + max_tokens
+        rate_limiter = self._rate_limiter(model)
+        
+        def on_cancelled(leg: asyncio.Task):
+            # A leg still waiting in the rate limiter was never sent, so never billed
+            if leg in sent_legs:
+                self._log_cancelled_request(prompt_tokens, call_site, model)
+        
+        response, was_hedged = await hedged(
+            request,
+            delay=delay,
+            tracker=tracker,
+            on_cancelled=on_cancelled,
+            # A duplicate that has to queue for quota would not arrive sooner
+            should_hedge=lambda: not rate_limiter.would_wait(tokens)
+        )
+        if was_hedged:
+            logger.info(f"Hedged request for {call_site} (delay {delay:.2f}s)")
+        return response
+    
+    def _log_cancelled_request(self, prompt_tokens: int, call_site: str, model: Optional[str] = None):
+        cost = self._estimate_cost(prompt_tokens, 0, model=model)
+        labels = self._metric_labels(call_site, model)
+        LLM_REQUESTS.inc(outcome="cancelled", **labels)
+        LLM_TOKENS.inc(prompt_tokens, direction="input", **labels)
+        LLM_COST.inc(cost, **labels)
+        logger.info(f"API Usage - Cancelled hedge leg ({call_site}) - Input: ~{prompt_tokens}, Cost: ~${cost:.4f}")
+    
+    def _estimate_cost(
+        self, input_tokens: int, output_tokens: int, cached_tokens: int = 0, model: Optional[str] = None
+    ) -> float:
+        """Cost in USD; cached_tokens (part of input_tokens) are billed at the cached-input rate"""
+        return estimate_cost(model or self.model, input_tokens, output_tokens, cached_tokens)
+    
+    def _metric_labels(self, call_site: str, model: Optional[str] = None) -> Dict[str, str]:
+        return {"endpoint": current_endpoint.get(), "model": model or self.model, "call_site": call_site}
+    
+    def _record_call(self, call_site: str, started: float, outcome: str, model: Optional[str] = None):
+        labels = self._metric_labels(call_site, model)
+        LLM_REQUEST_DURATION.observe(time.perf_counter() - started, **labels)
+        LLM_REQUESTS.inc(outcome=outcome, **labels)
+    
+    def _log_usage(self, usage, call_site: str = "plan", model: Optional[str] = None):
+        """Log and record token usage, prompt-cache hits and effective cost for cost tracking"""
         if not usage:
             return
             
         input_tokens = usage.prompt_tokens
         output_tokens = usage.completion_tokens
         total_tokens = usage.total_tokens
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details else 0
         
-        # OpenAI GPT-4o pricing (as of 2025)
-        # Pricing varies by model, using GPT-4o as default
-        if "gpt-4o" in self.model.lower() or "gpt-4" in self.model.lower():
-            input_cost = (input_tokens / 1_000_000) * 2.50  # $2.50 per 1M input tokens
-            output_cost = (output_tokens / 1_000_000) * 10.00  # $10 per 1M output tokens
-        elif "gpt-3.5" in self.model.lower():
-            input_cost = (input_tokens / 1_000_000) * 0.50  # $0.50 per 1M input tokens
-            output_cost = (output_tokens / 1_000_000) * 1.50  # $1.50 per 1M output tokens
-        else:
-            # Default pricing (can be adjusted based on model)
-            input_cost = (input_tokens / 1_000_000) * 2.50
-            output_cost = (output_tokens / 1_000_000) * 10.00
-            
-        total_cost = input_cost + output_cost
+        total_cost = self._estimate_cost(input_tokens, output_tokens, cached_tokens, model=model)
+        uncached_cost = self._estimate_cost(input_tokens, output_tokens, model=model)
+        
+        labels = self._metric_labels(call_site, model)
+        LLM_TOKENS.inc(input_tokens - cached_tokens, direction="input", **labels)
+        LLM_TOKENS.inc(cached_tokens, direction="cached_input", **labels)
+        LLM_TOKENS.inc(output_tokens, direction="output", **labels)
+        LLM_COST.inc(total_cost, **labels)
+        
+        _usage_totals["prompt_tokens"] += input_tokens
+        _usage_totals["cached_tokens"] += cached_tokens
+        cached_share = _usage_totals["cached_tokens"] / max(_usage_totals["prompt_tokens"], 1)
         
-        logger.info(f"API Usage - Input: {input_tokens}, Output: {output_tokens}, Total: {total_tokens}, Cost: ${total_cost:.4f}")
\ No newline at end of file
+        logger.info(
+            f"API Usage - Input: {input_tokens} (cached: {cached_tokens}), Output: {output_tokens}, "
+            f"Total: {total_tokens}, Cost: ${total_cost:.4f} (without cache: ${uncached_cost:.4f}), "
+            f"Cached input so far: {cached_share:.1%}"
+        )
@@ -1,6 +1,14 @@
 # /app/core/meta_prompting.py
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from app.config import settings
+from app.core.metrics import GUARDRAIL_CLASSIFICATIONS
+from app.core.request_classifier import (
+    AMBIGUOUS, INVALID, VALID, Classification, GuardrailViolation, RequestClassifier, request_text
+)
 from app.models.plan import OnboardingData, SecurityLead
+import logging
+
+logger = logging.getLogger(__name__)
 
 # meta_prompting.py - Module for constructing meta-prompts for IR plan generation
 # This module defines the MetaPromptEngine class which builds system and user prompts
@@ -13,12 +21,41 @@ from app.models.plan import OnboardingData, SecurityLead
 # How the code works:
 # 1. The MetaPromptEngine class initializes with a base system prompt.
 # 2. The build_prompt method constructs a user prompt by injecting onboarding data context.
-# 3. The apply_guardrails method adds safety checks to the prompts to prevent misuse.
+#    The system prompt never varies, so it forms a stable prefix the provider can cache.
+# 3. The apply_guardrails method adds safety checks to the prompts to prevent misuse:
+#    RequestClassifier (app/core/request_classifier.py) classifies the request on the
+#    CPU and an INVALID one raises GuardrailViolation. apply_guardrails_async also
+#    asks the small "classify" model about the few requests the local classifier
+#    finds ambiguous.
 # 4. The final prompts are used by the LLM client to generate the IR plan.
+# 5. For parallel generation, section_instruction appends a request for one section
+#    (or one threat playbook) to the same prompts, so every section call shares the
+#    company context and the cached prefix.
+# 6. skip_sections_instruction tells the LLM which sections are rendered locally
+#    (see app/core/plan_templates.py) so it does not spend tokens on them.
 
 class MetaPromptEngine:
+    # Bump whenever the system prompt or build_prompt template changes;
+    # cached plans generated with an older version are not reused.
+    PROMPT_VERSION = "2"
+    
+    # Canonical order of the "## N." sections in the Output Structure, and of the
+    # threat playbooks under Response Procedures
+    PLAN_SECTIONS = (
+        "Executive Summary",
+        "Incident Response Team",
+        "Incident Classification",
+        "Response Procedures",
+        "Communication Plan",
+        "Post-Incident Review",
+        "Appendices",
+    )
+    RESPONSE_PROCEDURES = "Response Procedures"
+    THREAT_PLAYBOOKS = ("Ransomware", "Phishing Attack", "Data Breach")
+    
     def __init__(self):
         self.system_prompt = self._load_system_prompt()
+        self.classifier = RequestClassifier(margin=settings.GUARDRAIL_ESCALATION_MARGIN)
     
     def _load_system_prompt(self) -> str:
         """Load the base system prompt for IR plan generation"""
@@ -97,11 +134,12 @@ Remember: This plan should be immediately usable by a non-technical person durin
         concerns = data.mainConcerns
         security_lead = data.securityLead
         
-        # Build contextualized prompt
+        # Build contextualized prompt. The system prompt is the static prefix; here
+        # fields shared by many companies come first and the company name last,
+        # so similar profiles share a longer cacheable prefix.
         user_prompt = f"""Generate a customized Incident Response Plan with the following context:
 
-**Company Details:**
-- Name: {company_name}
+**Company Profile:**
 - Industry: {industry.title()}
 - Size: {employee_count} employees
 
@@ -119,11 +157,50 @@ Remember: This plan should be immediately usable by a non-technical person durin
 **Security Lead:**
 {self._format_security_lead(security_lead)}
 
+**Company Name:** {company_name}
+
 Please generate a comprehensive IR plan tailored to this specific business. Focus especially on their stated concerns: {', '.join(concerns)}.
 """
         
         return user_prompt
     
+    def plan_parts(self, exclude: Sequence[str] = ()) -> List[Tuple[str, Optional[str]]]:
+        """(section, playbook) pairs generated separately, in plan order.
+        
+        Response Procedures is split into one part per threat playbook.
+        """
+        parts = []
+        for section in self.PLAN_SECTIONS:
+            if section in exclude:
+                continue
+            if section == self.RESPONSE_PROCEDURES:
+                parts.extend((section, playbook) for playbook in self.THREAT_PLAYBOOKS)
+            else:
+                parts.append((section, None))
+        return parts
+    
+    def section_heading(self, section: str) -> str:
+        return f"## {self.PLAN_SECTIONS.index(section) + 1}. {section}"
+    
+    def section_instruction(self, section: str, playbook: Optional[str] = None) -> str:
+        """Appended to the user prompt to ask for one section or threat playbook only"""
+        if playbook:
+            return f"""
+Write ONLY the "### {playbook}" playbook of section "{self.section_heading(section)}" (Detection, Containment, Eradication, Recovery), following the Output Structure. Start with that heading and do not write any other part of the plan.
+"""
+        return f"""
+Write ONLY section "{self.section_heading(section)}" of the plan, following the Output Structure. Start with that heading and do not write any other section.
+"""
+    
+    def skip_sections_instruction(self, sections: Sequence[str]) -> str:
+        """Appended to the user prompt when `sections` are rendered locally"""
+        if not sections:
+            return ""
+        headings = ", ".join(f'"{self.section_heading(section)}"' for section in sections)
+        return f"""
+Do NOT write sections {headings}: they are added separately from the onboarding data. Keep the numbering of the other sections.
+"""
+    
     def _format_security_lead(self, lead: SecurityLead) -> str:
         if lead.type == 'dedicated':
             return f"Dedicated IT person: {lead.name or '[Name]'}"
@@ -134,13 +211,63 @@ Please generate a comprehensive IR plan tailored to this specific business. Focu
         else:
             return "No designated security lead (will need to assign one)"
     
-    def apply_guardrails(self, prompt: str) -> str:
-        """Apply query classification and safety guardrails"""
-        
-        # Query classification (ensure this is a legit IR plan request)
-        classification_prompt = f"""Classify this request:
+    def apply_guardrails(self, prompt: str, data: Optional[OnboardingData] = None) -> str:
+        """Apply query classification and safety guardrails (local classifier only)
+
+        Raises GuardrailViolation for an INVALID request. An AMBIGUOUS one is let
+        through: escalating needs an LLM call, see apply_guardrails_async.
+        """
+        classification = self._classify(prompt, data)
+        if classification.label == AMBIGUOUS:
+            logger.info(f"Ambiguous request accepted without escalation (margin {classification.margin:.3f})")
+        return prompt
+
+    async def apply_guardrails_async(
+        self, prompt: str, data: Optional[OnboardingData] = None, llm_client=None
+    ) -> str:
+        """apply_guardrails, asking llm_client's classify model about ambiguous requests
+
+        If the classify call fails the request is let through: the local screen has
+        already rejected the clear cases.
+        """
+        classification = self._classify(prompt, data)
+        if classification.label != AMBIGUOUS or llm_client is None:
+            return prompt
+
+        try:
+            answer = await llm_client.complete(
+                "classify",
+                system_prompt="You screen requests sent to an incident response plan generator.",
+                user_prompt=self.classification_prompt(request_text(data) if data else prompt),
+                call_site="guardrails",
+            )
+        except Exception as e:
+            logger.warning(f"Request classification failed, accepting the request: {e}")
+            GUARDRAIL_CLASSIFICATIONS.inc(label=VALID, source="llm_error")
+            return prompt
+
+        label = INVALID if answer.strip().upper().startswith(INVALID) else VALID
+        GUARDRAIL_CLASSIFICATIONS.inc(label=label, source="llm")
+        if label == INVALID:
+            raise GuardrailViolation("Request rejected: it is not a request for an incident response plan")
+        return prompt
+
+    def _classify(self, prompt: str, data: Optional[OnboardingData]) -> Classification:
+        """Local classification; raises GuardrailViolation for INVALID requests"""
+        text = request_text(data) if data else prompt
+        classification = self.classifier.classify(text, data)
+        GUARDRAIL_CLASSIFICATIONS.inc(label=classification.label, source=classification.source)
+        if classification.label == INVALID:
+            logger.warning(f"Request rejected by {classification.source} ({classification.reason or classification.margin})")
+            raise GuardrailViolation("Request rejected: it is not a request for an incident response plan")
+        return classification
+
+    @staticmethod
+    def classification_prompt(request: str) -> str:
+        """Prompt for the classify model (VALID/INVALID answer)"""
+        return f"""Classify this request:
         
-Request: {prompt}
+Request: {request}
 
 Is this a legitimate request for an Incident Response Plan? Respond with ONLY 'VALID' or 'INVALID'.
 
@@ -153,9 +280,3 @@ Valid examples:
 - Generate IR plan
 - Create incident response documentation
 """
-        
-        # In practice, you'd call OpenAI here to classify
-        # For now, assume valid (we'll add actual classification later)
-        
-        
-        return prompt
\ No newline at end of file
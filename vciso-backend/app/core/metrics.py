@@ -0,0 +1,253 @@
+# vciso-backend/app/core/metrics.py
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# metrics.py - In-process metrics registry
+# Counters and histograms for LLM usage, cost, latency, retries, caches and
+# vector/embedding calls, exposed at /metrics in the Prometheus text format
+# (or JSON) for dashboards and capacity planning.
+
+# How the code works:
+# 1. MetricsRegistry creates named Counter and Histogram metrics. Each metric keeps
+#    one value (or bucket array) per combination of label values.
+# 2. Instrumented code calls e.g. LLM_TOKENS.inc(120, model=..., call_site=..., ...).
+# 3. The "endpoint" label comes from current_endpoint, a context variable set per
+#    HTTP request (to the matched route's template) by an app-wide dependency in
+#    main.py, so deep code does not need it passed in.
+# 4. render_prometheus() and snapshot() read everything out for the /metrics endpoint.
+
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="none")
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str], lock: threading.Lock):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = lock
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{self._format_labels(key)} {value:g}" for key, value in sorted(self._values.items())]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [
+            {"labels": dict(zip(self.labelnames, key)), "value": value}
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values per label set, in cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(*args)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[LabelKey, Dict[str, Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][idx] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of the with-block in seconds (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series["count"] if series else 0
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """
+        Upper bound of the bucket containing the q-th quantile. Like Prometheus,
+        values beyond the last bucket report the highest finite bound.
+        """
+        series = self._series.get(self._key(labels))
+        if not series or not series["count"]:
+            return None
+        target = q * series["count"]
+        cumulative = 0
+        for bound, count in zip(self.buckets[:-1], series["counts"]):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return self.buckets[-2] if len(self.buckets) > 1 else None
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {series['sum']:g}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {series['count']}")
+        return lines
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "labels": dict(zip(self.labelnames, key)),
+                "count": series["count"],
+                "sum": series["sum"],
+                "p50": self.quantile(0.5, **dict(zip(self.labelnames, key))),
+                "p95": self.quantile(0.95, **dict(zip(self.labelnames, key))),
+            }
+            for key, series in sorted(self._series.items())
+        ]
+
+
+class MetricsRegistry:
+    """Holds every metric of the process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def _register(self, cls, name, help_text, labelnames, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, help_text, labelnames, self._lock, **kwargs)
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} is already registered with a different type or labels")
+        return metric
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for metric in self._metrics.values():
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def reset(self):
+        """Clear all recorded values (metric definitions stay registered)"""
+        with self._lock:
+            for metric in self._metrics.values():
+                if isinstance(metric, Counter):
+                    metric._values.clear()
+                else:
+                    metric._series.clear()
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("endpoint", "method", "status")
+)
+LLM_REQUEST_DURATION = registry.histogram(
+    "llm_request_duration_seconds", "LLM call latency, including rate-limit waits and retries",
+    ("endpoint", "model", "call_site")
+)
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "LLM tokens by direction (input, cached_input, output)",
+    ("endpoint", "model", "call_site", "direction")
+)
+LLM_COST = registry.counter(
+    "llm_cost_usd_total", "Estimated LLM cost in USD", ("endpoint", "model", "call_site")
+)
+LLM_REQUESTS = registry.counter(
+    "llm_requests_total", "LLM calls by outcome (success, error, cancelled)",
+    ("endpoint", "model", "call_site", "outcome")
+)
+LLM_ESCALATIONS = registry.counter(
+    "llm_escalations_total", "Calls repeated on the escalation model after failing validation",
+    ("call_site", "model", "escalation_model")
+)
+API_RETRIES = registry.counter(
+    "openai_retries_total", "Retried OpenAI requests by limiter and reason", ("limiter", "reason")
+)
+CACHE_LOOKUPS = registry.counter(
+    "plan_cache_lookups_total", "Plan cache lookups by cache and result", ("cache", "result")
+)
+GUARDRAIL_CLASSIFICATIONS = registry.counter(
+    "guardrail_classifications_total", "Plan request classifications by label and deciding stage",
+    ("label", "source")
+)
+EMBEDDING_DURATION = registry.histogram(
+    "embedding_request_duration_seconds", "Embedding request latency", ("endpoint", "model")
+)
+EMBEDDING_TOKENS = registry.counter(
+    "embedding_tokens_total", "Estimated tokens sent for embedding", ("endpoint", "model")
+)
+VECTOR_DB_DURATION = registry.histogram(
+    "vector_db_request_duration_seconds", "Vector database call latency", ("endpoint", "operation")
+)
@@ -0,0 +1,101 @@
+# vciso-backend/app/core/plan_cache.py
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.core.metrics import CACHE_LOOKUPS
+from app.models.plan import OnboardingData
+
+# plan_cache.py - Exact-match cache for generated IR plans
+# Retries, double-clicks and demo companies submit the same onboarding data over
+# and over. Each submission would otherwise cost a full LLM generation.
+
+# How the code works:
+# 1. plan_cache_key normalizes OnboardingData (strings trimmed and case folded,
+#    lists sorted) and hashes it together with everything else that shapes the
+#    output: model, temperature and prompt version.
+# 2. PlanCache is a bounded LRU map from key to the redacted plan Markdown.
+#    Entries expire after ttl_seconds; the least recently used entry is evicted
+#    once max_entries is reached.
+# 3. Only the plan text is cached. Metadata (timestamps) is rebuilt per request.
+
+
+def _normalize(value: Any) -> Any:
+    """Canonical form of a model value: trimmed, case-folded strings and sorted lists"""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = [_normalize(item) for item in value]
+        # Drop blanks and duplicates; order of checkbox selections is irrelevant
+        return sorted({json.dumps(item, sort_keys=True) for item in items if item not in ("", None)})
+    return value
+
+
+def plan_cache_key(
+    data: OnboardingData,
+    model: str,
+    temperature: float,
+    prompt_version: str
+) -> str:
+    """SHA-256 of the normalized onboarding data and generation settings"""
+    payload = {
+        "data": _normalize(data.model_dump()),
+        "model": model,
+        "temperature": temperature,
+        "prompt_version": prompt_version,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """Bounded in-memory LRU cache with a per-entry TTL"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            CACHE_LOOKUPS.inc(cache="exact", result="miss")
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        CACHE_LOOKUPS.inc(cache="exact", result="hit")
+        return entry[1]
+
+    def set(self, key: str, value: str):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,223 @@
+# vciso-backend/app/core/plan_templates.py
+import re
+from string import Template
+from typing import Dict, List, Optional, Sequence
+from app.models.plan import OnboardingData, SecurityLead
+
+# plan_templates.py - Local rendering of the deterministic plan sections
+# The Incident Response Team and the Appendices are a re-rendering of the onboarding
+# data (security lead, tools, industry), yet the LLM spent hundreds of output tokens
+# writing them. They are now rendered here and merged with the LLM's sections.
+
+# How the code works:
+# 1. PlanTemplateEngine.render_sections returns the Markdown body of each local
+#    section: the team built from SecurityLead, and appendices with vendor contact
+#    placeholders, the tool inventory and the industry's compliance requirements.
+# 2. The compliance fragments are compiled once per industry at import; rendering
+#    only substitutes the company name.
+# 3. The LLM is told not to write the local sections. SectionMerger then walks the
+#    LLM Markdown line by line, inserts each local section before the first later
+#    section heading, and drops any local section the LLM wrote anyway. It accepts
+#    text in arbitrary chunks and only holds back lines that start with "## " until
+#    they are complete, so the streaming endpoint merges while text is arriving.
+
+LOCAL_SECTIONS = ("Incident Response Team", "Appendices")
+
+_COMPLIANCE_FRAGMENTS = {
+    "healthcare": """- **HIPAA Breach Notification Rule:** notify affected individuals within 60 days of discovering a breach of protected health information (PHI).
+- **HHS Office for Civil Rights:** report breaches affecting 500+ people within 60 days (and notify prominent media in the affected state); log smaller breaches for the annual report.
+- **Business associates:** review Business Associate Agreements for vendor notification duties.
+- **State laws:** check breach notification laws in every state where $company's patients live.""",
+    "finance": """- **GLBA Safeguards Rule:** notify the FTC within 30 days of discovering unauthorized access to unencrypted data of 500+ customers.
+- **Regulators:** banks and credit unions must notify their primary federal regulator within 36 hours of a significant incident.
+- **SEC:** public companies disclose material incidents on Form 8-K within 4 business days.
+- **PCI DSS:** if $company processes cards, notify the card brands and acquiring bank immediately.
+- **State laws:** check breach notification laws in every state where customers live.""",
+    "retail": """- **PCI DSS:** if card data may be exposed, notify the acquiring bank and card brands immediately and preserve evidence for a forensic investigator (PFI).
+- **State laws:** notify affected customers under the breach notification law of each state where they live (often within 30-60 days).
+- **FTC Act:** public privacy and security statements by $company must stay accurate after an incident.""",
+    "manufacturing": """- **DFARS 252.204-7012:** defense contractors report cyber incidents to the DoD within 72 hours and keep images of affected systems for 90 days.
+- **CMMC / NIST SP 800-171:** incidents involving Controlled Unclassified Information (CUI) must follow the documented incident handling capability.
+- **CISA:** critical infrastructure operators should report significant incidents to CISA.
+- **State laws:** check breach notification laws for employee and customer personal data.""",
+    "tech": """- **State laws:** notify affected customers under the breach notification law of each state where they live.
+- **GDPR:** if $company holds data of EU residents, notify the supervisory authority within 72 hours.
+- **Customer contracts:** SOC 2 commitments and data processing agreements often require notice within 24-72 hours.
+- **SEC:** public companies disclose material incidents on Form 8-K within 4 business days.""",
+    "services": """- **State laws:** notify affected clients under the breach notification law of each state where they live.
+- **Client contracts:** engagement letters and data processing agreements often set notification deadlines.
+- **Professional rules:** legal, accounting and other licensed practices may have confidentiality and notification duties to clients.""",
+    "other": """- **State laws:** notify affected individuals under the breach notification law of each state where they live.
+- **Contracts:** check customer and partner contracts for notification deadlines.
+- **Law enforcement:** report extortion and fraud to the FBI (IC3) or local law enforcement.""",
+}
+
+# Compiled once; rendering only substitutes the company name
+COMPLIANCE_TEMPLATES: Dict[str, Template] = {
+    industry: Template(fragment) for industry, fragment in _COMPLIANCE_FRAGMENTS.items()
+}
+
+_TOOL_CATEGORIES = (
+    ("email", "Email"),
+    ("storage", "File Storage"),
+    ("communication", "Communication"),
+    ("crm", "CRM"),
+)
+
+_HEADING = re.compile(r"^##(?!#)\s*(?:\d+\.\s*)?(.+?)\s*$")
+
+
+class PlanTemplateEngine:
+    """Render the plan sections that follow directly from the onboarding data"""
+
+    def render_sections(self, data: OnboardingData) -> Dict[str, str]:
+        """Markdown body (without heading) of each local section"""
+        return {
+            "Incident Response Team": self.render_team(data.securityLead),
+            "Appendices": self.render_appendices(data),
+        }
+
+    def render_team(self, lead: SecurityLead) -> str:
+        if lead.type == "dedicated":
+            incident_lead = f"- **Incident Lead:** {lead.name or '[Name]'}, dedicated IT person (phone: [PHONE], email: [EMAIL])"
+            support = "- **Backup Lead:** [Name] (phone: [PHONE])"
+        elif lead.type == "consultant":
+            incident_lead = "- **Incident Lead:** External IT consultant, [Firm] (phone: [PHONE], email: [EMAIL])"
+            support = "- **Internal Coordinator:** [Name], gives the consultant access and makes business decisions (phone: [PHONE])"
+        elif lead.type == "owner":
+            incident_lead = "- **Incident Lead:** CEO/Business Owner (phone: [PHONE], email: [EMAIL])"
+            support = "- **Technical Support:** IT provider or consultant, [Firm] (phone: [PHONE])"
+        else:
+            incident_lead = "- **Incident Lead:** Not yet assigned. Assign one within 30 days; until then the CEO/Business Owner leads (phone: [PHONE])"
+            support = "- **Technical Support:** IT provider or consultant, [Firm] (phone: [PHONE])"
+
+        return "\n".join([
+            incident_lead,
+            support,
+            "- **Executive Sponsor:** CEO/Business Owner, approves spending and external notifications (phone: [PHONE])",
+            "- **Legal Counsel:** [Firm] (phone: [PHONE])",
+            "- **Cyber Insurance:** [Carrier], policy [Number], claims hotline [PHONE]",
+            "",
+            "Keep a printed copy of these contacts: email and chat may be unavailable during an incident.",
+        ])
+
+    def render_appendices(self, data: OnboardingData) -> str:
+        lines = ["### Vendor Contacts"]
+        lines.append("- **IT Support:** [Firm] (phone: [PHONE], email: [EMAIL])")
+        lines.append("- **Cybersecurity Consultant / Incident Response Retainer:** [Firm] (phone: [PHONE])")
+        lines.extend(f"- **{tool} Support:** [Support URL] (account ID: [ID])" for tool in self._all_tools(data))
+
+        lines.extend(["", "### Tool Inventory", "| Category | Tools | Administrator |", "|---|---|---|"])
+        for field, label in _TOOL_CATEGORIES:
+            tools = getattr(data.tools, field)
+            if tools:
+                lines.append(f"| {label} | {', '.join(tools)} | [Name] |")
+
+        lines.extend(["", "### Legal/Compliance Requirements", self.render_compliance(data)])
+        return "\n".join(lines)
+
+    def render_compliance(self, data: OnboardingData) -> str:
+        industry = data.industry.strip().lower()
+        template = COMPLIANCE_TEMPLATES.get(industry, COMPLIANCE_TEMPLATES["other"])
+        return template.safe_substitute(company=data.companyName)
+
+    @staticmethod
+    def _all_tools(data: OnboardingData) -> List[str]:
+        seen = []
+        for field, _ in _TOOL_CATEGORIES:
+            for tool in getattr(data.tools, field):
+                if tool not in seen:
+                    seen.append(tool)
+        return seen
+
+
+class SectionMerger:
+    """Merge locally rendered sections into LLM Markdown, one line at a time
+
+    sections: every "## N." section title in outline order
+    headings: section title -> heading line written for local sections
+    local: section title -> Markdown body rendered locally
+    """
+
+    def __init__(self, sections: Sequence[str], headings: Dict[str, str], local: Dict[str, str]):
+        self.sections = list(sections)
+        self.headings = headings
+        self.pending = [section for section in self.sections if section in local]
+        self.local = local
+        self.skipping = False
+        self.ends_with_newline = True
+        # Start of the current line while it may still be a "## " heading
+        self._line = ""
+        self._in_text_line = False
+
+    def feed(self, text: str) -> str:
+        """Text to emit for the next chunk of LLM output"""
+        out = []
+        while text:
+            newline = text.find("\n")
+            piece, text = (text, "") if newline < 0 else (text[:newline + 1], text[newline + 1:])
+            ends_line = newline >= 0
+            if self._in_text_line:
+                out.append(self._text(piece))
+                self._in_text_line = not ends_line
+                continue
+            self._line += piece
+            if ends_line:
+                out.append(self._feed_line(self._line))
+                self._line = ""
+            elif not "## ".startswith(self._line[:3]):
+                # Cannot be a heading: pass the line through as it arrives
+                out.append(self._text(self._line))
+                self._line = ""
+                self._in_text_line = True
+        return "".join(out)
+
+    def _text(self, text: str) -> str:
+        """Part of a line that is not a "## " heading"""
+        return "" if self.skipping else self._emit(text)
+
+    def _feed_line(self, line: str) -> str:
+        """Text to emit for one complete line that may be a heading"""
+        section = self._section_of(line)
+        if section is not None:
+            index = self.sections.index(section)
+            out = self._flush(lambda s: self.sections.index(s) < index)
+            self.skipping = section in self.local
+            if self.skipping:
+                # The LLM wrote a local section anyway: ours replaces it
+                out += self._flush(lambda s: s == section)
+                return out
+            return self._emit(out + line)
+        if line.startswith("## "):
+            self.skipping = False
+        return "" if self.skipping else self._emit(line)
+
+    def close(self) -> str:
+        """The held line, then local sections that no later LLM heading has placed yet"""
+        out = self._feed_line(self._line) if self._line else ""
+        self._line = ""
+        return out + self._flush(lambda s: True)
+
+    def merge(self, markdown: str) -> str:
+        return self.feed(markdown) + self.close()
+
+    def _section_of(self, line: str) -> Optional[str]:
+        match = _HEADING.match(line)
+        if not match:
+            return None
+        title = match.group(1)
+        return next((s for s in self.sections if title.startswith(s)), None)
+
+    def _flush(self, predicate) -> str:
+        ready = [s for s in self.pending if predicate(s)]
+        if not ready:
+            return ""
+        self.pending = [s for s in self.pending if s not in ready]
+        text = "" if self.ends_with_newline else "\n"
+        text += "".join(f"{self.headings[s]}\n{self.local[s]}\n\n" for s in ready)
+        return self._emit(text)
+
+    def _emit(self, text: str) -> str:
+        if text:
+            self.ends_with_newline = text.endswith("\n")
+        return text
@@ -0,0 +1,44 @@
+# vciso-backend/app/core/pricing.py
+from typing import Dict
+from app.config import settings
+
+# pricing.py - Per-model token prices for cost estimates
+# Prices are USD per 1M tokens: "input", "cached_input" (prompt cache hits) and
+# "output". Override or add models with the MODEL_PRICING setting, e.g.
+# MODEL_PRICING='{"gpt-4o": {"input": 2.5, "cached_input": 1.25, "output": 10}}'.
+# A model uses the entry with the longest matching name prefix, so
+# "gpt-4o-2024-08-06" is priced as "gpt-4o" and "gpt-4o-mini" as "gpt-4o-mini".
+
+# OpenAI list prices (as of 2025)
+DEFAULT_MODEL_PRICING: Dict[str, Dict[str, float]] = {
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "gpt-4.1": {"input": 2.00, "cached_input": 0.50, "output": 8.00},
+    "gpt-4.1-mini": {"input": 0.40, "cached_input": 0.10, "output": 1.60},
+    "gpt-4": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-3.5": {"input": 0.50, "cached_input": 0.50, "output": 1.50},  # No prompt caching discount
+    "text-embedding-3-small": {"input": 0.02, "cached_input": 0.02, "output": 0.0},
+    "text-embedding-3-large": {"input": 0.13, "cached_input": 0.13, "output": 0.0},
+    # Unknown models are priced like GPT-4o
+    "default": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+}
+
+
+def get_model_pricing(model: str) -> Dict[str, float]:
+    """Prices for a model: settings.MODEL_PRICING overrides the defaults"""
+    table = {**DEFAULT_MODEL_PRICING, **settings.MODEL_PRICING}
+    model = model.lower()
+    matches = [name for name in table if name != "default" and model.startswith(name.lower())]
+    pricing = table[max(matches, key=len)] if matches else table["default"]
+    # Overrides may omit cached_input when the model has no caching discount
+    return {"cached_input": pricing.get("input", 0.0), "output": 0.0, **pricing}
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+    """Cost in USD; cached_tokens (part of input_tokens) are billed at the cached-input rate"""
+    pricing = get_model_pricing(model)
+    return (
+        (input_tokens - cached_tokens) / 1_000_000 * pricing["input"]
+        + cached_tokens / 1_000_000 * pricing["cached_input"]
+        + output_tokens / 1_000_000 * pricing["output"]
+    )
@@ -0,0 +1,211 @@
+# vciso-backend/app/core/rate_limiter.py
+import asyncio
+import logging
+import random
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from app.config import settings
+from app.core.metrics import API_RETRIES
+from app.core.tokenizer import count_message_tokens, count_tokens
+
+# rate_limiter.py - Process-wide request and token rate limiting for OpenAI calls
+# OpenAI enforces requests-per-minute (RPM) and tokens-per-minute (TPM) quotas per
+# model. Without coordination, a burst of gap analyses overshoots both, and the
+# resulting 429s turn into failed requests.
+
+# How the code works:
+# 1. Each model gets one RateLimiter, shared by every client in the process
+#    (get_rate_limiter). It holds a token bucket for requests and one for tokens,
+#    refilled continuously at the configured per-minute limits.
+# 2. Before a call, its token cost is estimated with tiktoken. Like OpenAI's own
+#    accounting, chat calls are charged prompt tokens plus max_tokens.
+# 3. acquire() admits callers strictly in arrival order (asyncio.Lock is FIFO),
+#    sleeping until both buckets can cover the call.
+# 4. After each response, the x-ratelimit-remaining-* headers resync the buckets
+#    with the server's view, which includes traffic from other processes.
+# 5. On a 429 every caller pauses for Retry-After (or an exponential backoff with
+#    full jitter), then the call is retried. Connection errors and 5xx responses
+#    are retried with the same backoff.
+
+logger = logging.getLogger(__name__)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+_RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse OpenAI reset durations like "1s", "6m0s" or "20ms" into seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def estimate_chat_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Tokens OpenAI charges against TPM for a chat call: prompt plus max_tokens"""
+    return count_message_tokens(messages) + max_tokens
+
+
+def estimate_embedding_tokens(texts: Iterable[str]) -> int:
+    return sum(count_tokens(text) for text in texts)
+
+
+class TokenBucket:
+    """Continuously refilled bucket; a large request may drive the level negative"""
+
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.rate = per_minute / 60.0
+        # Keep bursts short so throughput stays steady instead of spiking
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (requests above capacity wait for a full bucket)"""
+        self.refill(now)
+        shortfall = min(amount, self.capacity) - self.level
+        return max(shortfall, 0.0) / self.rate
+
+    def consume(self, amount: float):
+        self.level -= amount
+
+    def resync(self, remaining: float, now: float):
+        """Never believe we have more quota left than the server says"""
+        self.refill(now)
+        self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """Shared RPM/TPM limiter with fair queueing and 429 backoff"""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        headroom: float = 0.9,
+        burst_seconds: float = 10.0,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0
+    ):
+        self.name = name
+        # Aim just under the quota: requests from other processes share it too
+        self.requests = TokenBucket(requests_per_minute * headroom, burst_seconds) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute * headroom, burst_seconds) if tokens_per_minute > 0 else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = asyncio.Lock()
+        self._paused_until = 0.0
+
+    async def acquire(self, tokens: int):
+        """Wait for capacity for one request costing `tokens`, in arrival order"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if self.requests:
+                    wait = max(wait, self.requests.wait_time(1, now))
+                if self.tokens:
+                    wait = max(wait, self.tokens.wait_time(tokens, now))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            if self.requests:
+                self.requests.consume(1)
+            if self.tokens:
+                self.tokens.consume(tokens)
+
+    def would_wait(self, tokens: int) -> bool:
+        """True if a request costing `tokens` could not be sent right now"""
+        now = time.monotonic()
+        if self._lock.locked() or self._paused_until > now:
+            return True
+        if self.requests and self.requests.wait_time(1, now) > 0:
+            return True
+        return bool(self.tokens and self.tokens.wait_time(tokens, now) > 0)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Resync the buckets from x-ratelimit-remaining-* response headers"""
+        now = time.monotonic()
+        for bucket, header in (
+            (self.requests, "x-ratelimit-remaining-requests"),
+            (self.tokens, "x-ratelimit-remaining-tokens"),
+        ):
+            value = headers.get(header)
+            if bucket and value is not None:
+                try:
+                    bucket.resync(float(value), now)
+                except ValueError:
+                    pass
+
+    def backoff_delay(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+        """Retry-After when the server gives one, else exponential backoff with full jitter"""
+        if headers:
+            retry_after = parse_duration(headers.get("retry-after-ms"))
+            if retry_after is not None:
+                return retry_after / 1000
+            retry_after = parse_duration(headers.get("retry-after"))
+            if retry_after is not None:
+                return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def call(self, request: Callable[[], Awaitable[Any]], tokens: int) -> Any:
+        """
+        Run `request` (a with_raw_response call) under the limiter.
+        Returns the raw response; retries 429s, connection errors and 5xx responses.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(tokens)
+            try:
+                raw = await request()
+            except _RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                API_RETRIES.inc(limiter=self.name, reason=type(e).__name__)
+                response = getattr(e, "response", None)
+                delay = self.backoff_delay(attempt, response.headers if response is not None else None)
+                if isinstance(e, RateLimitError):
+                    # Everyone waits: more requests now would only extend the throttling
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    logger.warning(f"{self.name}: rate limited, pausing {delay:.2f}s (attempt {attempt + 1})")
+                else:
+                    logger.warning(f"{self.name}: {type(e).__name__}, retrying in {delay:.2f}s (attempt {attempt + 1})")
+                    await asyncio.sleep(delay)
+                continue
+
+            self.update_from_headers(raw.headers)
+            return raw
+
+
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(name: str, requests_per_minute: int, tokens_per_minute: int) -> RateLimiter:
+    """Process-wide limiter for `name` (one per model), created on first use"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = RateLimiter(
+            name,
+            requests_per_minute,
+            tokens_per_minute,
+            headroom=settings.OPENAI_RATE_LIMIT_HEADROOM,
+            max_retries=settings.OPENAI_MAX_RETRIES,
+        )
+        _limiters[name] = limiter
+    return limiter
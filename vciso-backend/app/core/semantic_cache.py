@@ -0,0 +1,204 @@
+# vciso-backend/app/core/semantic_cache.py
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.metrics import CACHE_LOOKUPS
+from app.models.plan import OnboardingData
+
+# semantic_cache.py - Similarity cache for generated IR plans
+# Most small-business submissions differ only in company name and a tool or two.
+# Their plans would be nearly identical, so a plan generated for one profile can be
+# reused for a close match after swapping in the new company's details.
+
+# How the code works:
+# 1. profile_fingerprint describes the parts of OnboardingData that shape a plan
+#    (industry, size band, tools, concerns, security lead type) and leaves out
+#    anything company-specific (names). The caller embeds this text.
+# 2. SemanticPlanCache stores (embedding, plan, source profile) entries. A lookup
+#    compares the query embedding against entries with the same industry, lead type
+#    and tool set (these change compliance duties, team structure and the
+#    tool-specific steps, so never cross them) and returns the best match above the
+#    similarity threshold.
+# 3. add() stores the plan as a template: plan_template swaps the source company and
+#    lead names (case-sensitive, whole words) for placeholders. A name that the plan
+#    also uses as an ordinary word ("Target", "Response", "Will") cannot be swapped
+#    safely, so such a plan is not cached and never served to another company.
+# 4. personalize_plan fills the placeholders with the new company's names (a neutral
+#    role when the new company did not name its lead).
+# 5. Hit rate and the LLM time saved by hits are tracked for reporting.
+
+# Stands in for the source's security lead when the target did not name one
+UNNAMED_LEAD = "the security lead"
+
+# Placeholders a cached plan holds instead of the source's names
+COMPANY_PLACEHOLDER = "{{company_name}}"
+LEAD_PLACEHOLDER = "{{security_lead}}"
+_PLACEHOLDER = re.compile(r"\{\{(company_name|security_lead)\}\}")
+
+
+def profile_fingerprint(data: OnboardingData) -> str:
+    """Company-agnostic description of an onboarding profile"""
+
+    def items(values: List[str]) -> str:
+        return ", ".join(sorted({v.strip().lower() for v in values if v.strip()})) or "none"
+
+    tools = data.tools
+    return "\n".join([
+        f"Industry: {data.industry.strip().lower()}",
+        f"Employees: {data.employeeCount.strip()}",
+        f"Email: {items(tools.email)}",
+        f"Storage: {items(tools.storage)}",
+        f"Communication: {items(tools.communication)}",
+        f"CRM: {items(tools.crm)}",
+        f"Current security: {items(data.currentSecurity)}",
+        f"Concerns: {items(data.mainConcerns)}",
+        f"Security lead: {data.securityLead.type.strip().lower()}",
+    ])
+
+
+def _whole_word(name: str, flags: int = 0) -> "re.Pattern":
+    return re.compile(rf"(?<!\w){re.escape(name)}(?!\w)", flags)
+
+
+def _is_ordinary_word(name: str, markdown: str) -> bool:
+    """The plan uses the name as a word, not only as the name: with other casing or in a section heading"""
+    if any(match.group() != name for match in _whole_word(name, re.IGNORECASE).finditer(markdown)):
+        return True
+    headings = [line for line in markdown.splitlines() if line.lstrip().startswith("##")]
+    return any(_whole_word(name).search(line) for line in headings)
+
+
+def plan_template(markdown: str, source: OnboardingData) -> Optional[str]:
+    """The plan with the source's names replaced by placeholders, or None when that is not safe"""
+    if _PLACEHOLDER.search(markdown):
+        return None
+    names = [(source.companyName.strip(), COMPANY_PLACEHOLDER)]
+    if source.securityLead.name and source.securityLead.name.strip():
+        names.append((source.securityLead.name.strip(), LEAD_PLACEHOLDER))
+
+    # Longest first, so a name containing the other is replaced whole
+    for name, placeholder in sorted(names, key=lambda item: len(item[0]), reverse=True):
+        if _is_ordinary_word(name, markdown):
+            return None
+        markdown = _whole_word(name).sub(lambda _: placeholder, markdown)
+    return markdown
+
+
+def personalize_plan(template: str, target: OnboardingData) -> str:
+    """Fill a plan_template with `target`'s names"""
+    values = {
+        "company_name": target.companyName.strip(),
+        "security_lead": (target.securityLead.name or "").strip() or UNNAMED_LEAD,
+    }
+    return _PLACEHOLDER.sub(lambda match: values[match.group(1)], template)
+
+
+@dataclass
+class SemanticCacheEntry:
+    embedding: np.ndarray
+    markdown: str  # plan_template of the plan
+    source: OnboardingData
+    generation_seconds: float
+    expires_at: float
+
+
+class SemanticPlanCache:
+    """In-memory nearest-neighbour cache of plans keyed by profile embeddings"""
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 256, ttl_seconds: float = 3600):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._entries: Deque[SemanticCacheEntry] = deque(maxlen=max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(
+        self, data: OnboardingData, embedding: List[float]
+    ) -> Optional[Tuple[SemanticCacheEntry, float]]:
+        """Best (entry, cosine similarity) above the threshold, or None"""
+        now = time.monotonic()
+        while self._entries and self._entries[0].expires_at <= now:
+            self._entries.popleft()
+
+        candidates = [
+            entry for entry in self._entries
+            if self._same_segment(entry.source, data)
+        ]
+        match = None
+        if candidates:
+            query = self._unit(embedding)
+            scores = np.stack([entry.embedding for entry in candidates]) @ query
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                match = candidates[best], float(scores[best])
+
+        if match is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        CACHE_LOOKUPS.inc(cache="semantic", result="miss" if match is None else "hit")
+        return match
+
+    def add(
+        self,
+        data: OnboardingData,
+        embedding: List[float],
+        markdown: str,
+        generation_seconds: float
+    ):
+        if self._entries.maxlen == 0:
+            return
+        template = plan_template(markdown, data)
+        if template is None:
+            return
+        self._entries.append(SemanticCacheEntry(
+            embedding=self._unit(embedding),
+            markdown=template,
+            source=data,
+            generation_seconds=generation_seconds,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        ))
+
+    def record_savings(self, seconds: float):
+        self.saved_seconds += max(seconds, 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+    @staticmethod
+    def _same_segment(a: OnboardingData, b: OnboardingData) -> bool:
+        return (
+            a.industry.strip().lower() == b.industry.strip().lower()
+            and a.securityLead.type.strip().lower() == b.securityLead.type.strip().lower()
+            and SemanticPlanCache._tool_set(a) == SemanticPlanCache._tool_set(b)
+        )
+
+    @staticmethod
+    def _tool_set(data: OnboardingData) -> frozenset:
+        """Normalized tool names; plans name the tools and give tool-specific steps"""
+        tools = data.tools
+        return frozenset(
+            tool.strip().lower()
+            for tool in tools.email + tools.storage + tools.communication + tools.crm
+            if tool.strip()
+        )
+
+    @staticmethod
+    def _unit(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
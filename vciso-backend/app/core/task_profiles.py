@@ -0,0 +1,43 @@
+# vciso-backend/app/core/task_profiles.py
+from dataclasses import dataclass
+from app.config import settings
+
+# task_profiles.py - Model routing for LLM calls
+# Plan generation (whole plans, or single sections in parallel mode) needs the large
+# model, but most calls are short structured extractions (gap JSON per plan section,
+# request classification, summaries) that a small, fast model handles at a fraction
+# of the latency and cost.
+
+# How the code works:
+# 1. Each task has a profile in Settings: OPENAI_<TASK>_MODEL, _MAX_TOKENS,
+#    _TEMPERATURE and _INPUT_TOKENS (prompt budget, see token_budget.py).
+# 2. get_task_profile reads the profile when a call is made, so settings patched at
+#    runtime (tests, benchmarks) take effect.
+# 3. OpenAIClient.complete(task, ...) sends the call with the task's profile. If the
+#    caller passes a validator and the output fails it, the call is repeated once on
+#    OPENAI_ESCALATION_MODEL.
+
+TASKS = ("plan", "plan_section", "gap_section", "classify", "summarize")
+
+
+@dataclass(frozen=True)
+class TaskProfile:
+    task: str
+    model: str
+    max_tokens: int
+    temperature: float
+    input_tokens: int
+
+
+def get_task_profile(task: str) -> TaskProfile:
+    """Model, max_tokens, temperature and input budget configured for `task`"""
+    if task not in TASKS:
+        raise ValueError(f"Unknown task profile: {task} (expected one of {', '.join(TASKS)})")
+    prefix = f"OPENAI_{task.upper()}"
+    return TaskProfile(
+        task=task,
+        model=getattr(settings, f"{prefix}_MODEL"),
+        max_tokens=getattr(settings, f"{prefix}_MAX_TOKENS"),
+        temperature=getattr(settings, f"{prefix}_TEMPERATURE"),
+        input_tokens=getattr(settings, f"{prefix}_INPUT_TOKENS"),
+    )
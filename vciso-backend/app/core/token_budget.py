@@ -0,0 +1,98 @@
+# vciso-backend/app/core/token_budget.py
+from typing import Dict, Optional
+from app.config import settings
+from app.core.task_profiles import TaskProfile
+from app.core.tokenizer import count_tokens
+
+# token_budget.py - Token budgets for LLM calls
+# Every call used to reserve a fixed max_tokens whatever it asked for, and prompts
+# built from retrieved guidance or plan sections had no upper bound, so a long plan
+# could overflow the model's context and a short answer still reserved 4000 tokens
+# of rate-limit quota.
+
+# How the code works:
+# 1. Each task profile has an input budget (OPENAI_<TASK>_INPUT_TOKENS). Callers that
+#    build prompts from unbounded inputs trim them to fit first: truncate_to_tokens
+#    shortens text, and the gap analyzer drops its least relevant guidance.
+# 2. completion_budget sets max_tokens for a call: the output the caller expects
+#    (e.g. the number of plan sections requested), capped by the profile's
+#    max_tokens and by what is left of the model's context window.
+# 3. A prompt that still exceeds its budget or the context window raises
+#    TokenBudgetError (a ValueError) before anything is sent.
+# Token counts use the process-wide cached encoder from tokenizer.py.
+
+# Context window per model; like pricing.py, the longest matching name prefix wins
+MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+    "gpt-4.1": 1_047_576,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+    "default": 128_000,
+}
+
+TRUNCATION_MARKER = "\n[... truncated to fit the token budget]"
+
+
+class TokenBudgetError(ValueError):
+    """A prompt does not fit its task's input budget or the model's context window"""
+
+
+def context_window(model: str) -> int:
+    model = model.lower()
+    matches = [name for name in MODEL_CONTEXT_WINDOWS if name != "default" and model.startswith(name)]
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)] if matches else MODEL_CONTEXT_WINDOWS["default"]
+
+
+def completion_budget(
+    profile: TaskProfile,
+    prompt_tokens: int,
+    expected_output_tokens: Optional[int] = None,
+    model: Optional[str] = None
+) -> int:
+    """max_tokens for a call of `profile` whose prompt has `prompt_tokens`
+
+    model: the model actually called, when it differs from the profile's (escalation)
+    """
+    if prompt_tokens > profile.input_tokens:
+        raise TokenBudgetError(
+            f"{profile.task} prompt has {prompt_tokens} tokens, over its budget of {profile.input_tokens}"
+        )
+
+    max_tokens = profile.max_tokens
+    if expected_output_tokens:
+        max_tokens = min(max_tokens, expected_output_tokens)
+
+    room = context_window(model or profile.model) - prompt_tokens
+    if room < max(1, min(max_tokens, settings.MIN_COMPLETION_TOKENS)):
+        raise TokenBudgetError(
+            f"{profile.task} prompt has {prompt_tokens} tokens, leaving {room} of the "
+            f"{model or profile.model} context window for the answer"
+        )
+    return min(max_tokens, room)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = TRUNCATION_MARKER) -> str:
+    """Longest prefix of text (cut at a line break when possible) that fits in max_tokens, marker included"""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    budget = max_tokens - count_tokens(marker)
+    if budget <= 0:
+        return ""
+
+    # Binary search on the prefix length; works with any encoder, exact or approximate
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+
+    prefix = text[:low]
+    line_end = prefix.rfind("\n")
+    if line_end > len(prefix) // 2:
+        prefix = prefix[:line_end]
+    return prefix.rstrip() + marker
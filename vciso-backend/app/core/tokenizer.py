@@ -0,0 +1,47 @@
+# vciso-backend/app/core/tokenizer.py
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, List
+
+# tokenizer.py - Shared token counting
+# Loading a tiktoken encoding reads (and on first use downloads) its BPE file,
+# so encodings are loaded once per process and reused everywhere.
+# If the encoding cannot be loaded (e.g. no network to fetch the BPE file),
+# an approximate tokenizer is used so counting keeps working.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+class ApproximateEncoding:
+    """Fallback tokenizer: words split into ~4-character pieces plus punctuation"""
+    
+    name = "approximate"
+    _pattern = re.compile(r"\w{1,4}|[^\w\s]")
+    
+    def encode(self, text: str, **kwargs) -> List[str]:
+        return self._pattern.findall(text)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = DEFAULT_ENCODING):
+    """Load a tiktoken encoding once per process"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer {name}, using approximate token counts: {e}")
+        return ApproximateEncoding()
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    """Count tokens in text"""
+    return len(get_encoding(encoding_name).encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Prompt tokens of a chat call"""
+    # ~4 tokens of framing per message, 3 to prime the reply
+    return sum(count_tokens(m["content"]) + 4 for m in messages) + 3
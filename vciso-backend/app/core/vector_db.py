@@ -1,20 +1,67 @@
 # vciso-backend/app/core/vector_db.py
 from pinecone import Pinecone, ServerlessSpec
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
+import asyncio
+import json
 import logging
+import threading
 from app.config import settings
+from app.core.metrics import VECTOR_DB_DURATION, current_endpoint
 
 logger = logging.getLogger(__name__)
 
 class VectorDBService:
-    """Interface for vector database operations (Pinecone)"""
+    """Interface for vector database operations (Pinecone)
+
+    Construction makes no network calls. The client, the index check (creating the
+    index if missing) and the index handle are set up on first use, or ahead of
+    time by connect() during the app's warm-up.
+    """
     
     def __init__(self):
-        self.client = Pinecone(api_key=settings.PINECONE_API_KEY)
         self.index_name = settings.PINECONE_INDEX_NAME
         self.dimension = settings.EMBEDDING_DIMENSION
-        self._ensure_index_exists()
-        self.index = self.client.Index(self.index_name)
+        self.max_batch_bytes = settings.VECTOR_UPSERT_MAX_BYTES
+        self.max_batch_vectors = settings.VECTOR_UPSERT_MAX_BATCH
+        self.upsert_concurrency = settings.VECTOR_UPSERT_CONCURRENCY
+        self._client: Optional[Pinecone] = None
+        self._index = None
+        self._lock = threading.Lock()
+    
+    @property
+    def client(self) -> Pinecone:
+        if self._client is None:
+            # PINECONE_HOST points the client at another control plane (e.g. the
+            # stand-in server); index hosts are then resolved through it
+            self._client = Pinecone(api_key=settings.PINECONE_API_KEY, host=settings.PINECONE_HOST or None)
+        return self._client
+    
+    @property
+    def index(self):
+        """Index handle; the first access checks (or creates) the index"""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._ensure_index_exists()
+                    self._index = self.client.Index(self.index_name)
+        return self._index
+    
+    @index.setter
+    def index(self, index):
+        self._index = index
+    
+    def connect(self):
+        """Set up the index handle and return its stats (blocking; run in a thread)"""
+        with VECTOR_DB_DURATION.time(endpoint=current_endpoint.get(), operation="describe"):
+            return self.index.describe_index_stats()
+    
+    async def _index_call(self, method: str, **kwargs):
+        """Call an index method in a worker thread
+
+        The Pinecone client is synchronous, and the first index access may still
+        have to check or create the index, so neither may run on the event loop.
+        """
+        return await asyncio.to_thread(lambda: getattr(self.index, method)(**kwargs))
     
     def _ensure_index_exists(self):
         """Create index if it doesn't exist"""
@@ -41,6 +88,9 @@ class VectorDBService:
         """
         Insert or update vectors in the index
         
+        Vectors are sent in size-aware batches (see batch_vectors) with up to
+        VECTOR_UPSERT_CONCURRENCY requests in flight.
+        
         vectors format:
         [
             {
@@ -56,13 +106,54 @@ class VectorDBService:
             ...
         ]
         """
+        semaphore = asyncio.Semaphore(self.upsert_concurrency)
+        
+        async def _send(batch: List[Dict[str, Any]]):
+            async with semaphore:
+                await self.upsert_batch(batch)
+        
+        await asyncio.gather(*(_send(batch) for batch in self.batch_vectors(vectors)))
+    
+    async def upsert_batch(self, vectors: List[Dict[str, Any]]):
+        """Send a single upsert request (caller is responsible for batch size)"""
         try:
-            self.index.upsert(vectors=vectors)
+            with VECTOR_DB_DURATION.time(endpoint=current_endpoint.get(), operation="upsert"):
+                await self._index_call("upsert", vectors=vectors)
             logger.info(f"Upserted {len(vectors)} vectors to {self.index_name}")
         except Exception as e:
             logger.error(f"Error upserting vectors: {e}")
             raise
     
+    def batch_vectors(self, vectors: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """Split vectors into batches under the request size and count limits"""
+        batch: List[Dict[str, Any]] = []
+        batch_bytes = 0
+        
+        for vector in vectors:
+            vector_bytes = self.estimate_vector_bytes(vector)
+            if batch and (
+                batch_bytes + vector_bytes > self.max_batch_bytes
+                or len(batch) >= self.max_batch_vectors
+            ):
+                yield batch
+                batch, batch_bytes = [], 0
+            
+            batch.append(vector)
+            batch_bytes += vector_bytes
+        
+        if batch:
+            yield batch
+    
+    @staticmethod
+    def estimate_vector_bytes(vector: Dict[str, Any]) -> int:
+        """Rough serialized size of a vector (JSON floats are ~20 bytes each)"""
+        metadata = vector.get("metadata") or {}
+        return (
+            len(vector["id"])
+            + len(vector["values"]) * 20
+            + len(json.dumps(metadata, ensure_ascii=False).encode("utf-8"))
+        )
+    
     async def query(
         self,
         query_vector: List[float],
@@ -83,12 +174,14 @@ class VectorDBService:
         ]
         """
         try:
-            results = self.index.query(
-                vector=query_vector,
-                top_k=top_k,
-                filter=filter_metadata,
-                include_metadata=True
-            )
+            with VECTOR_DB_DURATION.time(endpoint=current_endpoint.get(), operation="query"):
+                results = await self._index_call(
+                    "query",
+                    vector=query_vector,
+                    top_k=top_k,
+                    filter=filter_metadata,
+                    include_metadata=True
+                )
             
             return [
                 {
@@ -102,10 +195,29 @@ class VectorDBService:
             logger.error(f"Error querying vectors: {e}")
             raise
     
+    async def update_metadata(self, vector_id: str, metadata: Dict[str, Any]):
+        """Overwrite selected metadata fields of an existing vector"""
+        try:
+            await self._index_call("update", id=vector_id, set_metadata=metadata)
+        except Exception as e:
+            logger.error(f"Error updating metadata for {vector_id}: {e}")
+            raise
+    
+    async def delete_vectors(self, ids: List[str]):
+        """Delete vectors by ID (in batches of VECTOR_DELETE_MAX_BATCH)"""
+        try:
+            for start in range(0, len(ids), settings.VECTOR_DELETE_MAX_BATCH):
+                batch = ids[start:start + settings.VECTOR_DELETE_MAX_BATCH]
+                await self._index_call("delete", ids=batch)
+            logger.info(f"Deleted {len(ids)} vectors from {self.index_name}")
+        except Exception as e:
+            logger.error(f"Error deleting vectors: {e}")
+            raise
+    
     async def delete_all(self):
         """Delete all vectors from the index (use with caution)"""
         try:
-            self.index.delete(delete_all=True)
+            await self._index_call("delete", delete_all=True)
             logger.info(f"Deleted all vectors from {self.index_name}")
         except Exception as e:
             logger.error(f"Error deleting vectors: {e}")
@@ -1,9 +1,15 @@
 # vciso-backend/app/main.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import logging
+import time
 from app.config import settings
+from app.api.dependencies import ServiceContainer, get_services
 from app.api.v1.endpoints import plans, gap_analysis
+from app.core.metrics import HTTP_REQUEST_DURATION, current_endpoint, registry
+from app.core.http_client import close_http_clients
 
 # Configure logging
 logging.basicConfig(
@@ -13,11 +19,59 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown
+
+    Services are built lazily; warm-up (vector index, tokenizer, plan service) and
+    the dependency health monitor run in the background, so the app serves liveness
+    checks immediately.
+    """
+    services = app.state.services = ServiceContainer()
+    services.start_warm_up()
+    services.health_monitor.start()
+    yield
+    await services.close()
+    # Close pooled outbound connections
+    await close_http_clients()
+
+
+def _route_path(request: Request) -> str:
+    """Route template of the request (keeps the endpoint label low-cardinality)
+
+    Routing stores the matched route in the scope; before routing, or when no route
+    matched, the request is "unmatched". Newer FastAPI versions keep a route of an
+    included router relative to the router's prefix; the prefix is then the start of
+    the request path that the route's own pattern does not cover.
+    """
+    route = request.scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    path = request.scope["path"]
+    path_regex = getattr(route, "path_regex", None)
+    if path_regex is not None and not path_regex.match(path):
+        for start, char in enumerate(path):
+            if char == "/" and path_regex.match(path[start:]):
+                return path[:start] + template
+    return template
+
+
+async def label_endpoint(request: Request):
+    """Label metrics recorded while handling the request with its route template
+
+    An app-wide dependency, so it runs after routing and in the handler's context.
+    """
+    current_endpoint.set(_route_path(request))
+
+
 # Create FastAPI app
 app = FastAPI(
     title="vCISO API",
     description="Virtual CISO - Incident Response Plan Generator",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
+    dependencies=[Depends(label_endpoint)]
 )
 
 # CORS middleware
@@ -44,6 +98,24 @@ app.include_router(
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Time the request; labelled with its endpoint once routing has matched it"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            endpoint=_route_path(request),
+            method=request.method,
+            status=str(status)
+        )
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -55,11 +127,29 @@ async def root():
 
 
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness: the process is up and serving (no dependency is checked)"""
     return {"status": "healthy"}
 
 
+@app.get("/health/ready")
+async def readiness_check(request: Request, response: Response):
+    """Readiness: 200 once every warm-up check passed, else 503 with each check's status"""
+    readiness = get_services(request).readiness()
+    if not readiness["ready"]:
+        response.status_code = 503
+    return readiness
+
+
+@app.get("/metrics")
+async def metrics(format: str = "prometheus"):
+    """Token, cost, latency, retry and cache metrics (Prometheus text, or ?format=json)"""
+    if format == "json":
+        return registry.snapshot()
+    return PlainTextResponse(registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -16,7 +16,8 @@ from datetime import datetime
 #                type (dedicated, consultant, owner, none), name (if dedicated)
 
 # - OnboardingData: Represents the complete onboarding data collected from the user.
-#                companyName, employeeCount, industry, tools, currentSecurity, mainConcerns, securityLead
+#                companyName, employeeCount, industry, tools, currentSecurity, mainConcerns, securityLead,
+#                and the employee, vendor and hostname names to keep out of LLM-written text
 
 # - GeneratedPlan: Represents the generated IR plan with its content and metadata.
 #                 markdown, metadata
@@ -44,6 +45,9 @@ class OnboardingData(BaseModel):
     currentSecurity: List[str] = Field(default_factory=list, description="Current security measures")
     mainConcerns: List[str] = Field(..., min_length=1, description="Main security concerns")
     securityLead: SecurityLead = Field(..., description="Who handles security")
+    employees: List[str] = Field(default_factory=list, description="Employee names to redact from generated text")
+    vendors: List[str] = Field(default_factory=list, description="Vendor names to redact from generated text")
+    hostnames: List[str] = Field(default_factory=list, description="Hostnames to redact from generated text")
 
 
 class GeneratedPlan(BaseModel):
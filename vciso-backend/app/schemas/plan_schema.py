@@ -29,7 +29,8 @@ class SecurityLeadSchema(BaseModel):
 
 # OnboardingRequest:
 # Request schema for onboarding data
-# companyName, employeeCount, industry, tools, currentSecurity, mainConcerns, securityLead
+# companyName, employeeCount, industry, tools, currentSecurity, mainConcerns, securityLead,
+# employees, vendors, hostnames
 
 class OnboardingRequest(BaseModel):
     """Request schema for onboarding data"""
@@ -40,6 +41,9 @@ class OnboardingRequest(BaseModel):
     currentSecurity: List[str] = Field(default_factory=list)
     mainConcerns: List[str] = Field(..., min_length=1, description="At least one concern required")
     securityLead: SecurityLeadSchema
+    employees: List[str] = Field(default_factory=list, description="Employee names to redact from generated text")
+    vendors: List[str] = Field(default_factory=list, description="Vendor names to redact from generated text")
+    hostnames: List[str] = Field(default_factory=list, description="Hostnames to redact from generated text")
 
     # Convert schema to internal model
     # This method transforms the OnboardingRequest schema into the OnboardingData model used internally.
@@ -68,7 +72,10 @@ class OnboardingRequest(BaseModel):
             securityLead=SecurityLead(
                 type=self.securityLead.type,
                 name=self.securityLead.name
-            )
+            ),
+            employees=self.employees,
+            vendors=self.vendors,
+            hostnames=self.hostnames
         )
 
 # PlanResponse:
@@ -0,0 +1,436 @@
+"""
+Load and latency benchmark for the plan generation and gap analysis endpoints.
+
+Usage:
+    python -m app.scripts.benchmark --stand-in                      # in-process app, stand-in backends
+    python -m app.scripts.benchmark --stand-in --concurrency 20 --requests 400 --mix plan=3,gap=1
+    python -m app.scripts.benchmark --target http://localhost:8000  # a running server
+    python -m app.scripts.benchmark --stand-in --compare benchmarks/<earlier run>.json
+
+This script:
+1. Builds request payloads from the samples in test_api.sh and test_integration.py.
+   Gap analysis requests use the plan the stand-in server renders for the first
+   sample, so the plan has every section the analyzer expects.
+2. Drives the app with a fixed number of concurrent workers (closed loop). Each
+   worker picks the next endpoint from the weighted request mix. By default the
+   app runs in-process, inside its lifespan (warm-up, health monitor) as under a
+   server; --target sends requests to a running server instead. Either way the
+   run starts once /health/ready reports the app ready.
+3. With --stand-in, the stand-in backends (app/scripts/stand_in_server.py) are
+   started on a local port first and the app is pointed at them, so runs need no
+   API keys and are repeatable. Otherwise the app uses whatever backends its
+   settings name. The app's own rate limits (OPENAI_MODEL_RATE_LIMITS and the
+   OPENAI_RPM_LIMIT/OPENAI_TPM_LIMIT defaults) still apply; leave them unset to
+   measure the app without them.
+4. Reports throughput, p50/p95/p99 latency and error rates per endpoint, plus a
+   per-stage breakdown (LLM calls per call site, embeddings, vector queries)
+   from the difference of the app's /metrics before and after the run.
+5. Writes the results as JSON (tagged with the git commit) and optionally prints
+   the change against an earlier results file.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from app.config import settings
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+PLAN_PATH = settings.API_V1_PREFIX + "/plans/generate"
+GAP_PATH = settings.API_V1_PREFIX + "/gap-analysis/analyze"
+
+# Sample onboarding payloads (test_integration.py's Test Company plus the
+# test_api.sh request, which is read from the script when available)
+INTEGRATION_PAYLOAD = {
+    "companyName": "Test Company",
+    "employeeCount": "10-50",
+    "industry": "tech",
+    "tools": {"email": [], "storage": [], "communication": [], "crm": []},
+    "currentSecurity": [],
+    "mainConcerns": ["Ransomware"],
+    "securityLead": {"type": "owner"},
+}
+FALLBACK_API_PAYLOAD = {
+    "companyName": "Acme Corporation",
+    "employeeCount": "51-200",
+    "industry": "healthcare",
+    "tools": {
+        "email": ["Gmail", "Outlook"],
+        "storage": ["Google Drive", "OneDrive"],
+        "communication": ["Slack", "Teams"],
+        "crm": ["Salesforce"],
+    },
+    "currentSecurity": ["MFA", "Antivirus", "Data backups"],
+    "mainConcerns": ["Ransomware", "Data breaches", "Phishing attacks"],
+    "securityLead": {"type": "dedicated", "name": "Jane Smith"},
+}
+
+# Histograms whose difference before/after the run makes up the stage breakdown
+STAGE_METRICS = {
+    "llm_request_duration_seconds": ("llm", "call_site"),
+    "embedding_request_duration_seconds": ("embedding", "model"),
+    "vector_db_request_duration_seconds": ("vector_db", "operation"),
+}
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    status: int
+    latency: float
+    started: float
+
+
+def load_plan_payloads() -> List[Dict[str, Any]]:
+    """Onboarding payloads from test_api.sh and test_integration.py"""
+    payloads = [FALLBACK_API_PAYLOAD, INTEGRATION_PAYLOAD]
+    script = BACKEND_DIR / "test_api.sh"
+    if script.exists():
+        match = re.search(r"-d '(\{.*?\})'", script.read_text(), re.DOTALL)
+        if match:
+            payloads[0] = json.loads(match.group(1))
+    return payloads
+
+
+def build_gap_payload(plan_payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Gap analysis request for the plan the stand-in server renders for `plan_payload`"""
+    from app.core.meta_prompting import MetaPromptEngine
+    from app.models.plan import OnboardingData
+    from app.scripts.stand_in_server import render_plan
+
+    data = OnboardingData(**plan_payload)
+    return {
+        "plan_markdown": render_plan(MetaPromptEngine().build_prompt(data)),
+        "company_name": data.companyName,
+    }
+
+
+def build_requests(use_cache: bool) -> Dict[str, List[Dict[str, Any]]]:
+    """Request specs per endpoint name; workers cycle through each list"""
+    plan_payloads = load_plan_payloads()
+    params = {"use_cache": str(use_cache).lower()}
+    return {
+        "plan": [{"path": PLAN_PATH, "json": payload, "params": params} for payload in plan_payloads],
+        "gap": [{"path": GAP_PATH, "json": build_gap_payload(plan_payloads[0])}],
+    }
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse "plan=3,gap=1" into endpoint weights"""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        mix[name] = float(weight) if weight else 1.0
+        if mix[name] < 0:
+            raise ValueError(f"Negative weight for {name}")
+    if not any(mix.values()):
+        raise ValueError(f"Request mix {spec!r} has no positive weights")
+    return mix
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    requests: Dict[str, List[Dict[str, Any]]],
+    mix: Dict[str, float],
+    concurrency: int,
+    total_requests: int,
+    seed: int = 0
+) -> Tuple[List[Sample], float]:
+    """Send total_requests from `concurrency` workers; returns samples and wall time"""
+    unknown = set(mix) - set(requests)
+    if unknown:
+        raise ValueError(f"Unknown endpoints in mix: {sorted(unknown)}")
+
+    rng = random.Random(seed)
+    names = [name for name in mix if mix[name] > 0]
+    schedule = rng.choices(names, weights=[mix[name] for name in names], k=total_requests)
+    position = {name: 0 for name in names}
+    queue: asyncio.Queue = asyncio.Queue()
+    for name in schedule:
+        specs = requests[name]
+        queue.put_nowait((name, specs[position[name] % len(specs)]))
+        position[name] += 1
+
+    samples: List[Sample] = []
+    run_started = time.perf_counter()
+
+    async def worker():
+        while not queue.empty():
+            name, spec = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.post(spec["path"], json=spec["json"], params=spec.get("params"))
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0  # Connection failure or client-side timeout
+            samples.append(Sample(name, status, time.perf_counter() - started, started - run_started))
+
+    await asyncio.gather(*(worker() for _ in range(max(concurrency, 1))))
+    return samples, time.perf_counter() - run_started
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles and error rate, overall and per endpoint"""
+
+    def stats(group: List[Sample]) -> Dict[str, Any]:
+        latencies = np.array([s.latency for s in group]) if group else np.zeros(0)
+        errors = [s for s in group if not 200 <= s.status < 300]
+        statuses: Dict[str, int] = {}
+        for s in group:
+            statuses[str(s.status)] = statuses.get(str(s.status), 0) + 1
+        summary = {
+            "requests": len(group),
+            "throughput_rps": round(len(group) / elapsed, 3) if elapsed > 0 else 0.0,
+            "error_rate": round(len(errors) / len(group), 4) if group else 0.0,
+            "status_counts": dict(sorted(statuses.items())),
+        }
+        if group:
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            summary["latency_seconds"] = {
+                "mean": round(float(latencies.mean()), 4),
+                "p50": round(float(p50), 4),
+                "p95": round(float(p95), 4),
+                "p99": round(float(p99), 4),
+                "max": round(float(latencies.max()), 4),
+            }
+        return summary
+
+    endpoints = sorted({s.endpoint for s in samples})
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "overall": stats(samples),
+        "endpoints": {name: stats([s for s in samples if s.endpoint == name]) for name in endpoints},
+    }
+
+
+def stage_breakdown(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Calls and time per stage during the run, from two /metrics?format=json snapshots.
+    Stages are grouped by the API endpoint that triggered them.
+    """
+
+    def series(snapshot: Dict[str, Any], metric: str) -> Dict[Tuple, Dict[str, float]]:
+        return {tuple(sorted(entry["labels"].items())): entry for entry in snapshot.get(metric, [])}
+
+    breakdown: Dict[str, Dict[str, Any]] = {}
+    for metric, (stage, detail_label) in STAGE_METRICS.items():
+        previous = series(before, metric)
+        for key, entry in series(after, metric).items():
+            count = entry["count"] - previous.get(key, {}).get("count", 0)
+            seconds = entry["sum"] - previous.get(key, {}).get("sum", 0.0)
+            if count <= 0:
+                continue
+            labels = dict(key)
+            name = f"{stage}:{labels.get(detail_label, '')}"
+            endpoint = breakdown.setdefault(labels.get("endpoint", "none"), {})
+            current = endpoint.setdefault(name, {"calls": 0, "total_seconds": 0.0})
+            current["calls"] += count
+            current["total_seconds"] += seconds
+
+    for stages in breakdown.values():
+        for entry in stages.values():
+            entry["mean_seconds"] = round(entry["total_seconds"] / entry["calls"], 4)
+            entry["total_seconds"] = round(entry["total_seconds"], 4)
+    return dict(sorted(breakdown.items()))
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Human-readable change of the headline numbers against an earlier run"""
+
+    def change(new: Optional[float], old: Optional[float]) -> str:
+        if new is None or old is None:
+            return "n/a"
+        if not old:
+            return f"{old:g} -> {new:g}"
+        return f"{old:g} -> {new:g} ({(new - old) / old:+.1%})"
+
+    lines = [f"Compared with {baseline.get('commit', 'unknown')} ({baseline.get('timestamp', '?')}):"]
+    for name, result in current["results"]["endpoints"].items():
+        old = baseline.get("results", {}).get("endpoints", {}).get(name)
+        if not old:
+            lines.append(f"  {name}: not in baseline")
+            continue
+        lines.append(f"  {name}:")
+        lines.append(f"    throughput_rps {change(result['throughput_rps'], old['throughput_rps'])}")
+        lines.append(f"    error_rate     {change(result['error_rate'], old['error_rate'])}")
+        for q in ("p50", "p95", "p99"):
+            lines.append(
+                f"    {q:<14} "
+                f"{change(result.get('latency_seconds', {}).get(q), old.get('latency_seconds', {}).get(q))}"
+            )
+    return lines
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def start_stand_in(args) -> str:
+    """Run the stand-in backends in a background thread; returns their base URL"""
+    import uvicorn
+    from app.scripts.stand_in_server import LatencyModel, StandInConfig, create_app
+
+    config = StandInConfig(
+        chat_latency=LatencyModel.parse(args.chat_latency),
+        embedding_latency=LatencyModel.parse(args.embedding_latency),
+        vector_latency=LatencyModel.parse(args.vector_latency),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(config), host="127.0.0.1", port=args.stand_in_port, log_level="warning"
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Stand-in server did not start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{args.stand_in_port}"
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float, interval: float = 0.1):
+    """Poll /health/ready as an orchestrator would, so measuring starts on a warmed-up app"""
+    deadline = time.monotonic() + timeout
+    while True:
+        response = await client.get("/health/ready")
+        if response.status_code in (200, 404):  # 404: a server without readiness checks
+            return
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"App not ready after {timeout:g}s: {response.text}")
+        await asyncio.sleep(interval)
+
+
+async def run(args) -> Dict[str, Any]:
+    stand_in_url = None
+    if args.stand_in:
+        stand_in_url = start_stand_in(args)
+        # Before the app starts: its services read these when they are built
+        settings.OPENAI_BASE_URL = f"{stand_in_url}/v1"
+        settings.PINECONE_HOST = stand_in_url
+        settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "sk-stand-in"
+        settings.PINECONE_API_KEY = settings.PINECONE_API_KEY or "stand-in"
+
+    requests = build_requests(use_cache=args.use_cache)
+    mix = parse_mix(args.mix)
+    async with AsyncExitStack() as stack:
+        if args.target:
+            client = httpx.AsyncClient(base_url=args.target, timeout=args.timeout)
+        else:
+            from app.main import app
+            # ASGITransport does not run the lifespan. Run it as a server would, so
+            # warm-up and the health monitor run; its shutdown closes the shared clients.
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=args.timeout
+            )
+        stack.push_async_callback(client.aclose)
+
+        await wait_until_ready(client, args.timeout)
+        if args.warmup:
+            await run_load(client, requests, mix, min(args.concurrency, args.warmup), args.warmup, args.seed)
+        before = (await client.get("/metrics", params={"format": "json"})).json()
+        samples, elapsed = await run_load(client, requests, mix, args.concurrency, args.requests, args.seed)
+        after = (await client.get("/metrics", params={"format": "json"})).json()
+
+    results = summarize(samples, elapsed)
+    results["stages"] = stage_breakdown(before, after)
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "config": {
+            "target": args.target or "in-process",
+            "backends": stand_in_url or "configured",
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "mix": mix,
+            "use_cache": args.use_cache,
+            "seed": args.seed,
+            **({
+                "chat_latency": args.chat_latency,
+                "embedding_latency": args.embedding_latency,
+                "vector_latency": args.vector_latency,
+                "error_rate": args.error_rate,
+                "rate_limit_rate": args.rate_limit_rate,
+            } if args.stand_in else {}),
+        },
+        "results": results,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    results = report["results"]
+    print(f"Commit {report['commit']}, {results['elapsed_seconds']}s, {report['config']}")
+    for name, summary in [("overall", results["overall"]), *results["endpoints"].items()]:
+        latency = summary.get("latency_seconds", {})
+        print(
+            f"  {name:<8} {summary['requests']:>5} req  {summary['throughput_rps']:>8.2f} req/s  "
+            f"err {summary['error_rate']:.2%}  "
+            f"p50 {latency.get('p50', 0):.3f}s  p95 {latency.get('p95', 0):.3f}s  p99 {latency.get('p99', 0):.3f}s"
+        )
+    for endpoint, stages in results["stages"].items():
+        print(f"  stages for {endpoint}:")
+        for name, entry in sorted(stages.items(), key=lambda item: -item[1]["total_seconds"]):
+            print(f"    {name:<36} {entry['calls']:>6} calls  mean {entry['mean_seconds']:.3f}s  total {entry['total_seconds']:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark plan generation and gap analysis under load")
+    parser.add_argument("--target", help="Base URL of a running server (default: run the app in-process)")
+    parser.add_argument("--stand-in", action="store_true", help="Start the stand-in backends and point the app at them")
+    parser.add_argument("--stand-in-port", type=int, default=8100)
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent workers")
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests sent first")
+    parser.add_argument("--mix", default="plan=1,gap=1", help="Endpoint weights, e.g. plan=3,gap=1")
+    parser.add_argument("--use-cache", action="store_true", help="Let plan requests hit the plan caches")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chat-latency", default="lognormal:2:0.5", help="Stand-in chat latency (see stand_in_server)")
+    parser.add_argument("--embedding-latency", default="lognormal:0.1:0.3")
+    parser.add_argument("--vector-latency", default="lognormal:0.03:0.3")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stand-in 5xx rate")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Stand-in 429 rate")
+    parser.add_argument("--output", help="Results file (default: benchmarks/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    output = Path(args.output) if args.output else (
+        BACKEND_DIR / "benchmarks" / f"{datetime.utcnow():%Y%m%dT%H%M%S}-{report['commit']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        print("\n".join(compare(report, baseline)))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,26 +3,42 @@
 Script to index framework documents into the vector database.
 
 Usage:
-    python -m app.scripts.index_frameworks
+    python -m app.scripts.index_frameworks          # incremental
+    python -m app.scripts.index_frameworks --full   # re-embed everything
 
 This script:
 1. Reads PDFs from app/data/frameworks/
-2. Splits them into chunks
-3. Generates embeddings
-4. Uploads to Pinecone
+2. Splits them into section-aware, token-sized chunks (page ranges are
+   parsed in parallel worker processes, then each document is chunked whole)
+   and collapses near-duplicate chunks across frameworks
+3. Generates embeddings for chunks not already in the index
+4. Uploads to Pinecone in size-aware batches
+5. Deletes vectors for chunks that no longer exist
+
+The stages are connected by bounded queues, so memory use stays flat
+as the framework library grows.
 """
 
+import argparse
 import asyncio
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Deque, Optional, Tuple
 import logging
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
 import hashlib
 
+from app.core.chunking import StructuredChunker
+from app.core.dedup import MinHasher, NearDuplicateIndex
 from app.core.embeddings import EmbeddingService
+from app.core.http_client import close_http_clients
+from app.core.tokenizer import DEFAULT_ENCODING, get_encoding
 from app.core.vector_db import VectorDBService
+from app.scripts.index_manifest import IndexManifest, file_sha256
 from app.config import settings
 
 logging.basicConfig(level=logging.INFO)
@@ -50,24 +66,120 @@ FRAMEWORKS = {
     }
 }
 
+# Sentinel that tells a pipeline stage its input is exhausted
+_DONE = object()
+
+
+@lru_cache(maxsize=None)
+def _get_chunker(max_tokens: int, overlap_tokens: int) -> StructuredChunker:
+    """Build the chunker (and load its tokenizer) once per worker process"""
+    return StructuredChunker(max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+
+@lru_cache(maxsize=None)
+def _get_minhasher(num_perm: int) -> MinHasher:
+    return MinHasher(num_perm=num_perm)
+
+
+def _count_pages(pdf_path: str) -> int:
+    """Return the number of pages in a PDF"""
+    return len(PdfReader(pdf_path).pages)
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Extract the text of pages [start, end) of a PDF.
+
+    Runs in a worker process, so it must stay a module-level function
+    with picklable arguments and return values.
+    """
+    reader = PdfReader(pdf_path)
+    return [
+        (page_num, reader.pages[page_num].extract_text() or "")
+        for page_num in range(start, end)
+    ]
+
+
+def _chunk_document(
+    pages: List[Tuple[int, str]],
+    max_tokens: int,
+    overlap_tokens: int,
+    num_perm: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Chunk a whole document (runs in a worker process)
+    
+    When num_perm is set, each chunk also gets a hex-encoded MinHash
+    signature for near-duplicate detection.
+    """
+    chunks = _get_chunker(max_tokens, overlap_tokens).chunk_pages(pages)
+    if num_perm:
+        minhasher = _get_minhasher(num_perm)
+        for chunk in chunks:
+            chunk["minhash"] = MinHasher.to_hex(minhasher.signature(chunk["text"]))
+    return chunks
+
+
 class FrameworkIndexer:
-    """Index framework documents into vector database"""
+    """
+    Index framework documents into vector database
+    
+    Indexing runs as a streaming pipeline connected by bounded queues:
+    
+        load + split (process pool) -> embed (async workers) -> upsert (batched)
+    
+    Each stage blocks when the next one falls behind, so only a handful of
+    batches are held in memory regardless of corpus size.
+    
+    Runs are incremental: an IndexManifest records file hashes and the
+    content-addressed IDs of every chunk. Unchanged files are skipped,
+    unchanged chunks keep their existing vectors, and vectors no longer
+    produced by any file are deleted.
+    
+    Near-duplicate chunks (MinHash/LSH) are collapsed into the first copy
+    seen. The canonical vector lists every source and page it stands for
+    in its "sources" and "citations" metadata.
+    """
     
     def __init__(self):
         self.embedding_service = EmbeddingService()
         self.vector_db = VectorDBService()
         self.frameworks_dir = Path("app/data/frameworks")
+        self.manifest_path = Path(settings.INDEXER_MANIFEST_PATH)
         
-        # Text splitter configuration
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,  # ~250 words per chunk
-            chunk_overlap=200,  # 20% overlap to preserve context
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
+        # Worker pool for CPU-bound PDF parsing and splitting
+        self.max_workers = settings.INDEXER_MAX_WORKERS or os.cpu_count() or 1
+        self.pages_per_task = max(1, settings.INDEXER_PAGES_PER_TASK)
+        
+        # Chunking
+        self.chunk_tokens = settings.INDEXER_CHUNK_TOKENS
+        self.chunk_overlap_tokens = settings.INDEXER_CHUNK_OVERLAP_TOKENS
+        
+        # Near-duplicate elimination (threshold 0 disables it)
+        self.dedup_threshold = settings.INDEXER_DEDUP_THRESHOLD
+        self.dedup_num_perm = settings.INDEXER_DEDUP_NUM_PERM if self.dedup_threshold > 0 else 0
+        
+        # The tokenizer may fall back to approximate counts (see tokenizer.py); chunk
+        # boundaries counted with another encoding are not reusable
+        self.chunker_config = (
+            f"structured:{self.chunk_tokens}:{self.chunk_overlap_tokens}"
+            f":dedup{self.dedup_threshold}/{self.dedup_num_perm}"
+            f":{get_encoding(DEFAULT_ENCODING).name}"
         )
+        
+        # Pipeline sizing
+        self.queue_size = max(1, settings.INDEXER_QUEUE_SIZE)
+        self.embed_batch_size = max(1, settings.INDEXER_EMBED_BATCH_SIZE)
+        self.embed_concurrency = max(1, settings.INDEXER_EMBED_CONCURRENCY)
+        self.upsert_concurrency = max(1, settings.VECTOR_UPSERT_CONCURRENCY)
     
-    async def index_all_frameworks(self):
-        """Index all framework PDFs"""
+    async def index_all_frameworks(self, full: bool = False):
+        """
+        Index all framework PDFs
+        
+        Args:
+            full: Re-embed every chunk even if the manifest says it is unchanged
+        """
         logger.info("Starting framework indexing...")
         
         # Check if frameworks directory exists
@@ -77,92 +189,419 @@ class FrameworkIndexer:
                 f"Please create it and add framework PDFs."
             )
         
-        all_vectors = []
+        manifest = IndexManifest.load(
+            self.manifest_path,
+            index_name=self.vector_db.index_name,
+            embedding_model=self.embedding_service.model,
+            chunker=self.chunker_config
+        )
+        previous_ids = manifest.all_ids()
+        previous_metadata = self._manifest_metadata(manifest)
+        if full or not manifest.reusable:
+            previous_metadata = {}
+        skip_unchanged = manifest.up_to_date and not full
+        
+        stats = {
+            "files_skipped": 0, "chunks": 0, "duplicates": 0, "reused": 0,
+            "embedded": 0, "upserted": 0, "deleted": 0
+        }
         
+        pdfs = []
+        file_hashes = {}
+        dedup_index = NearDuplicateIndex(self.dedup_threshold, self.dedup_num_perm) if self.dedup_num_perm else None
         for pdf_filename, metadata in FRAMEWORKS.items():
             pdf_path = self.frameworks_dir / pdf_filename
             
             if not pdf_path.exists():
-                logger.warning(f"PDF not found: {pdf_path}, skipping...")
+                if manifest.file_hash(pdf_filename):
+                    logger.warning(f"PDF removed: {pdf_path}, deleting its vectors...")
+                    manifest.remove_file(pdf_filename)
+                else:
+                    logger.warning(f"PDF not found: {pdf_path}, skipping...")
                 continue
             
-            logger.info(f"Processing: {pdf_filename}")
-            vectors = await self.process_pdf(pdf_path, metadata)
-            all_vectors.extend(vectors)
-            logger.info(f"Generated {len(vectors)} vectors from {pdf_filename}")
+            file_hash = await asyncio.to_thread(file_sha256, pdf_path)
+            if skip_unchanged and manifest.file_hash(pdf_filename) == file_hash:
+                logger.info(f"Unchanged: {pdf_filename}, skipping...")
+                stats["files_skipped"] += 1
+                # New chunks elsewhere may still duplicate this file's chunks
+                if dedup_index is not None:
+                    for vector_id, entry in manifest.chunks(pdf_filename).items():
+                        if "minhash" in entry:
+                            dedup_index.add(vector_id, MinHasher.from_hex(entry["minhash"]))
+                continue
+            
+            file_hashes[pdf_filename] = file_hash
+            pdfs.append((pdf_path, metadata))
+        
+        file_chunks: Dict[str, Dict[str, Dict[str, Any]]] = {pdf_path.name: {} for pdf_path, _ in pdfs}
+        new_ids: Dict[str, str] = {}
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        vector_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
         
-        # Upload to vector database
-        logger.info(f"Uploading {len(all_vectors)} vectors to Pinecone...")
-        await self.vector_db.upsert_vectors(all_vectors)
-        logger.info("Indexing complete!")
+        started = time.perf_counter()
+        if pdfs:
+            pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            try:
+                logger.info(f"Parsing {len(pdfs)} PDFs with {self.max_workers} worker processes")
+                async with asyncio.TaskGroup() as tg:
+                    tg.create_task(self._load_and_split(
+                        pool, pdfs, chunk_queue, stats,
+                        previous_metadata, dedup_index, file_chunks, new_ids
+                    ))
+                    tg.create_task(self._embed_all(chunk_queue, vector_queue, stats))
+                    tg.create_task(self._upsert_all(vector_queue, stats))
+            finally:
+                pool.shutdown(cancel_futures=True)
+        
+        for pdf_filename, chunks in file_chunks.items():
+            manifest.set_file(pdf_filename, file_hashes[pdf_filename], chunks)
+        
+        # Bring metadata of existing vectors up to date: pages of reused chunks
+        # can shift, and duplicates found later add citations to their canonical
+        final_metadata = self._manifest_metadata(manifest)
+        metadata_updates = []
+        for vector_id, vector_metadata in final_metadata.items():
+            if vector_id in new_ids:
+                written = self._vector_metadata([(new_ids[vector_id], self._find_entry(manifest, vector_id))])
+            else:
+                written = previous_metadata.get(vector_id)
+            if written != vector_metadata:
+                metadata_updates.append((vector_id, vector_metadata))
+        
+        semaphore = asyncio.Semaphore(self.upsert_concurrency)
+        
+        async def _update(vector_id: str, vector_metadata: Dict[str, Any]):
+            async with semaphore:
+                await self.vector_db.update_metadata(vector_id, vector_metadata)
+        
+        await asyncio.gather(*(_update(vector_id, meta) for vector_id, meta in metadata_updates))
+        
+        # Delete vectors that no file produces any more
+        orphaned_ids = sorted(previous_ids - manifest.all_ids())
+        if orphaned_ids:
+            logger.info(f"Deleting {len(orphaned_ids)} orphaned vectors...")
+            await self.vector_db.delete_vectors(orphaned_ids)
+            stats["deleted"] = len(orphaned_ids)
+        
+        manifest.embedding_model = self.embedding_service.model
+        manifest.chunker = self.chunker_config
+        manifest.save(self.manifest_path)
+        
+        if stats["chunks"]:
+            logger.info(
+                f"Collapsed {stats['duplicates']} near-duplicate chunks: corpus shrank by "
+                f"{stats['duplicates'] / stats['chunks']:.1%} ({stats['chunks']} -> "
+                f"{stats['chunks'] - stats['duplicates']} chunks)"
+            )
+        
+        elapsed = time.perf_counter() - started
+        throughput = stats["upserted"] / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"Indexing complete! {stats['upserted']} chunks in {elapsed:.1f}s "
+            f"({throughput:.1f} chunks/sec); reused {stats['reused']}, "
+            f"deleted {stats['deleted']}, skipped {stats['files_skipped']} unchanged files"
+        )
+        return stats
     
-    async def process_pdf(
+    async def _load_and_split(
         self,
-        pdf_path: Path,
-        metadata: Dict[str, str]
-    ) -> List[Dict[str, Any]]:
-        """Process a single PDF and return vectors"""
+        pool: ProcessPoolExecutor,
+        pdfs: List[Tuple[Path, Dict[str, str]]],
+        chunk_queue: asyncio.Queue,
+        stats: Dict[str, int],
+        previous_metadata: Dict[str, Dict[str, Any]],
+        dedup_index: Optional[NearDuplicateIndex],
+        file_chunks: Dict[str, Dict[str, Dict[str, Any]]],
+        new_ids: Dict[str, str]
+    ):
+        """
+        Stage 1: parse page ranges on the process pool, then chunk each
+        document as a whole once all of its pages are in.
         
-        # Load PDF
-        loader = PyPDFLoader(str(pdf_path))
-        pages = loader.load()
+        Every PDF's page count is submitted up front, and a document's ranges
+        are queued as soon as its own count is in. At most two ranges per
+        worker are in flight, and results are consumed in page order.
+        Near-duplicates of earlier chunks and chunks that were indexed before
+        are recorded but not sent downstream.
+        """
+        loop = asyncio.get_running_loop()
+        page_count_futures = [
+            loop.run_in_executor(pool, _count_pages, str(pdf_path))
+            for pdf_path, _ in pdfs
+        ]
+        page_counts_by_path: Dict[Path, int] = {}
         
-        # Split into chunks
-        chunks = []
-        for page in pages:
-            page_chunks = self.text_splitter.split_text(page.page_content)
-            for chunk in page_chunks:
-                chunks.append({
-                    "text": chunk,
-                    "page": page.metadata.get("page", 0)
-                })
+        async def page_range_jobs():
+            for (pdf_path, metadata), page_count_future in zip(pdfs, page_count_futures):
+                page_count = page_counts_by_path[pdf_path] = await page_count_future
+                for start in self._page_ranges(page_count):
+                    yield pdf_path, metadata, start, min(start + self.pages_per_task, page_count)
         
-        logger.info(f"Split {pdf_path.name} into {len(chunks)} chunks")
+        jobs = page_range_jobs()
+        in_flight: Deque = deque()
         
-        # Generate embeddings (batch)
-        texts = [chunk["text"] for chunk in chunks]
-        embeddings = await self.embedding_service.generate_embeddings_batch(texts)
+        async def submit_next():
+            job = await anext(jobs, None)
+            if job is not None:
+                pdf_path, _, start, end = job
+                in_flight.append((job, loop.run_in_executor(
+                    pool, _extract_page_range, str(pdf_path), start, end
+                )))
         
-        # Prepare vectors for Pinecone
-        vectors = []
-        for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            # Generate unique ID
-            vector_id = self._generate_vector_id(
-                source=metadata["source"],
-                page=chunk["page"],
-                chunk_idx=idx
+        for _ in range(self.max_workers * 2):
+            await submit_next()
+        
+        document_pages: Dict[Path, List[Tuple[int, str]]] = {pdf_path: [] for pdf_path, _ in pdfs}
+        
+        while in_flight:
+            (pdf_path, metadata, _, end), future = in_flight.popleft()
+            document_pages[pdf_path].extend(await future)
+            await submit_next()
+            
+            if end < page_counts_by_path[pdf_path]:
+                continue
+            
+            # All pages of this document are extracted; chunk it as one text
+            chunks = await loop.run_in_executor(
+                pool, _chunk_document,
+                document_pages.pop(pdf_path), self.chunk_tokens, self.chunk_overlap_tokens,
+                self.dedup_num_perm
             )
             
+            known = file_chunks[pdf_path.name]
+            new_chunks = []
+            duplicates = 0
+            for chunk_index, chunk in enumerate(chunks):
+                chunk["chunk_index"] = chunk_index
+                chunk["id"] = self._generate_vector_id(metadata["source"], chunk["text"])
+                entry = self._chunk_metadata(chunk)
+                
+                if chunk["id"] in known:
+                    # Identical text repeated within the same document
+                    continue
+                
+                if dedup_index is not None:
+                    signature = MinHasher.from_hex(chunk["minhash"])
+                    canonical_id = dedup_index.find(signature)
+                    if canonical_id is not None:
+                        # Keep the canonical vector alive and cite this copy on it
+                        known.setdefault(canonical_id, {**entry, "duplicate": True})
+                        duplicates += 1
+                        continue
+                    dedup_index.add(chunk["id"], signature)
+                    entry["minhash"] = chunk["minhash"]
+                
+                known[chunk["id"]] = entry
+                
+                if chunk["id"] in previous_metadata:
+                    stats["reused"] += 1
+                elif chunk["id"] not in new_ids:
+                    new_ids[chunk["id"]] = metadata["source"]
+                    new_chunks.append(chunk)
+            
+            stats["chunks"] += len(chunks)
+            stats["duplicates"] += duplicates
+            logger.info(
+                f"Split {pdf_path.name} into {len(chunks)} chunks "
+                f"({duplicates} near-duplicates collapsed)"
+            )
+            
+            for batch_start in range(0, len(new_chunks), self.embed_batch_size):
+                await chunk_queue.put((metadata, new_chunks[batch_start:batch_start + self.embed_batch_size]))
+        
+        for _ in range(self.embed_concurrency):
+            await chunk_queue.put(_DONE)
+    
+    async def _embed_all(
+        self,
+        chunk_queue: asyncio.Queue,
+        vector_queue: asyncio.Queue,
+        stats: Dict[str, int]
+    ):
+        """Stage 2: run the embedding workers, then signal the upsert stage"""
+        await asyncio.gather(*(
+            self._embed_worker(chunk_queue, vector_queue, stats)
+            for _ in range(self.embed_concurrency)
+        ))
+        await vector_queue.put(_DONE)
+    
+    async def _embed_worker(
+        self,
+        chunk_queue: asyncio.Queue,
+        vector_queue: asyncio.Queue,
+        stats: Dict[str, int]
+    ):
+        """
+        Embed chunk batches from the queue until the producer is done
+        
+        The producer already cuts batches of at most embed_batch_size chunks,
+        so each queue item is one embeddings request.
+        """
+        while True:
+            item = await chunk_queue.get()
+            if item is _DONE:
+                return
+            
+            metadata, batch = item
+            texts = [chunk["text"] for chunk in batch]
+            embeddings = await self.embedding_service.generate_embeddings_batch(texts)
+            
+            vectors = self._build_vectors(batch, embeddings, metadata)
+            stats["embedded"] += len(vectors)
+            await vector_queue.put(vectors)
+    
+    async def _upsert_all(self, vector_queue: asyncio.Queue, stats: Dict[str, int]):
+        """
+        Stage 3: regroup vectors into size-aware batches and upsert them
+        concurrently. Waiting for a free upsert slot stops this stage from
+        draining the queue, which pushes backpressure upstream.
+        """
+        semaphore = asyncio.Semaphore(self.upsert_concurrency)
+        pending: List[Dict[str, Any]] = []
+        
+        async def _send(batch: List[Dict[str, Any]]):
+            try:
+                await self.vector_db.upsert_batch(batch)
+                stats["upserted"] += len(batch)
+            finally:
+                semaphore.release()
+        
+        async with asyncio.TaskGroup() as tg:
+            while True:
+                vectors = await vector_queue.get()
+                done = vectors is _DONE
+                if not done:
+                    pending.extend(vectors)
+                
+                batches = list(self.vector_db.batch_vectors(pending))
+                # Hold back the last (possibly partial) batch until more vectors arrive
+                pending = [] if done or not batches else batches.pop()
+                
+                for batch in batches:
+                    await semaphore.acquire()
+                    tg.create_task(_send(batch))
+                
+                if done:
+                    break
+    
+    def _page_ranges(self, page_count: int) -> range:
+        """Start pages of each page-range task"""
+        return range(0, page_count, self.pages_per_task)
+    
+    def _chunk_metadata(self, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        """Position metadata that can change while the chunk text stays the same"""
+        chunk_metadata = {
+            "page": chunk["page_start"],
+            "page_end": chunk["page_end"],
+            "chunk_index": chunk["chunk_index"]
+        }
+        # Pinecone rejects null metadata values
+        if chunk.get("section"):
+            chunk_metadata["section"] = chunk["section"]
+        return chunk_metadata
+    
+    def _vector_metadata(self, refs: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Metadata of a vector given every (source, manifest entry) that refers
+        to it, canonical copy first: its own position plus all citations.
+        """
+        canonical = refs[0][1]
+        vector_metadata = {
+            key: canonical[key]
+            for key in ("page", "page_end", "section", "chunk_index")
+            if key in canonical
+        }
+        vector_metadata["sources"] = sorted({source for source, _ in refs})
+        vector_metadata["citations"] = [self._format_citation(source, entry) for source, entry in refs]
+        return vector_metadata
+    
+    def _manifest_metadata(self, manifest: IndexManifest) -> Dict[str, Dict[str, Any]]:
+        """Expected metadata of every vector referenced by the manifest"""
+        order = {filename: idx for idx, filename in enumerate(FRAMEWORKS)}
+        refs: Dict[str, List[Tuple[bool, int, int, str, Dict[str, Any]]]] = {}
+        for filename, entry_file in manifest.files.items():
+            source = FRAMEWORKS.get(filename, {}).get("source", filename)
+            for vector_id, entry in entry_file["chunks"].items():
+                refs.setdefault(vector_id, []).append((
+                    entry.get("duplicate", False), order.get(filename, len(order)),
+                    entry.get("chunk_index", 0), source, entry
+                ))
+        
+        return {
+            vector_id: self._vector_metadata([
+                (source, entry) for *_, source, entry in sorted(vector_refs, key=lambda r: r[:3])
+            ])
+            for vector_id, vector_refs in refs.items()
+        }
+    
+    def _find_entry(self, manifest: IndexManifest, vector_id: str) -> Dict[str, Any]:
+        """The canonical manifest entry of a vector"""
+        for filename in manifest.files:
+            entry = manifest.chunks(filename).get(vector_id)
+            if entry and not entry.get("duplicate"):
+                return entry
+        raise KeyError(vector_id)
+    
+    @staticmethod
+    def _format_citation(source: str, entry: Dict[str, Any]) -> str:
+        """Citation like 'NIST SP 800-61 p.12-13'"""
+        page, page_end = entry.get("page"), entry.get("page_end", entry.get("page"))
+        pages = f"{page}-{page_end}" if page_end != page else f"{page}"
+        return f"{source} p.{pages}"
+    
+    def _build_vectors(
+        self,
+        chunks: List[Dict[str, Any]],
+        embeddings: List[List[float]],
+        metadata: Dict[str, str]
+    ) -> List[Dict[str, Any]]:
+        """Prepare vectors for Pinecone"""
+        vectors = []
+        for chunk, embedding in zip(chunks, embeddings):
             vectors.append({
-                "id": vector_id,
+                "id": chunk["id"],
                 "values": embedding,
                 "metadata": {
                     "source": metadata["source"],
                     "full_name": metadata["full_name"],
                     "version": metadata["version"],
                     "url": metadata["url"],
-                    "page": chunk["page"],
                     "text": chunk["text"],
-                    "chunk_index": idx
+                    **self._vector_metadata([(metadata["source"], self._chunk_metadata(chunk))])
                 }
             })
         
         return vectors
     
-    def _generate_vector_id(self, source: str, page: int, chunk_idx: int) -> str:
-        """Generate unique vector ID"""
-        raw_id = f"{source}-page{page}-chunk{chunk_idx}"
-        # Use hash to ensure consistent IDs
-        return hashlib.md5(raw_id.encode()).hexdigest()
+    def _generate_vector_id(self, source: str, text: str) -> str:
+        """
+        Generate a content-addressed vector ID
+        
+        The ID depends only on the framework and the chunk text, so an edit
+        that shifts chunk positions does not change the IDs of untouched chunks.
+        """
+        return hashlib.sha256(f"{source}\n{text}".encode("utf-8")).hexdigest()[:32]
 
 async def main():
     """Main indexing function"""
+    parser = argparse.ArgumentParser(description="Index framework PDFs into the vector database")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-embed every chunk instead of only new and changed ones"
+    )
+    args = parser.parse_args()
+    
     indexer = FrameworkIndexer()
     
     # Optional: Clear existing index
     # await indexer.vector_db.delete_all()
     
-    await indexer.index_all_frameworks()
+    try:
+        await indexer.index_all_frameworks(full=args.full)
+    finally:
+        await close_http_clients()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
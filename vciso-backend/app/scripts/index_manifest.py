@@ -0,0 +1,129 @@
+# vciso-backend/app/scripts/index_manifest.py
+"""
+Manifest of what has already been indexed into the vector database.
+
+The manifest records, for each framework PDF, the SHA-256 of the file and
+the content-addressed vector IDs of every chunk it produced. The indexer
+uses it to skip unchanged files, reuse vectors for unchanged chunks and
+delete vectors that no file references any more.
+
+Format:
+{
+    "version": 1,
+    "index_name": "vciso-frameworks",
+    "embedding_model": "text-embedding-3-small",
+    "chunker": "structured:400:50",
+    "files": {
+        "nist_sp_800_61.pdf": {
+            "sha256": "9f86d08...",
+            "chunks": {
+                "<vector id>": {"page": 12, "page_end": 13, "section": "3.2 Detection and Analysis", "chunk_index": 40}
+            }
+        }
+    }
+}
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: Path) -> str:
+    """Hash a file in 1MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IndexManifest:
+    """Per-file hashes and chunk IDs from the last successful indexing run"""
+    
+    def __init__(
+        self,
+        index_name: str,
+        embedding_model: str,
+        chunker: str,
+        files: Optional[Dict[str, Any]] = None,
+        reusable: bool = True,
+        up_to_date: bool = True
+    ):
+        self.index_name = index_name
+        self.embedding_model = embedding_model
+        self.chunker = chunker
+        self.files: Dict[str, Dict[str, Any]] = files or {}
+        # Existing vectors can be reused (same embedding model)
+        self.reusable = reusable
+        # Unchanged files can be skipped (same model and chunking settings)
+        self.up_to_date = up_to_date
+    
+    @classmethod
+    def load(cls, path: Path, index_name: str, embedding_model: str, chunker: str) -> "IndexManifest":
+        """
+        Load the manifest, or return an empty one if it is missing, unreadable
+        or was built for a different index.
+        
+        A manifest from another embedding model or chunker configuration is
+        kept so its vectors can be cleaned up, but files are re-processed
+        (and, for a new model, re-embedded).
+        """
+        empty = cls(index_name, embedding_model, chunker)
+        if not path.exists():
+            return empty
+        
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable index manifest {path}: {e}")
+            return empty
+        
+        if data.get("version") != MANIFEST_VERSION or data.get("index_name") != index_name:
+            logger.info("Index manifest is for a different index, re-indexing everything")
+            return empty
+        
+        reusable = data.get("embedding_model") == embedding_model
+        up_to_date = reusable and data.get("chunker") == chunker
+        if not up_to_date:
+            logger.info("Embedding model or chunking settings changed, re-processing every file")
+        
+        return cls(index_name, embedding_model, chunker, data.get("files", {}), reusable, up_to_date)
+    
+    def save(self, path: Path):
+        """Write the manifest atomically"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps({
+            "version": MANIFEST_VERSION,
+            "index_name": self.index_name,
+            "embedding_model": self.embedding_model,
+            "chunker": self.chunker,
+            "files": self.files,
+        }, indent=2, sort_keys=True))
+        os.replace(tmp_path, path)
+    
+    def file_hash(self, filename: str) -> Optional[str]:
+        entry = self.files.get(filename)
+        return entry["sha256"] if entry else None
+    
+    def chunks(self, filename: str) -> Dict[str, Dict[str, Any]]:
+        entry = self.files.get(filename)
+        return entry["chunks"] if entry else {}
+    
+    def set_file(self, filename: str, sha256: str, chunks: Dict[str, Dict[str, Any]]):
+        self.files[filename] = {"sha256": sha256, "chunks": chunks}
+    
+    def remove_file(self, filename: str):
+        self.files.pop(filename, None)
+    
+    def all_ids(self) -> Set[str]:
+        """Every vector ID referenced by any file"""
+        return {vector_id for entry in self.files.values() for vector_id in entry["chunks"]}
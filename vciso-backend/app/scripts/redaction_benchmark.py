@@ -0,0 +1,116 @@
+"""
+Micro-benchmark for PII redaction throughput.
+
+Usage:
+    python -m app.scripts.redaction_benchmark
+    python -m app.scripts.redaction_benchmark --size-mb 4 --repeat 7 --pii-every 20
+
+This script:
+1. Builds a corpus of plan-like Markdown (the stand-in server's plan) of the
+   requested size, with an email, phone, SSN or card number on every Nth line.
+2. Times PII_Redactor (one combined pattern, one pass) against the previous
+   implementation (one re.sub pass per PII type) for redact and contains_pii,
+   taking the best of several runs, and reports throughput in MB/s.
+3. Checks that both implementations redact the corpus identically.
+4. Times the combined scan with a dictionary of company names (EntityRedactor), and
+   how long that dictionary takes to build.
+"""
+
+import argparse
+import re
+import time
+from typing import Callable, Dict, Pattern
+
+from app.core.guardrails import PII_PATTERNS, EntityRedactor, PII_Redactor
+from app.scripts.stand_in_server import render_plan
+
+SAMPLE_PII = [
+    "Escalate to jane.doe@example.com",
+    "Call the on-call lead at 555-123-4567",
+    "Employee SSN 123-45-6789 must not be shared",
+    "Corporate card 4111 1111 1111 1111 is frozen",
+]
+
+
+class FourPassRedactor:
+    """The previous implementation: one pattern and one pass per PII type"""
+
+    def __init__(self):
+        order = ["email", "phone", "ssn", "credit_card"]
+        self.patterns: Dict[str, Pattern] = {name: re.compile(PII_PATTERNS[name]) for name in order}
+
+    def redact(self, text: str) -> str:
+        redacted = text
+        for pii_type, pattern in self.patterns.items():
+            redacted = pattern.sub(f"[{pii_type.upper()}_REDACTED]", redacted)
+        return redacted
+
+    def contains_pii(self, text: str) -> bool:
+        return any(pattern.search(text) for pattern in self.patterns.values())
+
+
+def build_corpus(size_mb: float, pii_every: int) -> str:
+    plan_lines = render_plan("**Company Name:** Test Corp\n- Industry: Healthcare").splitlines()
+    lines = []
+    size = 0
+    target = int(size_mb * 1024 * 1024)
+    i = 0
+    while size < target:
+        line = plan_lines[i % len(plan_lines)]
+        if pii_every and i % pii_every == 0:
+            line = f"{line} {SAMPLE_PII[(i // pii_every) % len(SAMPLE_PII)]}."
+        lines.append(line)
+        size += len(line) + 1
+        i += 1
+    return "\n".join(lines)
+
+
+def best_time(func: Callable[[str], object], text: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(text)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PII redaction throughput")
+    parser.add_argument("--size-mb", type=float, default=2.0, help="Corpus size in MB")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is reported)")
+    parser.add_argument("--pii-every", type=int, default=10, help="Put PII on every Nth line (0 = none)")
+    parser.add_argument("--entities", type=int, default=20000, help="Names in the entity dictionary")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.size_mb, args.pii_every)
+    # Clean text makes contains_pii scan everything instead of stopping at the first hit
+    clean = build_corpus(args.size_mb, 0)
+    megabytes = len(corpus.encode()) / (1024 * 1024)
+
+    single = PII_Redactor()
+    legacy = FourPassRedactor()
+
+    identical = single.redact(corpus) == legacy.redact(corpus)
+    spans = len(single.redact_with_spans(corpus).spans)
+
+    print(f"Corpus: {megabytes:.2f} MB, {spans} PII matches, outputs identical: {identical}")
+    print(f"{'operation':<26}{'four-pass MB/s':>16}{'single-pass MB/s':>18}{'speedup':>10}")
+    for name, old, new, text in [
+        ("redact", legacy.redact, single.redact, corpus),
+        ("contains_pii (clean text)", legacy.contains_pii, single.contains_pii, clean),
+    ]:
+        old_rate = megabytes / best_time(old, text, args.repeat)
+        new_rate = megabytes / best_time(new, text, args.repeat)
+        print(f"{name:<26}{old_rate:>16.1f}{new_rate:>18.1f}{new_rate / old_rate:>9.2f}x")
+    rate = megabytes / best_time(single.redact_with_spans, corpus, args.repeat)
+    print(f"{'redact_with_spans':<26}{'':>16}{rate:>18.1f}")
+
+    started = time.perf_counter()
+    entities = EntityRedactor({"employee": [f"Employee{i} Surname{i % 997}" for i in range(args.entities)]})
+    built = time.perf_counter() - started
+    rate = megabytes / best_time(lambda text: single.redact(text, entities), corpus, args.repeat)
+    print(f"{'redact + entities':<26}{'':>16}{rate:>18.1f}   ({entities.size} names, built in {built:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
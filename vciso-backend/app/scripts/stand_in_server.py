@@ -0,0 +1,760 @@
+"""
+Offline stand-in for the OpenAI and Pinecone APIs.
+
+Usage:
+    python -m app.scripts.stand_in_server                      # http://127.0.0.1:8100
+    python -m app.scripts.stand_in_server --chat-latency lognormal:3:0.5 \\
+        --error-rate 0.01 --rate-limit-rate 0.05
+
+Point the app at it (e.g. in .env):
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1
+    PINECONE_HOST=http://127.0.0.1:8100
+
+This server:
+1. Serves chat completions (plain and streaming) and embeddings in the OpenAI
+   wire format, with deterministic content: the same request always gets the
+   same answer. Plan prompts get a Markdown plan with every required section,
+   gap-analysis prompts get gap JSON that GapAnalyzer parses, classification
+   prompts get VALID. /v1/models lists the configured models for health probes.
+2. Serves the Pinecone control plane (list/create/describe index) and the data
+   plane calls VectorDBService makes (query, upsert, update, delete, stats)
+   against an in-memory store seeded with a few framework passages, so gap
+   analysis finds guidance without indexing anything.
+3. Embeds text by feature hashing its words, so similar texts get similar
+   vectors and retrieval scores land on both sides of the RAG threshold.
+4. Injects latency (fixed, uniform or lognormal per endpoint group), random
+   5xx errors and 429s (random, or from an RPM/TPM quota) with Retry-After
+   headers, drawn from a seeded RNG so load tests are repeatable.
+5. Exposes /_stand_in/config (GET/PUT), /_stand_in/stats and /_stand_in/reset
+   so a benchmark can change faults and read counters between runs.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from collections import Counter as Tally
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.config import settings
+from app.core.tokenizer import count_tokens
+
+# Fixed so responses are byte-identical across runs
+CREATED = 1700000000
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class LatencyModel:
+    """Response delay distribution, parsed from specs like "fixed:0.05",
+    "uniform:0.01:0.04" or "lognormal:2.5:0.6" (median seconds, sigma)"""
+
+    kind: str = "fixed"
+    params: Tuple[float, ...] = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        kind, *raw = spec.split(":")
+        params = tuple(float(value) for value in raw)
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec {spec!r} (use fixed:S, uniform:LO:HI or lognormal:MEDIAN:SIGMA)")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        return self.params[0]
+
+    def __str__(self) -> str:
+        return ":".join([self.kind, *(f"{value:g}" for value in self.params)])
+
+
+@dataclass
+class StandInConfig:
+    chat_latency: LatencyModel = field(default_factory=lambda: LatencyModel("fixed", (0.0,)))
+    embedding_latency: LatencyModel = field(default_factory=lambda: LatencyModel("fixed", (0.0,)))
+    vector_latency: LatencyModel = field(default_factory=lambda: LatencyModel("fixed", (0.0,)))
+    error_rate: float = 0.0  # Fraction of requests answered with a 500
+    rate_limit_rate: float = 0.0  # Fraction of requests answered with a 429
+    retry_after_ms: int = 1000  # Retry-After sent with injected 429s
+    requests_per_minute: int = 0  # Simulated OpenAI quota (0 = unlimited)
+    tokens_per_minute: int = 0
+    stream_chunks: int = 40  # Deltas per streamed completion
+    seed: int = 0
+
+    def update(self, values: Dict[str, Any]):
+        for key, value in values.items():
+            if not hasattr(self, key):
+                raise ValueError(f"Unknown setting: {key}")
+            if key.endswith("_latency"):
+                value = LatencyModel.parse(value)
+            else:
+                value = type(getattr(self, key))(value)
+            setattr(self, key, value)
+
+    def describe(self) -> Dict[str, Any]:
+        values = asdict(self)
+        for key in ("chat_latency", "embedding_latency", "vector_latency"):
+            values[key] = str(getattr(self, key))
+        return values
+
+
+# ---------------------------------------------------------------------------
+# Deterministic content
+# ---------------------------------------------------------------------------
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+# Real embedding spaces are anisotropic: unrelated texts still score well above
+# zero. Mixing this much of one shared direction into every vector puts unrelated
+# texts at ~0.65 and related ones above RAG_SIMILARITY_THRESHOLD (0.7).
+EMBEDDING_SHARED_SIMILARITY = 0.65
+
+
+@lru_cache(maxsize=None)
+def _shared_direction(dimension: int) -> np.ndarray:
+    vector = np.random.default_rng(dimension).standard_normal(dimension).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def embed_text(text: str, dimension: int) -> np.ndarray:
+    """Unit vector from hashed words and word pairs (shared words -> higher cosine)"""
+    words = _WORD.findall(text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    hashed = np.zeros(dimension, dtype=np.float32)
+    for feature in features:
+        h = _digest(feature)
+        hashed[h % dimension] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = np.linalg.norm(hashed)
+    if norm:
+        hashed /= norm
+    # Hashed features are nearly orthogonal to the shared direction
+    hashed -= (hashed @ _shared_direction(dimension)) * _shared_direction(dimension)
+    norm = np.linalg.norm(hashed)
+    if norm:
+        hashed /= norm
+    vector = (
+        math.sqrt(EMBEDDING_SHARED_SIMILARITY) * _shared_direction(dimension)
+        + math.sqrt(1 - EMBEDDING_SHARED_SIMILARITY) * hashed
+    )
+    return vector / np.linalg.norm(vector)
+
+
+def _field(prompt: str, label: str) -> Optional[str]:
+    """Value after "**Label:**" on the same line or the next one"""
+    match = re.search(rf"\*\*{re.escape(label)}:\*\*[ \t]*(.*)(?:\n(.*))?", prompt)
+    if not match:
+        return None
+    return (match.group(1).strip() or (match.group(2) or "").strip()) or None
+
+
+def render_plan(user_prompt: str) -> str:
+    """IR plan Markdown following the structure required by the system prompt"""
+    company = _field(user_prompt, "Company Name") or "the Company"
+    concerns = _field(user_prompt, "Primary Security Concerns (prioritize these)") or "Ransomware"
+    industry = (re.search(r"Industry:\s*(.+)", user_prompt) or [None, "General"])[1].strip()
+
+    def playbook(threat: str) -> str:
+        return f"""### {threat}
+- **Detection:** Watch for alerts and user reports that indicate {threat.lower()} activity.
+- **Containment:** Isolate affected accounts and devices; preserve evidence before changes.
+- **Eradication:** Remove the root cause, reset credentials and patch exploited systems.
+- **Recovery:** Restore from known-good backups and monitor closely for 30 days.
+"""
+
+    return f"""# Incident Response Plan for {company}
+
+## 1. Executive Summary
+This plan describes how {company}, a {industry.lower()} business, detects, contains and
+recovers from security incidents. It prioritizes: {concerns}.
+
+## 2. Incident Response Team
+- **Incident Lead:** Security lead named in onboarding (contact: [PHONE], [EMAIL])
+- **Executive Sponsor:** Owner or CEO (contact: [PHONE])
+- **IT Support:** Managed service provider (contact: [PHONE])
+
+## 3. Incident Classification
+- **Critical:** Business operations stopped or regulated data exposed
+- **High:** A system or account compromised, contained to one team
+- **Medium:** Suspicious activity without confirmed compromise
+- **Low:** Policy violation or blocked attack
+
+## 4. Response Procedures
+{playbook("Ransomware")}
+{playbook("Phishing Attack")}
+{playbook("Data Breach")}
+## 5. Communication Plan
+- **Internal:** Incident Lead informs leadership within 1 hour of a High or Critical incident.
+- **External:** Customers, partners and authorities are notified as required by law.
+
+## 6. Post-Incident Review
+- Document the timeline, decisions and evidence within 5 business days.
+- Hold a lessons-learned meeting and track improvements to completion.
+
+## 7. Appendices
+- **Vendor contacts:** IT support and cybersecurity consultant (placeholders)
+- **Legal/compliance:** Breach notification duties for the {industry.lower()} industry
+"""
+
+
+def render_plan_part(user_prompt: str, heading: str) -> str:
+    """One section ("## 2. ...") or threat playbook ("### Ransomware") of render_plan"""
+    level = heading.split(" ", 1)[0]
+    lines = render_plan(user_prompt).splitlines()
+    start = next((i for i, line in enumerate(lines) if line.strip() == heading), None)
+    if start is None:
+        return f"{heading}\n- Stand-in content."
+    end = next(
+        (i for i in range(start + 1, len(lines))
+         if lines[i].startswith("#") and len(lines[i].split(" ", 1)[0]) <= len(level)),
+        len(lines),
+    )
+    return "\n".join(lines[start:end]).strip() + "\n"
+
+
+_SEVERITIES = ["critical", "high", "medium", "low"]
+_EFFORTS = ["1-2 days", "1 week", "2-4 weeks", "1-2 months"]
+
+
+def render_gap_analysis(user_prompt: str) -> str:
+    """Gap JSON in the structure GAP_ANALYSIS_SYSTEM_PROMPT asks for"""
+    section_match = re.search(r"\*\*Section: (.+?)\*\*", user_prompt)
+    section = section_match.group(1).strip() if section_match else "Plan"
+    section = re.sub(r"^\d+\.\s*", "", section)  # "2. Incident Response Team"
+    seed = _digest(user_prompt)
+
+    citations = dict(re.findall(r"^\[(\d+)\] ([^,\n]+, [^(\n]+?) \(", user_prompt, re.MULTILINE))
+    references = list(citations.values()) or ["NIST SP 800-61, Incident Handling"]
+
+    gaps = [
+        {
+            "severity": _SEVERITIES[(seed >> (8 * idx)) % len(_SEVERITIES)],
+            "description": f"{section}: {topic} is not defined in enough detail.",
+            "recommendation": f"Document {topic} for {section.lower()} and assign an owner.",
+            "framework_references": references[idx::2] or references[:1],
+            "estimated_effort": _EFFORTS[(seed >> (8 * idx + 4)) % len(_EFFORTS)],
+        }
+        for idx, topic in enumerate(["escalation criteria", "evidence handling"][: 1 + seed % 2])
+    ]
+    return json.dumps({
+        "gaps": gaps,
+        "strengths": [f"{section} names clear responsibilities."],
+    })
+
+
+def render_completion(messages: List[Dict[str, Any]]) -> str:
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = "\n".join(m["content"] for m in messages if m.get("role") == "user")
+    if "identify gaps" in system.lower():
+        return render_gap_analysis(user)
+    if "'VALID' or 'INVALID'" in user or "'VALID' or 'INVALID'" in system:
+        return "VALID"
+    if "Incident Response" in system:
+        part = re.search(r'Write ONLY (?:section|the) "(#+ [^"]+)"', user)
+        if part:
+            return render_plan_part(user, part.group(1))
+        plan = render_plan(user)
+        skipped = re.search(r"Do NOT write sections (.+?): ", user)
+        for heading in re.findall(r'"(#+ [^"]+)"', skipped.group(1) if skipped else ""):
+            plan = plan.replace(render_plan_part(user, heading), "")
+        return plan
+    return f"Stand-in response {_digest(system + user) % 10000:04d}."
+
+
+# Framework passages loaded into the in-memory index at startup
+SEED_GUIDANCE = [
+    ("NIST SP 800-61", "Preparation", 21,
+     "Incident response team roles, contact information and escalation paths should be documented "
+     "before an incident; the incident response team needs an incident lead and backups."),
+    ("NIST SP 800-61", "Detection and Analysis", 25,
+     "Detection of incidents relies on alerts, logs and user reports; incidents should be classified "
+     "by severity levels such as critical, high, medium and low to prioritize response."),
+    ("NIST SP 800-61", "Containment, Eradication and Recovery", 35,
+     "Containment procedures isolate affected systems and accounts; eradication removes the root cause "
+     "and recovery restores systems from backups while monitoring for reinfection."),
+    ("NIST SP 800-61", "Post-Incident Activity", 38,
+     "A post-incident review and lessons learned meeting should document the timeline, decisions "
+     "and improvements after each incident."),
+    ("CISA", "Ransomware Response Checklist", 11,
+     "Ransomware response: isolate infected devices, preserve evidence, restore from offline backups "
+     "and report the ransomware incident to authorities."),
+    ("CISA", "Communication and Notification", 14,
+     "The communication plan covers internal notifications to leadership and external notifications "
+     "to customers, partners and authorities as required by law."),
+    ("SANS", "Phishing Incident Handling", 7,
+     "Phishing attack response: detection of the phishing email, containment by resetting credentials, "
+     "eradication of malicious messages and recovery of affected accounts."),
+    ("SANS", "Data Breach Response", 9,
+     "Data breach response procedures: identify exposed data, contain the breach, notify affected "
+     "parties and meet legal and compliance requirements for the industry."),
+]
+
+
+# ---------------------------------------------------------------------------
+# In-memory vector index
+# ---------------------------------------------------------------------------
+
+class VectorStore:
+    """Dense vectors with metadata, cosine search and Pinecone-style filters"""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.vectors: Dict[str, Tuple[np.ndarray, Dict[str, Any]]] = {}
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> int:
+        for vector in vectors:
+            values = np.asarray(vector["values"], dtype=np.float32)
+            if values.shape != (self.dimension,):
+                raise ValueError(f"Vector dimension {values.shape[0]} does not match index dimension {self.dimension}")
+            norm = np.linalg.norm(values)
+            self.vectors[vector["id"]] = (values / norm if norm else values, vector.get("metadata") or {})
+        return len(vectors)
+
+    def seed(self, passages=SEED_GUIDANCE):
+        for idx, (source, section, page, text) in enumerate(passages):
+            self.upsert([{
+                "id": f"stand-in-{idx}",
+                "values": embed_text(f"{section}: {text}", self.dimension),
+                "metadata": {"source": source, "section": section, "page": page, "text": text},
+            }])
+
+    def query(self, vector: List[float], top_k: int, filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        candidates = [(vid, v, meta) for vid, (v, meta) in self.vectors.items() if _matches(meta, filter)]
+        if not candidates:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        query = query / norm if norm else query
+        scores = np.stack([v for _, v, _ in candidates]) @ query
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [
+            {"id": candidates[i][0], "score": round(float(scores[i]), 6), "metadata": candidates[i][2]}
+            for i in order
+        ]
+
+    def update(self, vector_id: str, set_metadata: Dict[str, Any]):
+        if vector_id in self.vectors:
+            values, metadata = self.vectors[vector_id]
+            self.vectors[vector_id] = (values, {**metadata, **set_metadata})
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False):
+        if delete_all:
+            self.vectors.clear()
+        for vector_id in ids or []:
+            self.vectors.pop(vector_id, None)
+
+
+def _matches(metadata: Dict[str, Any], condition: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the subset of Pinecone's filter language the app uses"""
+    if not condition:
+        return True
+    for key, expected in condition.items():
+        if key == "$or":
+            if not any(_matches(metadata, branch) for branch in expected):
+                return False
+        elif key == "$and":
+            if not all(_matches(metadata, branch) for branch in expected):
+                return False
+        else:
+            value = metadata.get(key)
+            if not isinstance(expected, dict):
+                expected = {"$eq": expected}
+            for op, operand in expected.items():
+                values = value if isinstance(value, list) else [value]
+                if op == "$eq" and operand not in values:
+                    return False
+                if op == "$ne" and operand in values:
+                    return False
+                if op == "$in" and not set(values) & set(operand):
+                    return False
+                if op == "$nin" and set(values) & set(operand):
+                    return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Fault injection
+# ---------------------------------------------------------------------------
+
+class FaultInjector:
+    """Seeded latency, error and rate-limit decisions plus an optional RPM/TPM quota"""
+
+    def __init__(self, config: StandInConfig):
+        self.config = config
+        self.reset()
+
+    def reset(self):
+        self.rng = random.Random(self.config.seed)
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+        self._window_tokens = 0
+
+    def delay(self, group: str) -> float:
+        model: LatencyModel = getattr(self.config, f"{group}_latency")
+        return max(model.sample(self.rng), 0.0)
+
+    def fault(self, tokens: int = 0, quota: bool = False) -> Optional[Tuple[int, float]]:
+        """(status, retry_after_seconds) to fail this request with, or None"""
+        roll = self.rng.random()
+        if roll < self.config.rate_limit_rate:
+            return 429, self.config.retry_after_ms / 1000
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            return 500, 0.0
+
+        if quota and (self.config.requests_per_minute or self.config.tokens_per_minute):
+            now = time.monotonic()
+            if now - self._window_start >= 60:
+                self._window_start, self._window_requests, self._window_tokens = now, 0, 0
+            rpm, tpm = self.config.requests_per_minute, self.config.tokens_per_minute
+            if (rpm and self._window_requests + 1 > rpm) or (tpm and self._window_tokens + tokens > tpm):
+                return 429, self._window_start + 60 - now
+            self._window_requests += 1
+            self._window_tokens += tokens
+        return None
+
+    def remaining(self) -> Dict[str, str]:
+        """x-ratelimit-remaining-* headers for the simulated quota (huge when unlimited)"""
+        rpm, tpm = self.config.requests_per_minute, self.config.tokens_per_minute
+        return {
+            "x-ratelimit-remaining-requests": str(rpm - self._window_requests if rpm else 1_000_000),
+            "x-ratelimit-remaining-tokens": str(tpm - self._window_tokens if tpm else 1_000_000_000),
+        }
+
+
+def _error_response(status: int, retry_after: float, api: str) -> JSONResponse:
+    message = "Rate limit reached (stand-in)" if status == 429 else "Injected server error (stand-in)"
+    if api == "openai":
+        body = {"error": {"message": message, "type": "rate_limit_exceeded" if status == 429 else "server_error",
+                          "param": None, "code": None}}
+    else:
+        body = {"error": {"code": "RESOURCE_EXHAUSTED" if status == 429 else "INTERNAL", "message": message},
+                "status": status}
+    headers = {}
+    if status == 429:
+        headers = {"retry-after-ms": str(int(retry_after * 1000)), "retry-after": str(math.ceil(retry_after))}
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+# ---------------------------------------------------------------------------
+# App
+# ---------------------------------------------------------------------------
+
+def create_app(config: Optional[StandInConfig] = None, seed_index: bool = True) -> FastAPI:
+    config = config or StandInConfig()
+    app = FastAPI(title="vCISO stand-in backends")
+    faults = FaultInjector(config)
+    indexes: Dict[str, VectorStore] = {}
+    stats: Tally = Tally()
+
+    if seed_index:
+        indexes[settings.PINECONE_INDEX_NAME] = VectorStore(settings.EMBEDDING_DIMENSION)
+        indexes[settings.PINECONE_INDEX_NAME].seed()
+
+    app.state.config = config
+    app.state.indexes = indexes
+    app.state.stats = stats
+
+    async def gate(route: str, group: str, api: str, tokens: int = 0, quota: bool = False,
+                   wait: bool = True) -> Tuple[Optional[JSONResponse], float]:
+        """Sample latency and faults; returns (error response or None, latency).
+        With wait=False the caller spends the latency itself (streams)."""
+        stats[f"{route}.requests"] += 1
+        delay = faults.delay(group)
+        fault = faults.fault(tokens, quota)
+        if delay and (wait or fault):
+            await asyncio.sleep(delay)
+        if fault:
+            status, retry_after = fault
+            stats[f"{route}.{status}"] += 1
+            return _error_response(status, retry_after, api), delay
+        return None, delay
+
+    def index_model(name: str, request: Request) -> Dict[str, Any]:
+        # Carries both the legacy (dimension/metric/spec) and the 2026-07
+        # (schema/deployment) description so any SDK version can parse it
+        dimension = indexes[name].dimension
+        return {
+            "name": name,
+            "host": str(request.base_url).rstrip("/"),
+            "dimension": dimension,
+            "metric": "cosine",
+            "spec": {"serverless": {"cloud": "aws", "region": "us-east-1"}},
+            "schema": {"fields": {"values": {"type": "dense_vector", "dimension": dimension, "metric": "cosine"}}},
+            "deployment": {"deployment_type": "managed", "cloud": "aws", "region": "us-east-1"},
+            "status": {"ready": True, "state": "Ready"},
+            "deletion_protection": "disabled",
+            "vector_type": "dense",
+        }
+
+    def data_index() -> VectorStore:
+        # The data plane host serves every index; the app only uses one
+        if not indexes:
+            indexes[settings.PINECONE_INDEX_NAME] = VectorStore(settings.EMBEDDING_DIMENSION)
+        return next(iter(indexes.values()))
+
+    # -- OpenAI -------------------------------------------------------------
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        prompt_tokens = sum(count_tokens(str(m.get("content", ""))) + 4 for m in messages) + 3
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens") or 0
+        stream = bool(body.get("stream"))
+        error, delay = await gate("chat", "chat", "openai", prompt_tokens + max_tokens, quota=True, wait=not stream)
+        if error:
+            return error
+
+        content = render_completion(messages)
+        completion_tokens = count_tokens(content)
+        completion_id = f"chatcmpl-stand-in-{_digest(json.dumps(messages, sort_keys=True)) % 10**12:012d}"
+        model = body.get("model", settings.OPENAI_MODEL)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        headers = faults.remaining()
+
+        if not stream:
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": CREATED,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }, headers=headers)
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        async def events():
+            def chunk(delta: Dict[str, Any], finish: Optional[str] = None, chunk_usage=None) -> str:
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": CREATED,
+                    "model": model,
+                    "choices": [] if chunk_usage else [{"index": 0, "delta": delta, "finish_reason": finish}],
+                }
+                if chunk_usage:
+                    payload["usage"] = chunk_usage
+                return f"data: {json.dumps(payload)}\n\n"
+
+            pieces = re.findall(r"\S*\s*", content)
+            size = max(1, math.ceil(len(pieces) / max(config.stream_chunks, 1)))
+            parts = ["".join(pieces[i:i + size]) for i in range(0, len(pieces), size)]
+            # Time to first token is a fifth of the sampled latency, the rest is spread evenly
+            await asyncio.sleep(delay * 0.2)
+            yield chunk({"role": "assistant", "content": ""})
+            for part in parts:
+                yield chunk({"content": part})
+                await asyncio.sleep(delay * 0.8 / max(len(parts), 1))
+            yield chunk({}, finish="stop")
+            if include_usage:
+                yield chunk({}, chunk_usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        tokens = sum(count_tokens(text) for text in texts)
+        error, _ = await gate("embeddings", "embedding", "openai", tokens)
+        if error:
+            return error
+
+        dimension = body.get("dimensions") or settings.EMBEDDING_DIMENSION
+        data = []
+        for idx, text in enumerate(texts):
+            vector = embed_text(text, dimension)
+            if body.get("encoding_format") == "base64":
+                embedding: Any = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+            else:
+                embedding = [round(float(value), 6) for value in vector]
+            data.append({"object": "embedding", "index": idx, "embedding": embedding})
+        return JSONResponse({
+            "object": "list",
+            "data": data,
+            "model": body.get("model", settings.EMBEDDING_MODEL),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }, headers=faults.remaining())
+
+    @app.get("/v1/models")
+    async def models():
+        # Reachability probe of the health monitor; not subject to injected faults
+        names = sorted({settings.OPENAI_MODEL, settings.EMBEDDING_MODEL})
+        return {"object": "list", "data": [{"id": name, "object": "model", "owned_by": "stand-in"} for name in names]}
+
+    # -- Pinecone control plane -------------------------------------------
+
+    @app.get("/indexes")
+    async def list_indexes(request: Request):
+        return {"indexes": [index_model(name, request) for name in indexes]}
+
+    @app.post("/indexes", status_code=201)
+    async def create_index(request: Request):
+        body = await request.json()
+        name = body["name"]
+        if name in indexes:
+            return JSONResponse({"error": {"code": "ALREADY_EXISTS", "message": f"Index {name} already exists"},
+                                 "status": 409}, status_code=409)
+        dense_fields = [
+            f for f in ((body.get("schema") or {}).get("fields") or {}).values()
+            if f.get("type") == "dense_vector"
+        ]
+        dimension = body.get("dimension") or (dense_fields[0]["dimension"] if dense_fields else None)
+        indexes[name] = VectorStore(int(dimension or settings.EMBEDDING_DIMENSION))
+        return index_model(name, request)
+
+    @app.get("/indexes/{name}")
+    async def describe_index(name: str, request: Request):
+        if name not in indexes:
+            return JSONResponse({"error": {"code": "NOT_FOUND", "message": f"Index {name} not found"},
+                                 "status": 404}, status_code=404)
+        return index_model(name, request)
+
+    # -- Pinecone data plane ----------------------------------------------
+
+    @app.post("/query")
+    async def query(request: Request):
+        body = await request.json()
+        error, _ = await gate("query", "vector", "pinecone")
+        if error:
+            return error
+        matches = data_index().query(body.get("vector") or [], int(body.get("topK", 10)), body.get("filter"))
+        if not body.get("includeMetadata"):
+            matches = [{"id": m["id"], "score": m["score"]} for m in matches]
+        return {"matches": matches, "namespace": body.get("namespace", ""), "usage": {"readUnits": 1}}
+
+    @app.post("/vectors/upsert")
+    async def upsert(request: Request):
+        body = await request.json()
+        error, _ = await gate("upsert", "vector", "pinecone")
+        if error:
+            return error
+        try:
+            count = data_index().upsert(body.get("vectors", []))
+        except ValueError as e:
+            return JSONResponse({"error": {"code": "INVALID_ARGUMENT", "message": str(e)}, "status": 400},
+                                status_code=400)
+        return {"upsertedCount": count}
+
+    @app.post("/vectors/update")
+    async def update(request: Request):
+        body = await request.json()
+        error, _ = await gate("update", "vector", "pinecone")
+        if error:
+            return error
+        data_index().update(body["id"], body.get("setMetadata") or {})
+        return {}
+
+    @app.post("/vectors/delete")
+    async def delete(request: Request):
+        body = await request.json()
+        error, _ = await gate("delete", "vector", "pinecone")
+        if error:
+            return error
+        data_index().delete(body.get("ids"), bool(body.get("deleteAll")))
+        return {}
+
+    @app.post("/describe_index_stats")
+    async def describe_index_stats():
+        store = data_index()
+        count = len(store.vectors)
+        return {
+            "namespaces": {"": {"vectorCount": count}} if count else {},
+            "dimension": store.dimension,
+            "indexFullness": 0.0,
+            "totalVectorCount": count,
+            "metric": "cosine",
+            "vectorType": "dense",
+        }
+
+    # -- Control ----------------------------------------------------------
+
+    @app.get("/_stand_in/config")
+    async def get_config():
+        return config.describe()
+
+    @app.put("/_stand_in/config")
+    async def put_config(request: Request):
+        try:
+            config.update(await request.json())
+        except (ValueError, TypeError) as e:
+            return JSONResponse({"detail": str(e)}, status_code=400)
+        faults.reset()
+        return config.describe()
+
+    @app.get("/_stand_in/stats")
+    async def get_stats():
+        return dict(sorted(stats.items()))
+
+    @app.post("/_stand_in/reset")
+    async def reset():
+        stats.clear()
+        faults.reset()
+        return {"status": "reset"}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the OpenAI and Pinecone APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--chat-latency", default="fixed:0", help="fixed:S, uniform:LO:HI or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--embedding-latency", default="fixed:0")
+    parser.add_argument("--vector-latency", default="fixed:0")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests failing with 429")
+    parser.add_argument("--retry-after-ms", type=int, default=1000)
+    parser.add_argument("--rpm", type=int, default=0, help="Simulated chat requests-per-minute quota (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="Simulated chat tokens-per-minute quota (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--empty-index", action="store_true", help="Start without the seed framework passages")
+    args = parser.parse_args()
+
+    config = StandInConfig(
+        chat_latency=LatencyModel.parse(args.chat_latency),
+        embedding_latency=LatencyModel.parse(args.embedding_latency),
+        vector_latency=LatencyModel.parse(args.vector_latency),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_ms=args.retry_after_ms,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        seed=args.seed,
+    )
+
+    import uvicorn
+    uvicorn.run(create_app(config, seed_index=not args.empty_index), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,109 @@
 # vciso-backend/app/services/gap_analyzer.py
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 from datetime import datetime
 from app.services.rag_service import RAGService
+from app.core.vector_db import VectorDBService
 from app.core.llm_client import OpenAIClient
+from app.core.task_profiles import get_task_profile
+from app.core.token_budget import truncate_to_tokens
+from app.core.tokenizer import count_message_tokens, count_tokens
 from app.models.gap_analysis import Gap, GapAnalysisResult, GapSeverity
 import json
 
 logger = logging.getLogger(__name__)
 
+# Prompt layout: OpenAI caches a repeated prompt prefix once it reaches
+# PROMPT_CACHE_MIN_TOKENS, and only when it is byte-identical between calls. The
+# system prompt is therefore the whole shared part of every section call, of every
+# analysis: the task, a framework reference (the lifecycle phases and what each plan
+# section should cover) and the output contract, together past that threshold.
+# The user message carries only what differs per call: the guidance retrieved for
+# that section (passages in a stable order), then the section itself.
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+GAP_ANALYSIS_SYSTEM_PROMPT = """You are a cybersecurity expert analyzing incident response plans against NIST, CISA, and SANS frameworks.
+
+Your task is to identify gaps and strengths in the provided plan section. Each request contains the framework guidance retrieved for one section of a small business's incident response plan, followed by that section. Compare the section against the guidance and against the framework reference below, and identify:
+1. Gaps (what's missing or inadequate)
+2. Strengths (what's done well)
+
+Be specific and actionable in your recommendations.
+
+## Framework Reference
+
+### NIST SP 800-61 (Computer Security Incident Handling Guide)
+The incident response life cycle has four phases:
+- Preparation: an incident response policy and plan, defined roles, contact lists, tools and jump kits, backups, logging, and training.
+- Detection and Analysis: known attack vectors, precursors and indicators, log and alert sources, initial analysis, documentation of every action, prioritization by functional and information impact and by recoverability, and notification of the right people.
+- Containment, Eradication, and Recovery: a containment strategy chosen per incident type, evidence gathering and handling with a chain of custody, identification of attacking hosts, removal of the attacker's foothold, and restoration from clean backups with closer monitoring afterwards.
+- Post-Incident Activity: a lessons-learned meeting soon after major incidents, use of the collected incident data, evidence retention, and updates to the plan and controls.
+
+### SANS Incident Handler's Handbook
+Six steps: Preparation, Identification, Containment (short-term, system backup, long-term), Eradication, Recovery, Lessons Learned. Each step has an owner, a checklist and the criteria to move on to the next one.
+
+### CISA incident response guidance
+- Coordinate early: report significant incidents to CISA or the FBI, and notify regulators, insurers, customers and law enforcement as legally required.
+- Ransomware: isolate affected systems from the network, keep offline and encrypted backups that are tested regularly, do not pay without legal and law-enforcement advice, and reset credentials once the attacker is removed.
+- Phishing: report and remove the messages, block the sender and links, reset exposed credentials and check for mailbox rules or other persistence.
+- Data breach: determine what data was exposed and whose, preserve evidence, and meet notification deadlines.
+
+### What each plan section should cover
+- Executive Summary: the plan's purpose and scope, who owns it, and when it is reviewed.
+- Incident Response Team: named roles (lead, technical, communications, legal, executive), backups for each role, and how to reach them out of hours.
+- Incident Classification: incident types, severity levels with concrete criteria, and the response time and escalation path for each level.
+- Response Procedures: step-by-step playbooks per threat covering detection, containment, eradication, recovery and evidence preservation, with the owner of each step.
+- Communication Plan: internal escalation, external contacts (vendors, insurers, law enforcement, regulators, customers), message templates, approval of public statements, and out-of-band channels in case email or chat is compromised.
+- Post-Incident Review: when a review is held, who attends, what is documented, and how findings update the plan and controls.
+- Appendices: contact lists, system and data inventory, tool-specific steps, regulatory notification requirements, and forms for incident records.
+
+## Output Contract
+
+Return your analysis as valid JSON with this structure:
+{
+  "gaps": [
+    {
+      "severity": "critical|high|medium|low",
+      "description": "What's missing or inadequate",
+      "recommendation": "Specific action to take",
+      "framework_references": ["Citation 1", "Citation 2"],
+      "estimated_effort": "Time estimate (e.g., '1-2 weeks')"
+    }
+  ],
+  "strengths": [
+    "What the plan does well (be specific)"
+  ]
+}
+
+Field rules:
+- Return only the JSON object, with no Markdown fences and no text before or after it.
+- "gaps" and "strengths" may be empty lists; never omit them.
+- "severity" is exactly one of critical, high, medium or low, in lower case.
+- "description" names the missing or inadequate element in one or two sentences, in terms of this section.
+- "recommendation" says what to add or change, who should own it, and how to verify it is done.
+- "framework_references" cites the guidance passages given with the section (source and section name) or the framework reference above (e.g. "NIST SP 800-61, Containment, Eradication, and Recovery").
+- "estimated_effort" is a duration for a small business without a dedicated security team: "1-2 days", "1 week", "2-4 weeks" or "1-2 months".
+
+Severity definitions:
+- critical: without it, an incident of a common type would likely go uncontained or unreported (e.g. no way to isolate systems, no backups to restore from, no one responsible).
+- high: the response would be much slower or riskier (e.g. no escalation criteria, no out-of-band communication, missing legal notification duties).
+- medium: the step exists but is vague, has no owner, or misses part of the framework guidance.
+- low: wording, completeness or maintenance issues that do not change the outcome of a response.
+
+Guidelines:
+- Only identify real gaps (compare against the framework context provided)
+- Be specific in recommendations (not generic advice)
+- Reference specific framework sections when possible
+- Prioritize gaps by severity (critical = could lead to major incident failures)
+- Judge the section on its own purpose; do not report content that belongs to another section as missing
+- Credit strengths only for content actually present in the section
+"""
+
 class GapAnalyzer:
     """Analyze IR plans against authoritative frameworks"""
     
-    def __init__(self):
-        self.rag_service = RAGService()
+    def __init__(self, vector_db: Optional[VectorDBService] = None):
+        self.rag_service = RAGService(vector_db)
         self.llm_client = OpenAIClient()
     
     async def analyze_plan(
@@ -27,22 +117,42 @@ class GapAnalyzer:
         Steps:
         1. Extract sections from the plan
         2. For each section, retrieve relevant framework guidance
-        3. Use LLM to compare plan vs. guidance and identify gaps
-        4. Aggregate results and calculate scores
+        3. Trim each section call to the gap_section input budget (long sections
+           truncated, least relevant guidance dropped)
+        4. Use LLM to compare each section vs. its guidance and identify gaps
+        5. Aggregate results and calculate scores
         """
         logger.info(f"Starting gap analysis for: {company_name}")
         
         # Extract key sections from the plan
         sections = self._extract_plan_sections(plan_markdown)
         
+        # Cap each section at a quarter of the budget; its guidance gets what is left
+        input_budget = get_task_profile("gap_section").input_tokens
+        
         # Analyze each section
         all_gaps = []
         all_strengths = []
         
         for section_name, section_content in sections.items():
+            guidance_results = await self.rag_service.retrieve_relevant_guidance(
+                query=f"{section_name}: {section_content[:500]}",  # Use first 500 chars for context
+                top_k=5
+            )
+            
+            # If no guidance found, skip analysis
+            if not guidance_results:
+                logger.warning(f"No guidance found for section: {section_name}")
+                continue
+            
+            prompt_section = truncate_to_tokens(section_content, input_budget // 4)
+            guidance_budget = input_budget - self._prompt_overhead(section_name, prompt_section)
+            guidance_results = self._fit_guidance(self._order_guidance(guidance_results), guidance_budget)
+            
             section_gaps, section_strengths = await self._analyze_section(
                 section_name=section_name,
-                section_content=section_content
+                section_content=prompt_section,
+                framework_context=self.rag_service.format_retrieved_context(guidance_results)
             )
             all_gaps.extend(section_gaps)
             all_strengths.extend(section_strengths)
@@ -92,116 +202,124 @@ class GapAnalyzer:
         
         return sections
     
+    def _order_guidance(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        A section's guidance, one entry per chunk (with its best score), in a
+        stable order so the same passages always format to the same context
+        """
+        merged: Dict[str, Dict[str, Any]] = {}
+        for result in results:
+            best = merged.get(result["id"])
+            if best is None or result["score"] > best["score"]:
+                merged[result["id"]] = result
+        
+        return sorted(
+            merged.values(),
+            key=lambda r: (
+                str(r["metadata"].get("source", "")),
+                str(r["metadata"].get("page", "")),
+                r["id"]
+            )
+        )
+    
+    def _prompt_overhead(self, section_name: str, section_content: str) -> int:
+        """Tokens of a section call's messages apart from the framework guidance"""
+        return count_message_tokens([
+            {"role": "system", "content": GAP_ANALYSIS_SYSTEM_PROMPT},
+            {"role": "user", "content": self._build_gap_analysis_prompt(section_name, section_content, "")},
+        ])
+    
+    def _fit_guidance(self, guidance: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+        """Drop the least relevant passages until the formatted guidance fits in budget tokens"""
+        format_context = self.rag_service.format_retrieved_context
+        kept = list(guidance)
+        while kept:
+            excess = count_tokens(format_context(kept)) - budget
+            if excess <= 0:
+                break
+            # Passage costs barely depend on their position, so drop enough of them at once
+            by_score = sorted(kept, key=lambda r: r["score"])
+            dropped = set()
+            for result in by_score:
+                if excess <= 0:
+                    break
+                dropped.add(result["id"])
+                excess -= count_tokens(format_context([result]))
+            kept = [r for r in kept if r["id"] not in dropped]
+        
+        if len(kept) < len(guidance):
+            logger.info(f"Dropped {len(guidance) - len(kept)} of {len(guidance)} guidance passages to fit {budget} tokens")
+        return kept
+    
     async def _analyze_section(
         self,
         section_name: str,
-        section_content: str
+        section_content: str,
+        framework_context: str
     ) -> tuple[List[Gap], List[str]]:
-        """Analyze a single section of the plan"""
-        
-        # Retrieve relevant framework guidance
-        guidance_results = await self.rag_service.retrieve_relevant_guidance(
-            query=f"{section_name}: {section_content[:500]}",  # Use first 500 chars for context
-            top_k=5
-        )
-        
-        # If no guidance found, skip analysis
-        if not guidance_results:
-            logger.warning(f"No guidance found for section: {section_name}")
-            return [], []
-        
-        # Format guidance as context
-        context = self.rag_service.format_retrieved_context(guidance_results)
+        """Analyze a single section of the plan against its framework guidance"""
         
         # Build prompt for LLM to identify gaps
         analysis_prompt = self._build_gap_analysis_prompt(
             section_name=section_name,
             section_content=section_content,
-            framework_context=context
+            framework_context=framework_context
         )
         
-        # Call LLM to analyze
-        system_prompt = """You are a cybersecurity expert analyzing incident response plans against NIST, CISA, and SANS frameworks.
-
-Your task is to identify gaps and strengths in the provided plan section.
-
-Return your analysis as valid JSON with this structure:
-{
-  "gaps": [
-    {
-      "severity": "critical|high|medium|low",
-      "description": "What's missing or inadequate",
-      "recommendation": "Specific action to take",
-      "framework_references": ["Citation 1", "Citation 2"],
-      "estimated_effort": "Time estimate (e.g., '1-2 weeks')"
-    }
-  ],
-  "strengths": [
-    "What the plan does well (be specific)"
-  ]
-}
-
-Guidelines:
-- Only identify real gaps (compare against the framework context provided)
-- Be specific in recommendations (not generic advice)
-- Reference specific framework sections when possible
-- Prioritize gaps by severity (critical = could lead to major incident failures)
-"""
-        
         try:
-            response = await self.llm_client.generate_plan(
-                system_prompt=system_prompt,
+            # Short structured extraction: the small model's profile, escalated to
+            # the large model when its JSON does not parse into gaps
+            response = await self.llm_client.complete(
+                "gap_section",
+                system_prompt=GAP_ANALYSIS_SYSTEM_PROMPT,
                 user_prompt=analysis_prompt,
-                temperature=0.3  # Lower temperature for more consistent analysis
+                validate=lambda text: self._parse_section_analysis(section_name, text),
+                hedge=True,  # Short calls with a long tail: a duplicate is cheap insurance
+                call_site="gap_section"
             )
             
-            # Parse JSON response
-            analysis_result = json.loads(response)
-            
-            # Convert to Gap objects
-            gaps = [
-                Gap(
-                    id=f"{section_name.lower().replace(' ', '-')}-gap-{idx}",
-                    section=section_name,
-                    severity=GapSeverity(gap_data["severity"]),
-                    description=gap_data["description"],
-                    recommendation=gap_data["recommendation"],
-                    framework_references=gap_data["framework_references"],
-                    estimated_effort=gap_data["estimated_effort"]
-                )
-                for idx, gap_data in enumerate(analysis_result.get("gaps", []))
-            ]
-            
-            strengths = analysis_result.get("strengths", [])
-            
-            return gaps, strengths
+            return self._parse_section_analysis(section_name, response)
             
         except Exception as e:
             logger.error(f"Error analyzing section {section_name}: {e}")
             return [], []
     
+    def _parse_section_analysis(self, section_name: str, response: str) -> tuple[List[Gap], List[str]]:
+        """Parse the LLM's JSON into gaps and strengths (raises if it does not fit the schema)"""
+        analysis_result = json.loads(response)
+        
+        # Convert to Gap objects
+        gaps = [
+            Gap(
+                id=f"{section_name.lower().replace(' ', '-')}-gap-{idx}",
+                section=section_name,
+                severity=GapSeverity(gap_data["severity"]),
+                description=gap_data["description"],
+                recommendation=gap_data["recommendation"],
+                framework_references=gap_data["framework_references"],
+                estimated_effort=gap_data["estimated_effort"]
+            )
+            for idx, gap_data in enumerate(analysis_result.get("gaps", []))
+        ]
+        
+        strengths = analysis_result.get("strengths", [])
+        
+        return gaps, strengths
+    
     def _build_gap_analysis_prompt(
         self,
         section_name: str,
         section_content: str,
         framework_context: str
     ) -> str:
-        """Build prompt for gap analysis"""
-        return f"""Analyze this IR plan section against framework guidance.
+        """Build the per-section user message (the shared instructions are in the system prompt)"""
+        return f"""**Framework Guidance:**
+{framework_context}
 
 **Section: {section_name}**
 
 **Current Plan Content:**
 {section_content}
-
-**Framework Guidance:**
-{framework_context}
-
-Identify:
-1. Gaps (what's missing or inadequate)
-2. Strengths (what's done well)
-
-Be specific and actionable in your recommendations.
 """
     
     def _calculate_overall_score(self, gaps: List[Gap]) -> int:
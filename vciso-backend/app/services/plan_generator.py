@@ -1,9 +1,18 @@
 from app.core.meta_prompting import MetaPromptEngine
 from app.core.llm_client import OpenAIClient
-from app.core.guardrails import PII_Redactor
+from app.core.guardrails import EntityRedactor, PII_Redactor, get_entity_redactor
+from app.core.plan_cache import PlanCache, plan_cache_key
+from app.core.plan_templates import LOCAL_SECTIONS, PlanTemplateEngine, SectionMerger
+from app.core.task_profiles import get_task_profile
+from app.core.semantic_cache import SemanticPlanCache, personalize_plan, profile_fingerprint
+from app.core.embeddings import EmbeddingService
 from app.models.plan import OnboardingData, GeneratedPlan
+from app.config import settings
 from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -14,9 +23,37 @@ How the code works:
 2. The generate method takes OnboardingData as input
 3. It builds system and user prompts using MetaPromptEngine
 4. It calls OpenAIClient to generate the plan text
-5. It redacts any PII from the plan using PII_Redactor
+5. It redacts any PII from the LLM's text using PII_Redactor, together with the
+   company's own names (employees including the security lead, vendors, hostnames)
+   in the same scan, using the company's cached EntityRedactor
 6. It validates the plan structure and logs any missing sections
 7. It returns a GeneratedPlan object containing the plan and metadata
+
+Plans are cached by a hash of the normalized onboarding data, model, temperature
+and prompt version. A cache hit skips steps 3-5 and only rebuilds the metadata.
+Identical requests that arrive while a plan is being generated share that
+generation. Pass use_cache=False to force a fresh plan.
+
+With the semantic cache enabled, an exact-cache miss embeds a company-agnostic
+profile fingerprint and reuses the plan of the most similar earlier profile
+(same industry, lead type and tools, similarity above the threshold), rewritten
+with the new company and lead names. Otherwise the LLM generates a new plan.
+
+Both caches hold only the redacted LLM text. The locally rendered sections below
+carry the company's own data (lead, tools, vendors), so they are rendered from the
+requesting company's onboarding data and merged in on every hit.
+
+With PLAN_PARALLEL_SECTIONS enabled, step 4 sends one call per plan section (one per
+threat playbook under Response Procedures) concurrently, all sharing the company
+context, and stitches the answers in outline order. Latency is then bounded by the
+longest section instead of the whole document. generate_stream always uses one call.
+
+With PLAN_LOCAL_SECTIONS enabled (the default), the Incident Response Team and the
+Appendices are rendered locally from the onboarding data by PlanTemplateEngine. The
+LLM is asked for the other sections only and the two are merged in outline order.
+
+generate_stream follows the same steps but yields the plan as it is produced:
+("delta", text) events with redacted Markdown, then one ("done", summary) event.
 """
 
 
@@ -31,36 +68,379 @@ class PlanGeneratorService:
         self.meta_engine = MetaPromptEngine()
         self.llm_client = OpenAIClient()
         self.pii_redactor = PII_Redactor()
+        self.cache_enabled = settings.PLAN_CACHE_ENABLED
+        self.plan_cache = PlanCache(
+            max_entries=settings.PLAN_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.PLAN_CACHE_TTL_SECONDS,
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.semantic_cache_enabled = self.cache_enabled and settings.PLAN_SEMANTIC_CACHE_ENABLED
+        self.semantic_cache = SemanticPlanCache(
+            threshold=settings.PLAN_SEMANTIC_CACHE_THRESHOLD,
+            max_entries=settings.PLAN_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.PLAN_CACHE_TTL_SECONDS,
+        )
+        self.embedding_service = EmbeddingService() if self.semantic_cache_enabled else None
+        self.parallel_sections = settings.PLAN_PARALLEL_SECTIONS
+        self.template_engine = PlanTemplateEngine()
+        self.local_sections = LOCAL_SECTIONS if settings.PLAN_LOCAL_SECTIONS else ()
+
+    async def generate(self, data: OnboardingData, use_cache: bool = True) -> GeneratedPlan:
+        """Generate an IR plan and metadata for the provided onboarding data.
+
+        The guardrails run before any cache lookup: a cached plan never skips them.
+        """
+
+        validated_prompt = await self.validate_request(data)
+        if not (use_cache and self.cache_enabled):
+            markdown = self._assemble_plan(data, await self._generate_markdown(data, validated_prompt))
+            return GeneratedPlan(markdown=markdown, metadata=self._build_metadata(data))
+
+        key = self._cache_key(data)
+        cached_plan = self.plan_cache.get(key)
+        if cached_plan is not None:
+            logger.info(f"Plan cache hit for: {data.companyName}")
+            return GeneratedPlan(
+                markdown=self._assemble_plan(data, cached_plan),
+                metadata=self._build_metadata(data, cached=True),
+            )
+
+        # Coalesce concurrent duplicates (double-clicks, client retries) onto one generation
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._generate_and_cache(key, data, validated_prompt))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shield so one caller disconnecting does not cancel the others
+        markdown, similarity = await asyncio.shield(pending)
+        return GeneratedPlan(
+            markdown=self._assemble_plan(data, markdown),
+            metadata=self._build_metadata(data, cached=similarity is not None, similarity=similarity),
+        )
+
+    async def _generate_and_cache(
+        self, key: str, data: OnboardingData, validated_prompt: str
+    ) -> Tuple[str, Optional[float]]:
+        """Return (LLM markdown, similarity); similarity is set when a similar profile's plan was reused."""
+        started = time.perf_counter()
+        embedding, match = await self._semantic_lookup(data, started)
+        if match:
+            markdown, similarity = match
+            self.plan_cache.set(key, markdown)
+            return markdown, similarity
+
+        markdown = await self._generate_markdown(data, validated_prompt)
+        self.plan_cache.set(key, markdown)
+        if embedding is not None:
+            self.semantic_cache.add(data, embedding, markdown, time.perf_counter() - started)
+        return markdown, None
+
+    async def _semantic_lookup(
+        self, data: OnboardingData, started: float
+    ) -> Tuple[Optional[List[float]], Optional[Tuple[str, float]]]:
+        """Embed the profile fingerprint and look for a reusable plan.
 
-    async def generate(self, data: OnboardingData) -> GeneratedPlan:
-        """Generate an IR plan and metadata for the provided onboarding data."""
+        Returns (embedding, (personalized LLM markdown, similarity) or None). Embedding
+        failures are logged and treated as a miss so generation still proceeds.
+        """
+        if not self.semantic_cache_enabled:
+            return None, None
+
+        try:
+            embedding = await self.embedding_service.generate_embedding(profile_fingerprint(data))
+        except Exception as e:
+            logger.warning(f"Semantic plan cache unavailable: {e}")
+            return None, None
+
+        match = self.semantic_cache.lookup(data, embedding)
+        if not match:
+            return embedding, None
+
+        entry, similarity = match
+        markdown = personalize_plan(entry.markdown, data)
+        saved = entry.generation_seconds - (time.perf_counter() - started)
+        self.semantic_cache.record_savings(saved)
+        stats = self.semantic_cache.stats()
+        logger.info(
+            f"Semantic plan cache hit for: {data.companyName} (similarity {similarity:.3f}, "
+            f"saved ~{saved:.1f}s, hit rate {stats['hit_rate']:.0%})"
+        )
+        return embedding, (markdown, similarity)
+
+    async def _generate_markdown(self, data: OnboardingData, validated_prompt: str) -> str:
+        """Call the LLM with validate_request's prompt and return its redacted Markdown, without the local sections."""
 
         logger.info(f"Generating plan for: {data.companyName}")
 
         system_prompt = self.meta_engine.system_prompt
-        user_prompt = self.meta_engine.build_prompt(data)
-        validated_prompt = self.meta_engine.apply_guardrails(user_prompt)
+        local = self._render_local_sections(data)
+        entities = self._entity_redactor(data)
+        if self.parallel_sections:
+            return await self._generate_sections(data, system_prompt, validated_prompt, local, entities)
 
         plan_markdown = await self.llm_client.generate_plan(
             system_prompt=system_prompt,
-            user_prompt=validated_prompt,
+            user_prompt=validated_prompt + self.meta_engine.skip_sections_instruction(list(local)),
+            expected_output_tokens=self._expected_output_tokens(local),
         )
+        return self.pii_redactor.redact(plan_markdown, entities)
 
-        clean_plan = self.pii_redactor.redact(plan_markdown)
-        validated_plan = self._validate_plan_structure(clean_plan)
+    def _assemble_plan(self, data: OnboardingData, llm_markdown: str) -> str:
+        """Merge the company's local sections into (possibly cached) LLM Markdown and validate it.
 
-        return GeneratedPlan(
-            markdown=validated_plan,
-            metadata={
-                "company": data.companyName,
-                "industry": data.industry,
-                "employee_count": data.employeeCount,
-                "generated_at": datetime.utcnow().isoformat() + "Z",
+        Local sections are the company's own data and are merged in unredacted.
+        """
+        plan = self._section_merger(self._render_local_sections(data)).merge(llm_markdown)
+        return self._validate_plan_structure(plan)
+
+    async def _generate_sections(
+        self,
+        data: OnboardingData,
+        system_prompt: str,
+        user_prompt: str,
+        local: Dict[str, str],
+        entities: Optional[EntityRedactor] = None
+    ) -> str:
+        """Generate every non-local plan section concurrently, redact them and stitch them in outline order.
+
+        The local sections are left out; _assemble_plan merges them in.
+
+        If one section fails, the remaining calls are cancelled and the error is raised.
+        """
+        parts = self.meta_engine.plan_parts(exclude=list(local))
+        tasks = [
+            asyncio.ensure_future(self.llm_client.complete(
+                "plan_section",
+                system_prompt=system_prompt,
+                user_prompt=user_prompt + self.meta_engine.section_instruction(section, playbook),
+                hedge=True,
+                call_site="plan_section",
+                expected_output_tokens=settings.PLAN_SECTION_OUTPUT_TOKENS,
+            ))
+            for section, playbook in parts
+        ]
+        try:
+            texts = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        sections = {part: self.pii_redactor.redact(text, entities) for part, text in zip(parts, texts)}
+        return self._stitch_sections(data, sections)
+
+    def _render_local_sections(self, data: OnboardingData) -> Dict[str, str]:
+        """Locally rendered section bodies, by section title (empty when disabled)"""
+        if not self.local_sections:
+            return {}
+        rendered = self.template_engine.render_sections(data)
+        return {section: rendered[section] for section in self.local_sections}
+
+    def _entity_redactor(self, data: OnboardingData) -> Optional[EntityRedactor]:
+        """The company's names to redact from LLM text (None when there are none)
+
+        The security lead is not redacted: the company named them for its own plan,
+        and the locally rendered team section prints the name anyway. They stay
+        unredacted even when the employee list also holds them.
+        """
+        lead = (data.securityLead.name or "").strip().lower()
+        employees = [name for name in data.employees if not lead or name.strip().lower() != lead]
+        return get_entity_redactor(
+            data.companyName,
+            {"employee": employees, "vendor": data.vendors, "hostname": data.hostnames},
+        )
+
+    def _expected_output_tokens(self, local: Dict[str, str]) -> int:
+        """Output budget of a single-call plan: a share per section the LLM writes"""
+        return settings.PLAN_SECTION_OUTPUT_TOKENS * len(self.meta_engine.plan_parts(exclude=list(local)))
+
+    def _section_merger(self, local: Dict[str, str]) -> SectionMerger:
+        sections = self.meta_engine.PLAN_SECTIONS
+        headings = {section: self.meta_engine.section_heading(section) for section in sections}
+        return SectionMerger(sections, headings, local)
+
+    def _stitch_sections(self, data: OnboardingData, texts: Dict[Tuple[str, Optional[str]], str]) -> str:
+        """Assemble section texts under canonical headings, in outline order (sections without text are left out)"""
+        lines = [f"# Incident Response Plan for {data.companyName}", ""]
+        for section in self.meta_engine.PLAN_SECTIONS:
+            if section != self.meta_engine.RESPONSE_PROCEDURES and (section, None) not in texts:
+                continue
+            lines.append(self.meta_engine.section_heading(section))
+            if section == self.meta_engine.RESPONSE_PROCEDURES:
+                for playbook in self.meta_engine.THREAT_PLAYBOOKS:
+                    lines.append(f"### {playbook}")
+                    lines.extend([self._section_body(texts[(section, playbook)], playbook), ""])
+            else:
+                lines.extend([self._section_body(texts[(section, None)], section), ""])
+        return "\n".join(lines)
+
+    @staticmethod
+    def _section_body(text: str, title: str) -> str:
+        """Drop the headings a section answer repeats (plan title, its own heading)"""
+        lines = text.strip().splitlines()
+        while lines and (
+            not lines[0].strip()
+            or (lines[0].lstrip().startswith("#") and (title in lines[0] or "Incident Response Plan" in lines[0]))
+        ):
+            lines.pop(0)
+        return "\n".join(lines).rstrip()
+
+    async def validate_request(self, data: OnboardingData) -> str:
+        """Build the user prompt and run the guardrails on it.
+
+        Raises GuardrailViolation (a ValueError) when the request is rejected.
+        """
+        user_prompt = self.meta_engine.build_prompt(data)
+        return await self.meta_engine.apply_guardrails_async(user_prompt, data, self.llm_client)
+
+    async def generate_stream(
+        self, data: OnboardingData, use_cache: bool = True, validated_prompt: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Stream an IR plan as ("delta", {"text": ...}) events and a final ("done", {...}) event.
+
+        Deltas are redacted incrementally and merged with the local sections before
+        anything leaves the server. The streaming redactor holds back only text where
+        PII or a company name could still be completing, so the streamed plan equals
+        the redacted whole document. A cached plan is sent as a single delta.
+
+        validated_prompt is validate_request's result when the caller already ran the
+        guardrails (the stream endpoint does, so a rejection is an HTTP 400). Either way
+        they run before any cache lookup.
+        """
+
+        if validated_prompt is None:
+            validated_prompt = await self.validate_request(data)
+        use_cache = use_cache and self.cache_enabled
+        key = self._cache_key(data) if use_cache else None
+        cached_plan = self.plan_cache.get(key) if use_cache else None
+        if cached_plan is not None:
+            logger.info(f"Plan cache hit for: {data.companyName}")
+            plan = self._assemble_plan(data, cached_plan)
+            yield "delta", {"text": plan}
+            yield "done", self._stream_summary(data, plan, usage=None, cached=True)
+            return
+
+        started = time.perf_counter()
+        embedding, match = await self._semantic_lookup(data, started) if use_cache else (None, None)
+        if match:
+            markdown, similarity = match
+            self.plan_cache.set(key, markdown)
+            plan = self._assemble_plan(data, markdown)
+            yield "delta", {"text": plan}
+            yield "done", self._stream_summary(data, plan, usage=None, cached=True, similarity=similarity)
+            return
+
+        logger.info(f"Streaming plan for: {data.companyName}")
+
+        system_prompt = self.meta_engine.system_prompt
+        local = self._render_local_sections(data)
+
+        stream = await self.llm_client.stream_plan(
+            system_prompt=system_prompt,
+            user_prompt=validated_prompt + self.meta_engine.skip_sections_instruction(list(local)),
+            expected_output_tokens=self._expected_output_tokens(local),
+        )
+
+        merger = self._section_merger(local)
+        redactor = self.pii_redactor.stream(self._entity_redactor(data))
+        # The caches get the redacted LLM text only (see _assemble_plan)
+        llm_parts: List[str] = []
+        plan_parts: List[str] = []
+        async for delta in stream:
+            redacted = redactor.feed(delta)
+            llm_parts.append(redacted)
+            clean = merger.feed(redacted)
+            if clean:
+                plan_parts.append(clean)
+                yield "delta", {"text": clean}
+
+        redacted = redactor.flush()
+        llm_parts.append(redacted)
+        clean = merger.feed(redacted) + merger.close()
+        if clean:
+            plan_parts.append(clean)
+            yield "delta", {"text": clean}
+
+        plan = self._validate_plan_structure("".join(plan_parts))
+        llm_markdown = "".join(llm_parts)
+        if use_cache:
+            self.plan_cache.set(key, llm_markdown)
+        if embedding is not None:
+            self.semantic_cache.add(data, embedding, llm_markdown, time.perf_counter() - started)
+
+        yield "done", self._stream_summary(data, plan, usage=stream.usage)
+
+    def _stream_summary(
+        self,
+        data: OnboardingData,
+        plan: str,
+        usage,
+        cached: bool = False,
+        similarity: Optional[float] = None
+    ) -> Dict[str, Any]:
+        missing_sections = self._missing_sections(plan)
+        return {
+            "metadata": self._build_metadata(data, cached=cached, similarity=similarity),
+            "usage": {
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "total_tokens": usage.total_tokens,
+            } if usage else None,
+            "validation": {
+                "valid": not missing_sections,
+                "missing_sections": missing_sections,
             },
+        }
+
+    def _cache_key(self, data: OnboardingData) -> str:
+        profile = get_task_profile("plan")
+        return plan_cache_key(
+            data,
+            model=profile.model,
+            temperature=profile.temperature,
+            prompt_version=self._prompt_variant(),
         )
 
+    def _prompt_variant(self) -> str:
+        """Prompt version plus the generation mode, which changes the plan's wording"""
+        variant = self.meta_engine.PROMPT_VERSION
+        if self.parallel_sections:
+            variant += "-sections"
+        if self.local_sections:
+            variant += "-local"
+        return variant
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {
+            "exact": self.plan_cache.stats(),
+            "semantic": {"enabled": self.semantic_cache_enabled, **self.semantic_cache.stats()},
+        }
+
+    def _build_metadata(
+        self, data: OnboardingData, cached: bool = False, similarity: Optional[float] = None
+    ) -> Dict[str, Any]:
+        metadata = {
+            "company": data.companyName,
+            "industry": data.industry,
+            "employee_count": data.employeeCount,
+            "generated_at": datetime.utcnow().isoformat() + "Z",
+            "cached": cached,
+        }
+        if similarity is not None:
+            metadata["profile_similarity"] = round(similarity, 4)
+        return metadata
+
     def _validate_plan_structure(self, plan: str) -> str:
         """Log missing sections and return the plan unchanged."""
+        missing_sections = self._missing_sections(plan)
+
+        if missing_sections:
+            logger.warning(f"Plan missing sections: {missing_sections}")
+
+        return plan
+
+    def _missing_sections(self, plan: str) -> List[str]:
         required_sections = [
             "Executive Summary",
             "Incident Response Team",
@@ -68,9 +448,4 @@ class PlanGeneratorService:
             "Communication Plan",
         ]
 
-        missing_sections = [s for s in required_sections if s not in plan]
-
-        if missing_sections:
-            logger.warning(f"Plan missing sections: {missing_sections}")
-
-        return plan
+        return [s for s in required_sections if s not in plan]
@@ -10,9 +10,9 @@ logger = logging.getLogger(__name__)
 class RAGService:
     """Retrieval-Augmented Generation service for framework guidance"""
     
-    def __init__(self):
+    def __init__(self, vector_db: Optional[VectorDBService] = None):
         self.embedding_service = EmbeddingService()
-        self.vector_db = VectorDBService()
+        self.vector_db = vector_db or VectorDBService()
         self.top_k = settings.RAG_TOP_K
         self.similarity_threshold = settings.RAG_SIMILARITY_THRESHOLD
     
@@ -40,8 +40,11 @@ class RAGService:
             # Generate embedding for the query
             query_embedding = await self.embedding_service.generate_embedding(query)
             
-            # Build filter if framework is specified
-            filter_metadata = {"source": framework} if framework else None
+            # Build filter if framework is specified. Deduplicated chunks list
+            # every framework they appear in under "sources"
+            filter_metadata = {
+                "$or": [{"source": framework}, {"sources": {"$in": [framework]}}]
+            } if framework else None
             
             # Query vector database
             results = await self.vector_db.query(
@@ -71,10 +74,10 @@ class RAGService:
         
         Returns formatted string like:
         
-        [1] NIST SP 800-61, Section 3.2 (Page 15):
+        [1] NIST SP 800-61, 3.2.4 Containment (Pages 35-36):
         "Incident response procedures should include..."
         
-        [2] CISA Guidelines, Section 2.1 (Page 8):
+        [2] CISA, 2.1 Response Planning (Page 8):
         "Organizations must implement containment strategies..."
         """
         if not results:
@@ -85,11 +88,24 @@ class RAGService:
             metadata = result["metadata"]
             source = metadata.get("source", "Unknown")
             section = metadata.get("section", "Unknown Section")
-            page = metadata.get("page", "N/A")
+            pages = self._format_pages(metadata)
             text = metadata.get("text", "")
             score = result["score"]
             
-            citation = f"[{idx}] {source}, {section} (Page {page}) [Relevance: {score:.2f}]:\n\"{text}\"\n"
+            citation = f"[{idx}] {source}, {section} ({pages}) [Relevance: {score:.2f}]:\n\"{text}\"\n"
+            
+            # Near-duplicate passages are stored once but cited everywhere they appear
+            also_in = metadata.get("citations", [])[1:]
+            if also_in:
+                citation += f"Also in: {'; '.join(also_in)}\n"
             context_parts.append(citation)
         
-        return "\n\n".join(context_parts)
\ No newline at end of file
+        return "\n\n".join(context_parts)
+    
+    def _format_pages(self, metadata: Dict[str, Any]) -> str:
+        """Format the page span of a chunk, e.g. 'Page 12' or 'Pages 12-13'"""
+        page = metadata.get("page", "N/A")
+        page_end = metadata.get("page_end", page)
+        if page_end != page:
+            return f"Pages {page}-{page_end}"
+        return f"Page {page}"
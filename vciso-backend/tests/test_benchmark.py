@@ -0,0 +1,118 @@
+import pytest
+import httpx
+from fastapi import FastAPI, HTTPException, Response
+from app.scripts.benchmark import (
+    Sample, compare, load_plan_payloads, parse_mix, run_load, stage_breakdown, summarize, wait_until_ready
+)
+
+
+class TestBenchmarkLoad:
+    """Test request generation and load driving"""
+    
+    def test_parse_mix(self):
+        """Test that endpoint weights are parsed and validated"""
+        assert parse_mix("plan=3,gap=1") == {"plan": 3.0, "gap": 1.0}
+        assert parse_mix("gap") == {"gap": 1.0}
+        with pytest.raises(ValueError):
+            parse_mix("plan=0")
+    
+    def test_payloads_from_samples(self):
+        """Test that the test_api.sh and test_integration.py samples are used"""
+        payloads = load_plan_payloads()
+        
+        assert [p["companyName"] for p in payloads] == ["Acme Corporation", "Test Company"]
+        assert payloads[0]["securityLead"]["name"] == "Jane Smith"
+    
+    @pytest.mark.asyncio
+    async def test_run_load_follows_mix(self):
+        """Test that every scheduled request is sent and failures are recorded"""
+        app = FastAPI()
+        
+        @app.post("/ok")
+        async def ok():
+            return {}
+        
+        @app.post("/fail")
+        async def fail():
+            raise HTTPException(status_code=503)
+        
+        requests = {"ok": [{"path": "/ok", "json": {}}], "fail": [{"path": "/fail", "json": {}}]}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            samples, elapsed = await run_load(client, requests, {"ok": 3, "fail": 1}, concurrency=4, total_requests=40)
+        
+        assert len(samples) == 40 and elapsed > 0
+        by_status = {s.endpoint: s.status for s in samples}
+        assert by_status == {"ok": 200, "fail": 503}
+        assert 20 <= sum(s.endpoint == "ok" for s in samples) < 40
+        
+        with pytest.raises(ValueError):
+            await run_load(client, requests, {"other": 1}, concurrency=1, total_requests=1)
+
+
+    @pytest.mark.asyncio
+    async def test_wait_until_ready_polls_readiness(self):
+        """Test that the run waits for the app's readiness check, and gives up after the timeout"""
+        app = FastAPI()
+        polls = []
+        
+        @app.get("/health/ready")
+        async def ready(response: Response):
+            polls.append(1)
+            if len(polls) < 3 or app.state.never_ready:
+                response.status_code = 503
+            return {}
+        
+        app.state.never_ready = False
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await wait_until_ready(client, timeout=5, interval=0.01)
+            assert len(polls) == 3
+            
+            app.state.never_ready = True
+            with pytest.raises(RuntimeError, match="not ready"):
+                await wait_until_ready(client, timeout=0.05, interval=0.01)
+
+
+class TestBenchmarkReport:
+    """Test result summaries, stage breakdowns and comparisons"""
+    
+    def test_summarize(self):
+        """Test throughput, percentiles and error rate per endpoint"""
+        samples = [Sample("plan", 200, latency / 100, 0) for latency in range(1, 101)]
+        samples.append(Sample("gap", 500, 2.0, 0))
+        
+        result = summarize(samples, elapsed=10.0)
+        
+        plan = result["endpoints"]["plan"]
+        assert plan["requests"] == 100 and plan["throughput_rps"] == 10.0
+        assert plan["latency_seconds"]["p50"] == pytest.approx(0.505)
+        assert plan["latency_seconds"]["p99"] == pytest.approx(0.9901)
+        assert result["endpoints"]["gap"]["error_rate"] == 1.0
+        assert result["overall"]["status_counts"] == {"200": 100, "500": 1}
+    
+    def test_stage_breakdown_is_a_difference(self):
+        """Test that stages only count calls made between the two snapshots"""
+        labels = {"endpoint": "/api/v1/plans/generate", "model": "gpt-4o", "call_site": "plan"}
+        before = {"llm_request_duration_seconds": [{"labels": labels, "count": 2, "sum": 3.0}]}
+        after = {
+            "llm_request_duration_seconds": [{"labels": labels, "count": 6, "sum": 11.0}],
+            "vector_db_request_duration_seconds": [
+                {"labels": {"endpoint": "/api/v1/gap-analysis/analyze", "operation": "query"}, "count": 0, "sum": 0.0}
+            ],
+        }
+        
+        assert stage_breakdown(before, after) == {
+            "/api/v1/plans/generate": {"llm:plan": {"calls": 4, "total_seconds": 8.0, "mean_seconds": 2.0}}
+        }
+    
+    def test_compare(self):
+        """Test that a comparison reports relative changes of the headline numbers"""
+        def report(p95):
+            return {"commit": "abc", "timestamp": "t", "results": {"endpoints": {"plan": {
+                "throughput_rps": 2.0, "error_rate": 0.0,
+                "latency_seconds": {"p50": 1.0, "p95": p95, "p99": 4.0},
+            }}}}
+        
+        lines = compare(report(3.0), report(2.0))
+        
+        assert lines[0] == "Compared with abc (t):"
+        assert any("p95" in line and "(+50.0%)" in line for line in lines)
@@ -0,0 +1,68 @@
+import pytest
+from app.core.chunking import StructuredChunker, is_heading
+
+
+class TestHeadingDetection:
+    """Test section heading detection"""
+    
+    def test_numbered_headings(self):
+        """Test numbered section headings"""
+        assert is_heading("3.2.4 Containment")
+        assert is_heading("3. Handling an Incident")
+        assert is_heading("Appendix A—Incident Handling Scenarios")
+    
+    def test_non_headings(self):
+        """Test body text, questions and table of contents lines"""
+        assert not is_heading("2013 was a busy year for incident responders.")
+        assert not is_heading("5. What services does the incident response team provide?")
+        assert not is_heading("3.2 Detection and Analysis .................... 25")
+        assert not is_heading("Containment is important before an incident overwhelms resources")
+
+
+class TestStructuredChunker:
+    """Test document chunking"""
+    
+    @pytest.fixture
+    def chunker(self):
+        return StructuredChunker(max_tokens=60, overlap_tokens=10, min_tokens=10)
+    
+    def test_sentence_spans_page_break(self, chunker):
+        """Test that a sentence split across pages stays in one chunk"""
+        pages = [
+            (0, "1. Introduction\nIncident response must be planned before an"),
+            (1, "incident occurs. Plans should be tested."),
+        ]
+        chunks = chunker.chunk_pages(pages)
+        assert len(chunks) == 1
+        assert "before an\nincident occurs" in chunks[0]["text"]
+        assert chunks[0]["page_start"] == 0
+        assert chunks[0]["page_end"] == 1
+        assert chunks[0]["section"] == "1. Introduction"
+    
+    def test_sections_start_new_chunks(self, chunker):
+        """Test that each section gets its own chunks and section label"""
+        body = "Responders should document every action they take. " * 3
+        pages = [(0, f"3.2.3 Detection\n{body}\n3.2.4 Containment\n{body}")]
+        chunks = chunker.chunk_pages(pages)
+        assert [c["section"] for c in chunks] == ["3.2.3 Detection", "3.2.4 Containment"]
+        assert chunks[1]["text"].startswith("3.2.4 Containment")
+    
+    def test_chunks_respect_token_limit(self, chunker):
+        """Test that long sections are split into token-sized chunks"""
+        body = " ".join(f"Step {i} of the recovery procedure is verified." for i in range(40))
+        chunks = chunker.chunk_pages([(0, f"3.4 Recovery\n{body}")])
+        assert len(chunks) > 1
+        assert all(chunker.count_tokens(c["text"]) <= 60 for c in chunks)
+        assert all(c["section"] == "3.4 Recovery" for c in chunks)
+    
+    def test_running_headers_removed(self, chunker):
+        """Test that lines repeated on every page are dropped"""
+        phases = ["Preparation", "Detection", "Containment", "Recovery"]
+        pages = [
+            (i, f"COMPUTER SECURITY INCIDENT HANDLING GUIDE\n{i + 1}\n{phase} is described here.")
+            for i, phase in enumerate(phases)
+        ]
+        chunks = chunker.chunk_pages(pages)
+        text = " ".join(c["text"] for c in chunks)
+        assert "HANDLING GUIDE" not in text
+        assert "Recovery is described here." in text
@@ -0,0 +1,53 @@
+import pytest
+from app.core.dedup import MinHasher, NearDuplicateIndex, estimate_similarity
+
+BASE_TEXT = (
+    "Containment is important before an incident overwhelms resources or increases damage. "
+    "Most incidents require containment, so that is an important consideration early in the "
+    "course of handling each incident. Containment provides time for developing a tailored "
+    "remediation strategy, and decisions are much easier to make if there are predetermined "
+    "strategies and procedures for containing the incident."
+)
+
+
+class TestMinHasher:
+    """Test MinHash signatures"""
+    
+    def test_identical_texts(self):
+        """Test that identical texts have identical signatures"""
+        hasher = MinHasher()
+        assert estimate_similarity(hasher.signature(BASE_TEXT), hasher.signature(BASE_TEXT)) == 1.0
+    
+    def test_signatures_are_stable(self):
+        """Test that separately created hashers agree (signatures are persisted)"""
+        assert (MinHasher().signature(BASE_TEXT) == MinHasher().signature(BASE_TEXT)).all()
+    
+    def test_hex_round_trip(self):
+        """Test signature serialization"""
+        signature = MinHasher().signature(BASE_TEXT)
+        assert (MinHasher.from_hex(MinHasher.to_hex(signature)) == signature).all()
+
+
+class TestNearDuplicateIndex:
+    """Test LSH near-duplicate lookup"""
+    
+    def test_finds_near_duplicate(self):
+        """Test that a lightly edited copy maps to the original"""
+        hasher = MinHasher()
+        index = NearDuplicateIndex(threshold=0.8)
+        index.add("nist-1", hasher.signature(BASE_TEXT))
+        
+        edited = BASE_TEXT + " See Section 3.3.1."
+        assert index.find(hasher.signature(edited)) == "nist-1"
+    
+    def test_ignores_different_text(self):
+        """Test that unrelated text is not reported as a duplicate"""
+        hasher = MinHasher()
+        index = NearDuplicateIndex(threshold=0.8)
+        index.add("nist-1", hasher.signature(BASE_TEXT))
+        
+        other = (
+            "Phishing attacks trick employees into revealing credentials. Train staff to "
+            "report suspicious email and verify requests for payments by phone."
+        )
+        assert index.find(hasher.signature(other)) is None
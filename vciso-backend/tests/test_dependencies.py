@@ -0,0 +1,142 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app.api.dependencies import ServiceContainer
+from app.config import settings
+from app.core import http_client
+from app.core.health_monitor import HealthMonitor
+from app.core.vector_db import VectorDBService
+
+
+class TestLazyServices:
+    """Test that services are built on first use, not at import or construction"""
+    
+    def test_vector_db_construction_makes_no_calls(self):
+        """Test that the Pinecone client and index check wait for first use"""
+        with patch('app.core.vector_db.Pinecone') as mock_pinecone_class:
+            mock_pinecone_class.return_value.list_indexes.return_value = []
+            service = VectorDBService()
+            
+            mock_pinecone_class.assert_not_called()
+            
+            service.connect()
+            service.connect()
+        
+        client = mock_pinecone_class.return_value
+        client.list_indexes.assert_called_once()
+        client.create_index.assert_called_once()
+        assert client.Index.return_value.describe_index_stats.call_count == 2
+    
+    def test_container_builds_each_service_once(self):
+        """Test that a service is built on first access and then reused"""
+        services = ServiceContainer()
+        with patch('app.api.dependencies.PlanGeneratorService') as mock_service_class:
+            assert services.plan_service is services.plan_service
+        
+        mock_service_class.assert_called_once()
+    
+    def test_concurrent_first_use_builds_once(self):
+        """Test that threads racing on first access share one service"""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        def slow_build():
+            time.sleep(0.05)
+            return MagicMock()
+        
+        services = ServiceContainer()
+        with patch('app.api.dependencies.PlanGeneratorService', side_effect=slow_build) as mock_service_class, \
+             ThreadPoolExecutor(max_workers=8) as pool:
+            built = list(pool.map(lambda _: services.plan_service, range(8)))
+        
+        mock_service_class.assert_called_once()
+        assert all(service is built[0] for service in built)
+    
+    def test_missing_openai_key_answers_503(self, monkeypatch):
+        """Test that a plan request without OPENAI_API_KEY is unavailable, not an internal error"""
+        from app.main import app
+        
+        monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+        monkeypatch.setattr(app.state, "services", ServiceContainer(), raising=False)
+        
+        response = TestClient(app).get("/api/v1/plans/cache/stats")
+        
+        assert response.status_code == 503
+        assert response.json()["detail"] == "Plan generation is not configured"
+    
+    @pytest.mark.asyncio
+    async def test_health_monitor_starts_without_openai_key(self, monkeypatch):
+        """Test that a missing API key fails the OpenAI probe instead of app startup"""
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+        monkeypatch.setattr(http_client, "_openai_client", None)
+        services = ServiceContainer()
+        
+        with patch('app.core.vector_db.Pinecone') as mock_pinecone_class:
+            mock_pinecone_class.return_value.list_indexes.return_value = []
+            monitor = services.health_monitor
+            snapshot = (await monitor.refresh()).to_dict()
+        
+        assert snapshot["status"] == "unhealthy"
+        assert snapshot["checks"]["vector_db"]["status"] == "ok"
+        assert snapshot["checks"]["openai"]["status"] == "error"
+        assert services._gap_analyzer is None
+
+
+class TestWarmUp:
+    """Test background warm-up and readiness"""
+    
+    @pytest.fixture
+    def services(self):
+        services = ServiceContainer()
+        services._plan_service = MagicMock()
+        services._gap_analyzer = MagicMock()
+        services._vector_db = MagicMock()
+        return services
+    
+    @pytest.mark.asyncio
+    async def test_checks_run_concurrently(self, services):
+        """Test that warm-up takes as long as its slowest check, not the sum"""
+        def slow_check():
+            time.sleep(0.2)
+        
+        services.vector_db.connect.side_effect = slow_check
+        with patch('app.api.dependencies.get_encoding', side_effect=slow_check):
+            started = asyncio.get_running_loop().time()
+            await services.warm_up()
+            elapsed = asyncio.get_running_loop().time() - started
+        
+        assert elapsed < 0.35
+        assert services.readiness()["ready"]
+    
+    @pytest.mark.asyncio
+    async def test_failed_check_keeps_app_not_ready(self, services):
+        """Test that a failing dependency is reported per check"""
+        services.vector_db.connect.side_effect = ConnectionError("pinecone unreachable")
+        
+        assert not services.readiness()["ready"]
+        await services.warm_up()
+        readiness = services.readiness()
+        
+        assert not readiness["ready"]
+        assert readiness["checks"]["vector_db"]["status"] == "failed"
+        assert "unreachable" in readiness["checks"]["vector_db"]["error"]
+        assert readiness["checks"]["tokenizer"]["status"] == "ok"
+    
+    def test_liveness_and_readiness_endpoints(self):
+        """Test that liveness answers before warm-up finishes and readiness reports it"""
+        from app.main import app
+        
+        async def never_finishes(self):
+            self.checks["vector_db"] = {"status": "pending"}
+            await asyncio.Event().wait()
+        
+        with patch.object(ServiceContainer, 'warm_up', never_finishes), \
+             patch.object(HealthMonitor, 'start'), TestClient(app) as client:
+            live = client.get("/health/live")
+            ready = client.get("/health/ready")
+        
+        assert live.status_code == 200
+        assert ready.status_code == 503
+        assert ready.json()["checks"]["vector_db"]["status"] == "pending"
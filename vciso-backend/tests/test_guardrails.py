@@ -1,5 +1,5 @@
 import pytest
-from app.core.guardrails import PII_Redactor
+from app.core.guardrails import EntityRedactor, PII_Redactor, get_entity_redactor
 
 
 class TestPIIRedactor:
@@ -57,3 +57,189 @@ class TestPIIRedactor:
         text = "This is a normal text without any sensitive information"
         result = redactor.redact(text)
         assert result == text
+    
+    def test_redact_with_spans_reports_types_and_offsets(self):
+        """Test that spans give the type and original position of each match"""
+        redactor = PII_Redactor()
+        text = "Email test@example.com or call 555-123-4567"
+        
+        result = redactor.redact_with_spans(text)
+        
+        assert result.text == redactor.redact(text)
+        assert [(s.pii_type, text[s.start:s.end]) for s in result.spans] == [
+            ("email", "test@example.com"),
+            ("phone", "555-123-4567"),
+        ]
+    
+    def test_leftmost_match_wins_on_overlap(self):
+        """Test that a card number running into an email is redacted whole, not split"""
+        redactor = PII_Redactor()
+        
+        result = redactor.redact_with_spans("Card 4111 1111 1111 1111.ops@example.com")
+        
+        assert result.text == "Card [CREDIT_CARD_REDACTED][EMAIL_REDACTED]"
+        assert [s.pii_type for s in result.spans] == ["credit_card", "email"]
+    
+    def test_ssn_is_not_a_phone_number(self):
+        """Test that SSN-shaped digits get the SSN placeholder"""
+        redactor = PII_Redactor()
+        
+        assert redactor.redact("SSN 123-45-6789, phone 555.123.4567") == "SSN [SSN_REDACTED], phone [PHONE_REDACTED]"
+    
+    def test_single_pass_matches_per_type_passes(self):
+        """Test that the combined pattern redacts plan text like one pass per type did"""
+        from app.scripts.redaction_benchmark import FourPassRedactor, build_corpus
+        
+        corpus = build_corpus(0.05, pii_every=3)
+        
+        assert PII_Redactor().redact(corpus) == FourPassRedactor().redact(corpus)
+
+
+class TestStreamingRedactor:
+    """Test incremental redaction of streamed text"""
+    
+    def stream_in_chunks(self, redactor, text, sizes, entities=None):
+        stream = redactor.stream(entities)
+        out = []
+        pos = 0
+        for size in sizes:
+            out.append(stream.feed(text[pos:pos + size]))
+            pos += size
+        out.append(stream.feed(text[pos:]))
+        out.append(stream.flush())
+        return out
+    
+    def test_email_split_across_chunks(self):
+        """Test that PII spanning a chunk boundary is redacted"""
+        redactor = PII_Redactor()
+        stream = redactor.stream()
+        
+        first = stream.feed("Escalate to sec")
+        second = stream.feed("urity@testcorp.com today.\n")
+        
+        assert "sec" not in first
+        assert first + second + stream.flush() == "Escalate to [EMAIL_REDACTED] today.\n"
+    
+    def test_safe_text_is_released_immediately(self):
+        """Test that only the tail that could still become PII is held back"""
+        stream = PII_Redactor().stream()
+        
+        assert stream.feed("Isolate the affected laptops.\nThen call ") == "Isolate the affected laptops.\nThen call "
+        assert stream.feed("555-123") == ""
+        assert stream.feed("-4567, then") == "[PHONE_REDACTED], "
+    
+    def test_complete_match_waits_for_possible_extension(self):
+        """Test that a match that more input could extend is not emitted early"""
+        redactor = PII_Redactor()
+        text = "Mail ops@example.com.au or 555-123-45678 now"
+        
+        out = self.stream_in_chunks(redactor, text, [20, 3, 18])
+        
+        assert "".join(out) == redactor.redact(text)
+        assert "[EMAIL_REDACTED] or 555-123-45678 now" == "".join(out)[5:]
+    
+    def test_any_chunking_matches_whole_document(self):
+        """Test that random chunk boundaries never change the redacted output"""
+        import random
+        from app.scripts.redaction_benchmark import build_corpus
+        
+        redactor = PII_Redactor()
+        pieces = ["555-123-4567", "123-45-6789", "4111 1111 1111 1111", "ops@example.com.au",
+                  "1234", "-", " ", ".", "x", "@", "\n", "hello "]
+        rng = random.Random(7)
+        texts = [build_corpus(0.02, pii_every=2)] + [
+            "".join(rng.choice(pieces) for _ in range(rng.randint(1, 12))) for _ in range(2000)
+        ]
+        
+        for text in texts:
+            sizes = [rng.randint(1, 9) for _ in range(len(text) // 3 + 1)]
+            assert "".join(self.stream_in_chunks(redactor, text, sizes)) == redactor.redact(text), text
+
+    def test_entities_any_chunking_matches_whole_document(self):
+        """Test that names split across chunks are redacted exactly like the whole document"""
+        import random
+        
+        redactor = PII_Redactor()
+        entities = EntityRedactor({
+            "employee": ["Jane Smith", "Jane", "Bob O'Neil"],
+            "vendor": ["Smith Co", "Acme IT Services"],
+            "hostname": ["db-01.corp.local"],
+        })
+        pieces = ["Jane", " ", "Smith", "Co", "jane@x.com", "555-123-4567", "db-01", ".corp", ".local",
+                  "-", "\n", "x", "Bob", " O'Neil", "'", ".", "Acme IT", " Services"]
+        rng = random.Random(11)
+        
+        for _ in range(3000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 14)))
+            sizes = [rng.randint(1, 7) for _ in range(len(text) // 3 + 1)]
+            streamed = "".join(self.stream_in_chunks(redactor, text, sizes, entities))
+            assert streamed == redactor.redact(text, entities), text
+    
+    def test_possible_name_is_held_back(self):
+        """Test that a name prefix waits until it can no longer become a longer name"""
+        entities = EntityRedactor({"employee": ["Jane Smith"]})
+        stream = PII_Redactor().stream(entities)
+        
+        assert stream.feed("Ask Jane ") == "Ask "
+        assert stream.feed("Smith today") == "[EMPLOYEE_REDACTED] "
+        assert stream.flush() == "today"
+
+
+class TestEntityRedactor:
+    """Test redaction of tenant-supplied names"""
+    
+    @pytest.fixture
+    def entities(self):
+        return EntityRedactor({
+            "employee": ["Jane Smith", "Bob"],
+            "vendor": ["Acme IT Services"],
+            "hostname": ["db-01.corp.local"],
+        })
+    
+    def test_redacts_case_insensitively_on_word_boundaries(self, entities):
+        """Test that names match in any case but never inside longer words"""
+        text = "JANE SMITH and bob own db-01.corp.local; Bobby and db-01.corp.localhost do not."
+        
+        redacted = PII_Redactor().redact(text, entities)
+        
+        assert redacted == (
+            "[EMPLOYEE_REDACTED] and [EMPLOYEE_REDACTED] own [HOSTNAME_REDACTED]; "
+            "Bobby and db-01.corp.localhost do not."
+        )
+    
+    def test_one_scan_reports_pii_and_entity_spans(self, entities):
+        """Test that PII and names come out of the same scan, in text order"""
+        text = "Acme IT  Services: bob@acme.com, Jane\nSmith"
+        
+        result = PII_Redactor().redact_with_spans(text, entities)
+        
+        assert [span.pii_type for span in result.spans] == ["vendor", "email", "employee"]
+        assert result.text == "[VENDOR_REDACTED]: [EMAIL_REDACTED], [EMPLOYEE_REDACTED]"
+    
+    def test_leftmost_then_longest_name_wins(self):
+        """Test the overlap rule between names"""
+        entities = EntityRedactor({"employee": ["Jane", "Jane Smith"], "vendor": ["Smith Co"]})
+        
+        assert PII_Redactor().redact("Jane Smith Co", entities) == "[EMPLOYEE_REDACTED] Co"
+        assert PII_Redactor().redact("Jane Doe", entities) == "[EMPLOYEE_REDACTED] Doe"
+    
+    def test_matches_names_that_share_suffixes(self):
+        """Test that failure links find names starting inside a partial match"""
+        entities = EntityRedactor({"employee": ["Ann Lee Park", "Lee Chan"]})
+        
+        assert PII_Redactor().redact("Ann Lee Chan", entities) == "Ann [EMPLOYEE_REDACTED]"
+    
+    def test_ignores_one_character_names(self):
+        """Test that single characters are not added to the dictionary"""
+        entities = EntityRedactor({"employee": ["A", " ", "Al"]})
+        
+        assert entities.size == 1
+        assert PII_Redactor().redact("A plan by Al", entities) == "A plan by [EMPLOYEE_REDACTED]"
+    
+    def test_dictionary_is_built_once_per_tenant(self):
+        """Test that the compiled automaton is cached until the names change"""
+        first = get_entity_redactor("Test Corp", {"employee": ["Jane Smith"], "vendor": []})
+        
+        assert get_entity_redactor("test corp ", {"employee": [" Jane Smith"], "vendor": []}) is first
+        assert get_entity_redactor("Test Corp", {"employee": ["Jane Smith", "Bob"]}) is not first
+        assert get_entity_redactor("Test Corp", {"employee": [], "vendor": [""]}) is None
@@ -0,0 +1,123 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from fastapi.testclient import TestClient
+from app.api.dependencies import get_health_monitor
+from app.core.health_monitor import HealthMonitor
+
+
+@pytest.fixture
+def vector_db():
+    vector_db = MagicMock()
+    vector_db.connect.return_value = MagicMock(total_vector_count=1234)
+    return vector_db
+
+
+@pytest.fixture
+def openai_client():
+    client = MagicMock()
+    client.models.list = AsyncMock(return_value=[])
+    return client
+
+
+class TestHealthMonitor:
+    """Test background dependency probes"""
+    
+    @pytest.mark.asyncio
+    async def test_refresh_probes_every_dependency(self, vector_db, openai_client):
+        """Test that a refresh records each dependency and the vector count"""
+        monitor = HealthMonitor(vector_db, lambda: openai_client, interval=60, timeout=1)
+        assert monitor.snapshot().status == "starting"
+        
+        snapshot = (await monitor.refresh()).to_dict()
+        
+        assert snapshot["status"] == "healthy"
+        assert snapshot["total_vectors"] == 1234
+        assert set(snapshot["checks"]) == {"vector_db", "openai"}
+        assert 0 <= snapshot["age_seconds"] < 1
+    
+    @pytest.mark.asyncio
+    async def test_failing_or_slow_dependency_is_unhealthy(self, vector_db, openai_client):
+        """Test that errors and timeouts are reported per check"""
+        vector_db.connect.side_effect = lambda: time.sleep(0.3)
+        openai_client.models.list = AsyncMock(side_effect=ConnectionError("no route to host"))
+        monitor = HealthMonitor(vector_db, lambda: openai_client, interval=60, timeout=0.05)
+        
+        snapshot = (await monitor.refresh()).to_dict()
+        
+        assert snapshot["status"] == "unhealthy"
+        assert "timed out" in snapshot["checks"]["vector_db"]["error"]
+        assert "no route" in snapshot["checks"]["openai"]["error"]
+        assert snapshot["total_vectors"] is None
+    
+    @pytest.mark.asyncio
+    async def test_hung_probe_is_not_started_again(self, vector_db):
+        """Test that a refresh skips the vector DB while the timed-out call still runs"""
+        vector_db.connect.side_effect = lambda: time.sleep(0.3)
+        monitor = HealthMonitor(vector_db, interval=60, timeout=0.05)
+        
+        await monitor.refresh()
+        second = (await monitor.refresh()).to_dict()
+        
+        assert vector_db.connect.call_count == 1
+        assert "still running" in second["checks"]["vector_db"]["error"]
+        
+        await asyncio.sleep(0.3)
+        vector_db.connect.side_effect = None
+        third = (await monitor.refresh()).to_dict()
+        
+        assert vector_db.connect.call_count == 2
+        assert third["status"] == "healthy"
+    
+    @pytest.mark.asyncio
+    async def test_background_task_refreshes_on_interval(self, vector_db):
+        """Test that start() keeps the snapshot fresh until stop()"""
+        monitor = HealthMonitor(vector_db, interval=0.02, timeout=1)
+        
+        monitor.start()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+        calls = vector_db.connect.call_count
+        await asyncio.sleep(0.05)
+        
+        assert calls >= 3
+        assert vector_db.connect.call_count == calls
+        assert monitor.snapshot().status == "healthy"
+
+
+class TestHealthEndpoint:
+    """Test the gap-analysis health endpoint"""
+    
+    def test_endpoint_serves_cached_snapshot(self, vector_db):
+        """Test that polling the endpoint never probes the vector DB"""
+        from app.main import app
+        monitor = HealthMonitor(vector_db, interval=60, timeout=1)
+        asyncio.run(monitor.refresh())
+        
+        app.dependency_overrides[get_health_monitor] = lambda: monitor
+        try:
+            client = TestClient(app)
+            responses = [client.get("/api/v1/gap-analysis/health") for _ in range(20)]
+        finally:
+            app.dependency_overrides.clear()
+        
+        assert vector_db.connect.call_count == 1
+        body = responses[-1].json()
+        assert responses[-1].status_code == 200
+        assert body["vector_db_status"] == "connected"
+        assert body["total_vectors"] == 1234
+        assert body["age_seconds"] >= 0
+    
+    def test_endpoint_is_unavailable_before_first_refresh(self, vector_db):
+        """Test that a monitor without results answers 503"""
+        from app.main import app
+        app.dependency_overrides[get_health_monitor] = lambda: HealthMonitor(vector_db)
+        try:
+            response = TestClient(app).get("/api/v1/gap-analysis/health")
+        finally:
+            app.dependency_overrides.clear()
+        
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+        assert response.json()["age_seconds"] is None
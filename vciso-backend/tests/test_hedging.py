@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+from unittest.mock import Mock
+from app.core.hedging import LatencyTracker, hedged
+
+
+class TestLatencyTracker:
+    """Test LatencyTracker"""
+    
+    def test_percentile_needs_min_samples(self):
+        """Test that no percentile is reported until enough samples exist"""
+        tracker = LatencyTracker(min_samples=3)
+        tracker.record(1.0)
+        tracker.record(2.0)
+        assert tracker.percentile(95) is None
+        tracker.record(3.0)
+        assert tracker.percentile(95) == 3.0
+    
+    def test_nearest_rank_percentile(self):
+        """Test percentile values over a window"""
+        tracker = LatencyTracker(min_samples=1)
+        for value in range(1, 101):
+            tracker.record(float(value))
+        assert tracker.percentile(50) == 50.0
+        assert tracker.percentile(95) == 95.0
+        assert tracker.percentile(100) == 100.0
+
+
+class TestHedged:
+    """Test hedged()"""
+    
+    @pytest.mark.asyncio
+    async def test_fast_call_is_not_hedged(self):
+        """Test that a call finishing before the delay runs once"""
+        calls = []
+        
+        async def leg():
+            calls.append(1)
+            return "ok"
+        
+        result, was_hedged = await hedged(leg, delay=1.0)
+        assert (result, was_hedged) == ("ok", False)
+        assert len(calls) == 1
+    
+    @pytest.mark.asyncio
+    async def test_slow_call_is_hedged_and_loser_cancelled(self):
+        """Test that a duplicate wins over a stalled first leg, which is cancelled"""
+        delays = [10.0, 0.01]
+        cancelled = Mock()
+        tracker = LatencyTracker(min_samples=1)
+        
+        async def leg():
+            delay = delays.pop(0)
+            await asyncio.sleep(delay)
+            return delay
+        
+        result, was_hedged = await hedged(leg, delay=0.02, tracker=tracker, on_cancelled=cancelled)
+        
+        assert (result, was_hedged) == (0.01, True)
+        cancelled.assert_called_once()
+        await asyncio.sleep(0)
+        assert len(tracker) == 2
+    
+    @pytest.mark.asyncio
+    async def test_failed_leg_falls_back_to_other(self):
+        """Test that an error in one leg does not fail the call if the other succeeds"""
+        outcomes = ["slow-error", "ok"]
+        
+        async def leg():
+            outcome = outcomes.pop(0)
+            if outcome == "slow-error":
+                await asyncio.sleep(0.05)
+                raise RuntimeError("upstream error")
+            await asyncio.sleep(0.1)
+            return outcome
+        
+        result, was_hedged = await hedged(leg, delay=0.01)
+        assert (result, was_hedged) == ("ok", True)
+    
+    @pytest.mark.asyncio
+    async def test_should_hedge_can_veto(self):
+        """Test that no duplicate is sent when should_hedge returns False"""
+        calls = []
+        
+        async def leg():
+            calls.append(1)
+            await asyncio.sleep(0.03)
+            return "ok"
+        
+        result, was_hedged = await hedged(leg, delay=0.01, should_hedge=lambda: False)
+        assert (result, was_hedged) == ("ok", False)
+        assert len(calls) == 1
+    
+    @pytest.mark.asyncio
+    async def test_caller_cancelled_before_delay_is_not_hedge_waste(self):
+        """Test that cancelling the caller before a hedge is sent cancels the only leg uncharged"""
+        cancelled = Mock()
+        started = asyncio.Event()
+        
+        async def leg():
+            started.set()
+            await asyncio.sleep(10.0)
+        
+        call = asyncio.ensure_future(hedged(leg, delay=5.0, on_cancelled=cancelled))
+        await started.wait()
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        
+        cancelled.assert_not_called()
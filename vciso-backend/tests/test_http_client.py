@@ -0,0 +1,52 @@
+import pytest
+from unittest.mock import patch
+from app.core import http_client
+from app.core.http_client import close_http_clients, get_http_client, get_openai_client
+
+
+class TestSharedHttpClient:
+    """Test the shared connection pool"""
+    
+    @pytest.mark.asyncio
+    async def test_clients_are_shared(self):
+        """Test that every caller gets the same pool and OpenAI client"""
+        try:
+            assert get_http_client() is get_http_client()
+            openai_client = get_openai_client()
+            assert openai_client is get_openai_client()
+            assert openai_client.max_retries == 0
+        finally:
+            await close_http_clients()
+    
+    @pytest.mark.asyncio
+    async def test_pool_settings(self):
+        """Test that timeouts come from settings"""
+        with patch.object(http_client.settings, "HTTP_CONNECT_TIMEOUT", 1.5), \
+             patch.object(http_client.settings, "HTTP_POOL_TIMEOUT", 2.5):
+            try:
+                timeout = get_http_client().timeout
+                assert timeout.connect == 1.5
+                assert timeout.pool == 2.5
+            finally:
+                await close_http_clients()
+    
+    @pytest.mark.asyncio
+    async def test_close_then_recreate(self):
+        """Test that closing is idempotent and a new pool is built afterwards"""
+        first = get_http_client()
+        await close_http_clients()
+        await close_http_clients()
+        assert first.is_closed
+        
+        second = get_http_client()
+        assert second is not first and not second.is_closed
+        await close_http_clients()
+    
+    @pytest.mark.asyncio
+    async def test_base_url_override(self):
+        """Test that OPENAI_BASE_URL points the client elsewhere (e.g. the stand-in server)"""
+        with patch.object(http_client.settings, "OPENAI_BASE_URL", "http://127.0.0.1:8100/v1"):
+            try:
+                assert str(get_openai_client().base_url) == "http://127.0.0.1:8100/v1/"
+            finally:
+                await close_http_clients()
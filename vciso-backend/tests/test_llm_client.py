@@ -0,0 +1,244 @@
+import pytest
+from unittest.mock import Mock
+from app.core.llm_client import OpenAIClient
+
+
+class TestUsageAccounting:
+    """Test cost estimates with prompt caching"""
+    
+    @pytest.fixture
+    def client(self):
+        client = OpenAIClient()
+        client.model = "gpt-4o"
+        return client
+    
+    def test_cached_tokens_billed_at_discount(self, client):
+        """Test that cached input tokens cost half for GPT-4o"""
+        full = client._estimate_cost(1_000_000, 0)
+        cached = client._estimate_cost(1_000_000, 0, cached_tokens=1_000_000)
+        assert full == pytest.approx(2.50)
+        assert cached == pytest.approx(1.25)
+    
+    def test_log_usage_reports_cached_tokens(self, client, caplog):
+        """Test that _log_usage records cached tokens and the effective cost"""
+        usage = Mock(
+            prompt_tokens=2000,
+            completion_tokens=500,
+            total_tokens=2500,
+            prompt_tokens_details=Mock(cached_tokens=1536)
+        )
+        with caplog.at_level("INFO", logger="app.core.llm_client"):
+            client._log_usage(usage)
+        
+        assert "cached: 1536" in caplog.text
+        assert "Cost: $0.0081" in caplog.text
+        assert "without cache: $0.0100" in caplog.text
+    
+    def test_log_usage_without_details(self, client, caplog):
+        """Test usage objects that carry no prompt token details"""
+        usage = Mock(prompt_tokens=100, completion_tokens=10, total_tokens=110, prompt_tokens_details=None)
+        with caplog.at_level("INFO", logger="app.core.llm_client"):
+            client._log_usage(usage)
+        assert "cached: 0" in caplog.text
+    
+    def test_log_usage_records_metrics(self, client):
+        """Test that tokens and cost are recorded per model and call site"""
+        from app.core.metrics import LLM_COST, LLM_TOKENS
+        
+        labels = {"endpoint": "none", "model": "gpt-4o", "call_site": "metrics_test"}
+        usage = Mock(
+            prompt_tokens=1000,
+            completion_tokens=100,
+            total_tokens=1100,
+            prompt_tokens_details=Mock(cached_tokens=0)
+        )
+        client._log_usage(usage, call_site="metrics_test")
+        
+        assert LLM_TOKENS.value(direction="input", **labels) == 1000
+        assert LLM_TOKENS.value(direction="output", **labels) == 100
+        assert LLM_COST.value(**labels) == pytest.approx(0.0035)
+    
+    def test_pricing_is_configurable(self, client):
+        """Test that MODEL_PRICING overrides the default price table"""
+        from unittest.mock import patch
+        
+        with patch('app.core.pricing.settings.MODEL_PRICING', {"gpt-4o": {"input": 1.0, "output": 2.0}}):
+            assert client._estimate_cost(1_000_000, 1_000_000) == pytest.approx(3.0)
+            # No cached_input price given: cached tokens cost the input rate
+            assert client._estimate_cost(1_000_000, 0, cached_tokens=1_000_000) == pytest.approx(1.0)
+
+
+class TestModelRouting:
+    """Test task profiles and escalation, against the stand-in server"""
+    
+    @pytest.fixture
+    def client(self):
+        import httpx
+        from openai import AsyncOpenAI
+        from app.scripts.stand_in_server import create_app
+        
+        client = OpenAIClient()
+        client.client = AsyncOpenAI(
+            api_key="sk-test",
+            base_url="http://stand-in/v1",
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(seed_index=False))),
+        )
+        return client
+    
+    def test_profiles_come_from_settings(self):
+        """Test that each task reads its own model, max_tokens and temperature"""
+        from unittest.mock import patch
+        from app.core.task_profiles import get_task_profile
+        
+        with patch('app.core.task_profiles.settings.OPENAI_CLASSIFY_MODEL', "tiny-model"):
+            profile = get_task_profile("classify")
+        assert profile.model == "tiny-model"
+        assert profile.max_tokens <= 10 and profile.temperature == 0
+        with pytest.raises(ValueError):
+            get_task_profile("translate")
+    
+    @pytest.mark.asyncio
+    async def test_task_uses_profile_model(self, client):
+        """Test that a call goes to its task's model and is labelled with it"""
+        from unittest.mock import patch
+        from app.core.metrics import LLM_REQUESTS
+        
+        labels = {"endpoint": "none", "call_site": "routing_test", "outcome": "success"}
+        with patch('app.core.task_profiles.settings.OPENAI_SUMMARIZE_MODEL', "small-model"):
+            text = await client.complete("summarize", "Summarize.", "Some text", call_site="routing_test")
+        
+        assert text
+        assert LLM_REQUESTS.value(model="small-model", **labels) == 1
+        assert LLM_REQUESTS.value(model="gpt-4o", **labels) == 0
+    
+    @pytest.mark.asyncio
+    async def test_invalid_output_escalates(self, client):
+        """Test that output failing validation is retried once on the escalation model"""
+        from unittest.mock import patch
+        from app.core.metrics import LLM_ESCALATIONS, LLM_REQUESTS
+        
+        seen = []
+        
+        def validate(text):
+            seen.append(text)
+            raise ValueError("not JSON")
+        
+        with patch('app.core.task_profiles.settings.OPENAI_SUMMARIZE_MODEL', "small-model"), \
+             patch('app.core.llm_client.settings.OPENAI_ESCALATION_MODEL', "large-model"):
+            text = await client.complete("summarize", "Summarize.", "Text", validate=validate, call_site="escalation_test")
+        
+        assert len(seen) == 1  # The escalated output is returned without a second check
+        assert text
+        labels = {"endpoint": "none", "call_site": "escalation_test", "outcome": "success"}
+        assert LLM_REQUESTS.value(model="small-model", **labels) == 1
+        assert LLM_REQUESTS.value(model="large-model", **labels) == 1
+        assert LLM_ESCALATIONS.value(
+            call_site="escalation_test", model="small-model", escalation_model="large-model"
+        ) == 1
+    
+    @pytest.mark.asyncio
+    async def test_valid_output_is_not_escalated(self, client):
+        """Test that gap JSON from the small model is accepted as is"""
+        import json
+        from app.core.metrics import LLM_REQUESTS
+        from app.services.gap_analyzer import GAP_ANALYSIS_SYSTEM_PROMPT
+        
+        text = await client.complete(
+            "gap_section",
+            GAP_ANALYSIS_SYSTEM_PROMPT,
+            "**Section: Communication Plan**\n\n**Current Plan Content:**\nTell the owner.",
+            validate=json.loads,
+            call_site="no_escalation_test"
+        )
+        
+        assert json.loads(text)["gaps"]
+        assert sum(
+            entry["value"] for entry in LLM_REQUESTS.snapshot()
+            if entry["labels"]["call_site"] == "no_escalation_test"
+        ) == 1
+
+
+class TestRateLimits:
+    """Test per-model rate limiting"""
+    
+    def test_models_have_separate_limits(self):
+        """Test that a model's exhausted quota does not throttle another model"""
+        from unittest.mock import patch
+        from app.core import rate_limiter
+        
+        client = OpenAIClient()
+        limits = {
+            "limit-test-large": {"rpm": 60, "tpm": 1000},
+            "limit-test-small": {"rpm": 600, "tpm": 200000},
+        }
+        with patch.dict(rate_limiter._limiters, clear=True), \
+             patch('app.core.llm_client.settings.OPENAI_MODEL_RATE_LIMITS', limits):
+            large = client._rate_limiter("limit-test-large")
+            small = client._rate_limiter("limit-test-small")
+            large.tokens.consume(large.tokens.capacity + 5000)
+            
+            assert large is not small
+            assert large.would_wait(500)
+            assert not small.would_wait(500)
+            assert small.tokens.rate == pytest.approx(200000 * 0.9 / 60)
+    
+    def test_unlisted_models_are_unlimited_by_default(self):
+        """Test that models without a configured quota are not throttled"""
+        from unittest.mock import patch
+        from app.core import rate_limiter
+        
+        with patch.dict(rate_limiter._limiters, clear=True):
+            limiter = OpenAIClient()._rate_limiter("limit-test-unlisted")
+        
+        assert limiter.requests is None and limiter.tokens is None
+        assert not limiter.would_wait(1_000_000)
+
+
+class TestHedgeWaste:
+    """Test the cost recorded for cancelled hedge legs"""
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("hedge_queued,charged", [(True, 0), (False, 1)])
+    async def test_only_sent_legs_are_charged(self, hedge_queued, charged):
+        """Test that a losing leg still waiting in the rate limiter is not counted as hedge waste"""
+        import asyncio
+        from unittest.mock import AsyncMock, patch
+        from app.core.metrics import LLM_REQUESTS
+        from app.core.task_profiles import get_task_profile
+        
+        call_site = f"hedge_waste_test_{hedge_queued}"
+        response = Mock(choices=[Mock(message=Mock(content="text"))], usage=None)
+        sent = []
+        
+        async def create(**kwargs):
+            sent.append(1)
+            await asyncio.sleep(0.05 if len(sent) == 1 else 10.0)  # the first leg wins
+            return Mock(parse=lambda: response)
+        
+        class QueueingLimiter:
+            calls = 0
+            
+            def would_wait(self, tokens):
+                return False
+            
+            async def call(self, request, tokens):
+                self.calls += 1
+                if hedge_queued and self.calls > 1:
+                    await asyncio.Event().wait()  # the hedge never gets quota
+                return await request()
+        
+        limiter = QueueingLimiter()
+        client = OpenAIClient()
+        client.client = Mock()
+        client.client.chat.completions.with_raw_response.create = AsyncMock(side_effect=create)
+        client._rate_limiter = lambda model: limiter
+        
+        with patch('app.core.llm_client.settings.OPENAI_HEDGE_DELAY_SECONDS', 0.01):
+            assert await client.complete("summarize", "Summarize.", "Text", hedge=True, call_site=call_site) == "text"
+        
+        assert limiter.calls == 2
+        assert len(sent) == (1 if hedge_queued else 2)
+        assert LLM_REQUESTS.value(
+            endpoint="none", model=get_task_profile("summarize").model, call_site=call_site, outcome="cancelled"
+        ) == charged
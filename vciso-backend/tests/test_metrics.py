@@ -0,0 +1,91 @@
+import pytest
+from app.core.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry:
+    """Test counters, histograms and rendering"""
+    
+    @pytest.fixture
+    def registry(self):
+        return MetricsRegistry()
+    
+    def test_counter_per_label_set(self, registry):
+        """Test that counters accumulate per label combination"""
+        tokens = registry.counter("tokens_total", "Tokens", ("model", "direction"))
+        tokens.inc(100, model="gpt-4o", direction="input")
+        tokens.inc(50, model="gpt-4o", direction="input")
+        tokens.inc(10, model="gpt-4o", direction="output")
+        
+        assert tokens.value(model="gpt-4o", direction="input") == 150
+        assert tokens.value(model="gpt-4o", direction="output") == 10
+    
+    def test_labels_must_match(self, registry):
+        """Test that missing or extra labels are rejected"""
+        counter = registry.counter("calls_total", "Calls", ("model",))
+        with pytest.raises(ValueError):
+            counter.inc(model="gpt-4o", call_site="plan")
+    
+    def test_register_is_idempotent(self, registry):
+        """Test that registering the same metric twice returns it"""
+        first = registry.counter("calls_total", "Calls", ("model",))
+        assert registry.counter("calls_total", "Calls", ("model",)) is first
+        with pytest.raises(ValueError):
+            registry.histogram("calls_total", "Calls", ("model",))
+    
+    def test_histogram_quantiles(self, registry):
+        """Test histogram counts and bucket-based quantile estimates"""
+        latency = registry.histogram("latency_seconds", "Latency", ("call_site",), buckets=(0.1, 1, 10))
+        for value in [0.05] * 90 + [5.0] * 10:
+            latency.observe(value, call_site="gap_section")
+        
+        assert latency.count(call_site="gap_section") == 100
+        assert latency.quantile(0.5, call_site="gap_section") == 0.1
+        assert latency.quantile(0.95, call_site="gap_section") == 10
+    
+    def test_render_prometheus(self, registry):
+        """Test the Prometheus text exposition format"""
+        registry.counter("cost_usd_total", "Cost", ("model",)).inc(0.25, model="gpt-4o")
+        latency = registry.histogram("latency_seconds", "Latency", ("model",), buckets=(1,))
+        latency.observe(0.5, model="gpt-4o")
+        latency.observe(2.0, model="gpt-4o")
+        
+        text = registry.render_prometheus()
+        
+        assert "# TYPE cost_usd_total counter" in text
+        assert 'cost_usd_total{model="gpt-4o"} 0.25' in text
+        assert 'latency_seconds_bucket{model="gpt-4o",le="1"} 1' in text
+        assert 'latency_seconds_bucket{model="gpt-4o",le="+Inf"} 2' in text
+        assert 'latency_seconds_count{model="gpt-4o"} 2' in text
+    
+    def test_quantile_beyond_last_bucket(self, registry):
+        """Test that overflow values report the highest finite bucket bound"""
+        latency = registry.histogram("latency_seconds", "Latency", (), buckets=(1, 10))
+        latency.observe(500.0)
+        assert latency.quantile(0.99) == 10
+
+
+class TestEndpointLabels:
+    """Test the endpoint label of request-scoped metrics"""
+    
+    def test_label_is_the_matched_route_template(self):
+        """Test that handlers and the request histogram see the route template, not the raw path"""
+        from unittest.mock import Mock
+        from fastapi.testclient import TestClient
+        from app.api.dependencies import get_plan_service
+        from app.core.metrics import HTTP_REQUEST_DURATION, current_endpoint
+        from app.main import app
+        
+        plan_service = Mock()
+        plan_service.cache_stats = lambda: {"endpoint": current_endpoint.get()}
+        app.dependency_overrides[get_plan_service] = lambda: plan_service
+        try:
+            client = TestClient(app)
+            stats = client.get("/api/v1/plans/cache/stats").json()
+            missing = client.get("/api/v1/plans/no-such-page")
+        finally:
+            app.dependency_overrides.clear()
+        
+        assert stats == {"endpoint": "/api/v1/plans/cache/stats"}
+        assert missing.status_code == 404
+        endpoints = {entry["labels"]["endpoint"] for entry in HTTP_REQUEST_DURATION.snapshot()}
+        assert {"/api/v1/plans/cache/stats", "unmatched"} <= endpoints
@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import patch
+from app.core.plan_cache import PlanCache, plan_cache_key
+from app.models.plan import OnboardingData, ToolsData, SecurityLead
+
+
+def make_data(**overrides):
+    fields = dict(
+        companyName="Test Corp",
+        employeeCount="10-50",
+        industry="tech",
+        tools=ToolsData(email=["Gmail"], storage=["Google Drive", "Dropbox"], communication=["Slack"]),
+        currentSecurity=["MFA", "Antivirus"],
+        mainConcerns=["Ransomware", "Phishing"],
+        securityLead=SecurityLead(type="owner")
+    )
+    fields.update(overrides)
+    return OnboardingData(**fields)
+
+
+class TestPlanCacheKey:
+    """Test plan_cache_key normalization"""
+    
+    def key(self, data, **overrides):
+        settings = dict(model="gpt-4o", temperature=0.7, prompt_version="1")
+        settings.update(overrides)
+        return plan_cache_key(data, **settings)
+    
+    def test_equivalent_submissions_share_key(self):
+        """Test that case, whitespace and list order do not change the key"""
+        other = make_data(
+            companyName="  test   CORP ",
+            tools=ToolsData(email=["gmail"], storage=["Dropbox", "google drive"], communication=["Slack"]),
+            currentSecurity=["Antivirus", "MFA"],
+            mainConcerns=["phishing", "Ransomware"]
+        )
+        assert self.key(make_data()) == self.key(other)
+    
+    def test_different_data_changes_key(self):
+        """Test that a real difference in onboarding data changes the key"""
+        assert self.key(make_data()) != self.key(make_data(industry="healthcare"))
+        assert self.key(make_data()) != self.key(make_data(mainConcerns=["Ransomware"]))
+    
+    def test_generation_settings_change_key(self):
+        """Test that model, temperature and prompt version are part of the key"""
+        data = make_data()
+        base = self.key(data)
+        assert base != self.key(data, model="gpt-4o-mini")
+        assert base != self.key(data, temperature=0.2)
+        assert base != self.key(data, prompt_version="2")
+
+
+class TestPlanCache:
+    """Test PlanCache"""
+    
+    def test_get_and_set(self):
+        """Test storing and retrieving a plan"""
+        cache = PlanCache()
+        assert cache.get("k") is None
+        cache.set("k", "# Plan")
+        assert cache.get("k") == "# Plan"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_evicts_least_recently_used(self):
+        """Test that the cache stays within max_entries"""
+        cache = PlanCache(max_entries=2)
+        cache.set("a", "A")
+        cache.set("b", "B")
+        cache.get("a")
+        cache.set("c", "C")
+        
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+        assert cache.get("c") == "C"
+    
+    def test_entries_expire(self):
+        """Test that entries are dropped after the TTL"""
+        cache = PlanCache(ttl_seconds=10)
+        with patch("app.core.plan_cache.time.monotonic", return_value=100.0):
+            cache.set("k", "# Plan")
+        with patch("app.core.plan_cache.time.monotonic", return_value=105.0):
+            assert cache.get("k") == "# Plan"
+        with patch("app.core.plan_cache.time.monotonic", return_value=111.0):
+            assert cache.get("k") is None
+        assert len(cache) == 0
@@ -0,0 +1,251 @@
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+from app.core.meta_prompting import MetaPromptEngine
+from app.core.plan_templates import LOCAL_SECTIONS, PlanTemplateEngine, SectionMerger
+from app.models.plan import OnboardingData, ToolsData, SecurityLead
+from app.scripts.stand_in_server import render_completion
+from app.services.plan_generator import PlanGeneratorService
+
+
+@pytest.fixture
+def sample_data():
+    return OnboardingData(
+        companyName="Test Corp",
+        employeeCount="10-50",
+        industry="healthcare",
+        tools=ToolsData(email=["Gmail"], storage=["Google Drive", "Gmail"], communication=["Slack"]),
+        currentSecurity=["MFA"],
+        mainConcerns=["Ransomware"],
+        securityLead=SecurityLead(type="dedicated", name="Jane Smith")
+    )
+
+
+def make_merger(local):
+    engine = MetaPromptEngine()
+    headings = {section: engine.section_heading(section) for section in engine.PLAN_SECTIONS}
+    return SectionMerger(engine.PLAN_SECTIONS, headings, local)
+
+
+def stand_in_llm(system_prompt, user_prompt, **kwargs):
+    return render_completion([
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ])
+
+
+class TestPlanTemplateEngine:
+    """Test local rendering of the deterministic sections"""
+    
+    def test_team_follows_security_lead(self, sample_data):
+        """Test that the team section names the dedicated lead and uses contact placeholders"""
+        engine = PlanTemplateEngine()
+        
+        team = engine.render_team(sample_data.securityLead)
+        
+        assert "**Incident Lead:** Jane Smith" in team
+        assert "[PHONE]" in team
+        assert "Not yet assigned" in engine.render_team(SecurityLead(type="none"))
+        assert "External IT consultant" in engine.render_team(SecurityLead(type="consultant"))
+    
+    def test_appendices_list_tools_and_industry_compliance(self, sample_data):
+        """Test vendor placeholders, tool inventory and the industry's compliance fragment"""
+        appendices = PlanTemplateEngine().render_appendices(sample_data)
+        
+        assert appendices.count("**Gmail Support:**") == 1
+        assert "| File Storage | Google Drive, Gmail | [Name] |" in appendices
+        assert "HIPAA" in appendices
+        assert "Test Corp's patients" in appendices
+    
+    def test_unknown_industry_uses_general_fragment(self, sample_data):
+        """Test that an unlisted industry falls back to the general requirements"""
+        data = sample_data.model_copy(update={"industry": "Agriculture"})
+        
+        compliance = PlanTemplateEngine().render_compliance(data)
+        
+        assert "State laws" in compliance
+        assert "HIPAA" not in compliance
+
+
+class TestSectionMerger:
+    """Test merging local sections into LLM Markdown"""
+    
+    LOCAL = {"Incident Response Team": "- Lead: Jane", "Appendices": "- Vendors"}
+    
+    def test_inserts_local_sections_in_outline_order(self):
+        """Test that local sections land before the next later heading and at the end"""
+        llm = "# Plan\n\n## 1. Executive Summary\nSummary\n\n## 3. Incident Classification\nLevels\n"
+        
+        merged = make_merger(self.LOCAL).merge(llm)
+        
+        assert merged == (
+            "# Plan\n\n## 1. Executive Summary\nSummary\n\n"
+            "## 2. Incident Response Team\n- Lead: Jane\n\n"
+            "## 3. Incident Classification\nLevels\n"
+            "## 7. Appendices\n- Vendors\n\n"
+        )
+    
+    def test_replaces_local_sections_written_by_llm(self):
+        """Test that a local section the LLM wrote anyway is dropped, subsections included"""
+        llm = "## 2. Incident Response Team\n### Roles\n- Someone\n## 3. Incident Classification\nLevels"
+        
+        merged = make_merger(self.LOCAL).merge(llm)
+        
+        assert "Someone" not in merged
+        assert merged.count("## 2. Incident Response Team") == 1
+        assert merged.endswith("Levels\n## 7. Appendices\n- Vendors\n\n")
+    
+    def test_chunked_feed_matches_merge(self):
+        """Test that feeding arbitrary chunks gives the same result as merging whole text"""
+        llm = "# Plan\n## 1. Executive Summary\nSummary\n## 2. Incident Response Team\n- Someone\n## 3. Incident Classification\nLevels"
+        
+        for size in range(1, 12):
+            merger = make_merger(self.LOCAL)
+            out = [merger.feed(llm[i:i + size]) for i in range(0, len(llm), size)]
+            assert "".join(out) + merger.close() == make_merger(self.LOCAL).merge(llm)
+
+
+class TestLocalSectionsInPlanGenerator:
+    """Test PlanGeneratorService with locally rendered sections"""
+    
+    @pytest.mark.asyncio
+    async def test_generate_merges_local_sections(self, sample_data):
+        """Test that the LLM is told to skip the local sections and the merge replaces them"""
+        async def plan(system_prompt, user_prompt, **kwargs):
+            return stand_in_llm(system_prompt, user_prompt)
+        
+        with patch('app.services.plan_generator.OpenAIClient') as mock_client_class:
+            mock_client = Mock()
+            mock_client.generate_plan = AsyncMock(side_effect=plan)
+            mock_client_class.return_value = mock_client
+            
+            service = PlanGeneratorService()
+            result = await service.generate(sample_data, use_cache=False)
+            
+            prompt = mock_client.generate_plan.await_args.kwargs["user_prompt"]
+            assert 'Do NOT write sections "## 2. Incident Response Team", "## 7. Appendices"' in prompt
+            assert result.markdown.count("## 2. Incident Response Team") == 1
+            assert "Security lead named in onboarding" not in result.markdown
+            assert "**Incident Lead:** Jane Smith" in result.markdown
+            assert "HIPAA" in result.markdown
+            assert service._missing_sections(result.markdown) == []
+    
+    @pytest.mark.asyncio
+    async def test_assembled_plan_names_the_lead_consistently(self, sample_data):
+        """Test that LLM sections and the local team section agree on the lead, while employees stay redacted"""
+        sample_data.employees = ["Bob Jones", "jane smith"]
+        
+        async def plan(system_prompt, user_prompt, **kwargs):
+            return stand_in_llm(system_prompt, user_prompt) + "\nJane Smith and Bob Jones approve containment.\n"
+        
+        with patch('app.services.plan_generator.OpenAIClient') as mock_client_class:
+            mock_client = Mock()
+            mock_client.generate_plan = AsyncMock(side_effect=plan)
+            mock_client_class.return_value = mock_client
+            
+            service = PlanGeneratorService()
+            result = await service.generate(sample_data, use_cache=False)
+        
+        assert "**Incident Lead:** Jane Smith" in result.markdown
+        assert "Jane Smith and [EMPLOYEE_REDACTED] approve containment." in result.markdown
+        assert "Bob Jones" not in result.markdown
+        assert result.markdown.count("[EMPLOYEE_REDACTED]") == 1
+    
+    @pytest.mark.asyncio
+    async def test_stream_matches_generate(self, sample_data):
+        """Test that streaming merges the local sections the same way as generate"""
+        from app.scripts.stand_in_server import render_plan
+        
+        text = render_plan(MetaPromptEngine().build_prompt(sample_data))
+        
+        async def chunks():
+            for i in range(0, len(text), 7):
+                yield text[i:i + 7]
+        
+        stream = chunks()
+        stream_obj = Mock()
+        stream_obj.__aiter__ = lambda self: stream
+        stream_obj.usage = None
+        
+        with patch('app.services.plan_generator.OpenAIClient') as mock_client_class:
+            mock_client = Mock()
+            mock_client.stream_plan = AsyncMock(return_value=stream_obj)
+            mock_client.generate_plan = AsyncMock(return_value=text)
+            mock_client_class.return_value = mock_client
+            
+            service = PlanGeneratorService()
+            events = [event async for event in service.generate_stream(sample_data, use_cache=False)]
+            streamed = "".join(payload["text"] for kind, payload in events if kind == "delta")
+            
+            whole = await service.generate(sample_data, use_cache=False)
+            assert streamed == whole.markdown
+    
+    @pytest.mark.asyncio
+    async def test_parallel_mode_skips_local_sections(self, sample_data):
+        """Test that parallel generation only calls the LLM for the reasoning sections"""
+        async def section(task, system_prompt, user_prompt, **kwargs):
+            return stand_in_llm(system_prompt, user_prompt)
+        
+        with patch('app.services.plan_generator.OpenAIClient') as mock_client_class, \
+             patch('app.services.plan_generator.settings.PLAN_PARALLEL_SECTIONS', True):
+            mock_client = Mock()
+            mock_client.complete = AsyncMock(side_effect=section)
+            mock_client_class.return_value = mock_client
+            
+            service = PlanGeneratorService()
+            result = await service.generate(sample_data, use_cache=False)
+            
+            assert mock_client.complete.await_count == 9 - len(LOCAL_SECTIONS)
+            assert "**Incident Lead:** Jane Smith" in result.markdown
+            assert service._missing_sections(result.markdown) == []
+    
+    @pytest.mark.asyncio
+    async def test_semantic_hit_renders_local_sections_for_target(self, sample_data):
+        """Test that a plan reused for another company gets that company's team and appendices"""
+        alpha = sample_data.model_copy(update={
+            "companyName": "Alpha Dental",
+            "securityLead": SecurityLead(type="dedicated", name="Alice Adams"),
+        })
+        beta = sample_data.model_copy(update={
+            "companyName": "Beta Clinic",
+            "tools": ToolsData(email=["Outlook"], storage=["OneDrive"], communication=["Teams"]),
+            "securityLead": SecurityLead(type="dedicated", name="Bob Brown"),
+        })
+        llm_text = "\n".join([
+            "# Incident Response Plan for Alpha Dental",
+            "",
+            "## 1. Executive Summary",
+            "Alpha Dental keeps this plan current.",
+            "",
+            "## 5. Communication Plan",
+            "Notify staff by phone.",
+        ])
+        
+        # Lets the profiles differ in tools too: whatever the lookup lets through,
+        # the local sections must come from the target's own data
+        with patch('app.services.plan_generator.OpenAIClient') as mock_client_class, \
+             patch('app.services.plan_generator.EmbeddingService') as mock_embedding_class, \
+             patch('app.services.plan_generator.settings.PLAN_SEMANTIC_CACHE_ENABLED', True), \
+             patch('app.core.semantic_cache.SemanticPlanCache._same_segment', return_value=True):
+            mock_client = Mock()
+            mock_client.generate_plan = AsyncMock(return_value=llm_text)
+            mock_client_class.return_value = mock_client
+            mock_embeddings = Mock()
+            mock_embeddings.generate_embedding = AsyncMock(return_value=[0.6, 0.8])
+            mock_embedding_class.return_value = mock_embeddings
+            
+            service = PlanGeneratorService()
+            first = await service.generate(alpha)
+            second = await service.generate(beta)
+            streamed = [event async for event in service.generate_stream(beta)]
+        
+        assert mock_client.generate_plan.await_count == 1
+        assert second.metadata["cached"] is True
+        assert "**Incident Lead:** Alice Adams" in first.markdown
+        assert "| Email | Gmail | [Name] |" in first.markdown
+        
+        assert "Beta Clinic keeps this plan current." in second.markdown
+        assert "**Incident Lead:** Bob Brown" in second.markdown
+        assert "| Email | Outlook | [Name] |" in second.markdown
+        for leaked in ("Alice", "Alpha", "Gmail", "Google Drive", "Slack"):
+            assert leaked not in second.markdown
+        assert streamed[0] == ("delta", {"text": second.markdown})
@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from openai import RateLimitError
+from app.core.rate_limiter import (
+    RateLimiter,
+    TokenBucket,
+    estimate_chat_tokens,
+    parse_duration,
+)
+
+
+def rate_limit_error(headers=None):
+    response = Mock(status_code=429, headers=headers or {})
+    return RateLimitError("Rate limit reached", response=response, body=None)
+
+
+class TestHelpers:
+    """Test duration parsing and token estimates"""
+    
+    def test_parse_duration(self):
+        """Test OpenAI reset duration formats"""
+        assert parse_duration("1s") == 1.0
+        assert parse_duration("6m0s") == 360.0
+        assert parse_duration("20ms") == pytest.approx(0.02)
+        assert parse_duration("2") == 2.0
+        assert parse_duration(None) is None
+        assert parse_duration("soon") is None
+    
+    def test_chat_estimate_includes_max_tokens(self):
+        """Test that chat calls are charged prompt tokens plus max_tokens"""
+        messages = [{"role": "user", "content": "hello world"}]
+        assert estimate_chat_tokens(messages, 1000) > 1000
+
+
+class TestTokenBucket:
+    """Test TokenBucket"""
+    
+    def test_wait_time_and_refill(self):
+        """Test that an empty bucket waits for the refill rate"""
+        bucket = TokenBucket(per_minute=600, burst_seconds=1)  # 10/s, capacity 10
+        now = bucket.updated
+        assert bucket.wait_time(10, now) == 0
+        bucket.consume(10)
+        assert bucket.wait_time(5, now) == pytest.approx(0.5)
+        assert bucket.wait_time(5, now + 0.5) == 0
+    
+    def test_oversized_request_waits_for_full_bucket(self):
+        """Test that a request larger than capacity is admitted from a full bucket"""
+        bucket = TokenBucket(per_minute=600, burst_seconds=1)
+        now = bucket.updated
+        assert bucket.wait_time(50, now) == 0
+        bucket.consume(50)
+        assert bucket.level == -40
+    
+    def test_resync_only_lowers_level(self):
+        """Test that server headers never raise the local estimate"""
+        bucket = TokenBucket(per_minute=600, burst_seconds=1)
+        bucket.resync(3, bucket.updated)
+        assert bucket.level == 3
+        bucket.resync(100, bucket.updated)
+        assert bucket.level == 3
+
+
+class TestRateLimiter:
+    """Test RateLimiter"""
+    
+    @pytest.mark.asyncio
+    async def test_admits_callers_in_order(self):
+        """Test that queued callers are served first come, first served"""
+        limiter = RateLimiter("test", requests_per_minute=6000, tokens_per_minute=0, headroom=1.0, burst_seconds=0.01)
+        order = []
+        
+        async def caller(i):
+            await limiter.acquire(1)
+            order.append(i)
+        
+        await asyncio.gather(*(caller(i) for i in range(5)))
+        assert order == [0, 1, 2, 3, 4]
+    
+    @pytest.mark.asyncio
+    async def test_updates_from_headers(self):
+        """Test that remaining-token headers resync the bucket"""
+        limiter = RateLimiter("test", requests_per_minute=100, tokens_per_minute=10000)
+        raw = Mock(headers={"x-ratelimit-remaining-tokens": "42", "x-ratelimit-remaining-requests": "7"})
+        
+        result = await limiter.call(AsyncMock(return_value=raw), tokens=10)
+        
+        assert result is raw
+        assert limiter.tokens.level <= 42
+        assert limiter.requests.level <= 7
+    
+    @pytest.mark.asyncio
+    async def test_retries_after_rate_limit(self):
+        """Test that a 429 pauses the limiter for Retry-After and the call is retried"""
+        limiter = RateLimiter("test", requests_per_minute=0, tokens_per_minute=0)
+        raw = Mock(headers={})
+        request = AsyncMock(side_effect=[rate_limit_error({"retry-after-ms": "10"}), raw])
+        
+        result = await limiter.call(request, tokens=10)
+        
+        assert result is raw
+        assert request.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self):
+        """Test that persistent 429s are raised once retries are exhausted"""
+        limiter = RateLimiter("test", requests_per_minute=0, tokens_per_minute=0, max_retries=2)
+        request = AsyncMock(side_effect=rate_limit_error())
+        
+        with patch("app.core.rate_limiter.random.uniform", return_value=0):
+            with pytest.raises(RateLimitError):
+                await limiter.call(request, tokens=10)
+        assert request.await_count == 3
+    
+    def test_backoff_has_jitter_and_cap(self):
+        """Test exponential backoff bounds"""
+        limiter = RateLimiter("test", 0, 0, backoff_base=1.0, backoff_max=8.0)
+        delays = [limiter.backoff_delay(10) for _ in range(50)]
+        assert all(0 <= d <= 8.0 for d in delays)
+        assert len(set(delays)) > 1
+        assert limiter.backoff_delay(0, {"retry-after": "3"}) == 3.0
+    
+    def test_would_wait(self):
+        """Test that would_wait reflects remaining token capacity"""
+        limiter = RateLimiter("test", requests_per_minute=0, tokens_per_minute=600, headroom=1.0, burst_seconds=1)
+        assert not limiter.would_wait(10)
+        limiter.tokens.consume(10)
+        assert limiter.would_wait(5)
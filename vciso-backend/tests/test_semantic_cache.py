@@ -0,0 +1,134 @@
+import pytest
+from app.core.semantic_cache import SemanticPlanCache, personalize_plan, plan_template, profile_fingerprint
+from app.models.plan import OnboardingData, ToolsData, SecurityLead
+
+
+def make_data(**overrides):
+    fields = dict(
+        companyName="Acme Dental",
+        employeeCount="10-50",
+        industry="healthcare",
+        tools=ToolsData(email=["Gmail"], storage=["Google Drive"], communication=["Slack"]),
+        currentSecurity=["MFA"],
+        mainConcerns=["Ransomware"],
+        securityLead=SecurityLead(type="dedicated", name="Jane Smith")
+    )
+    fields.update(overrides)
+    return OnboardingData(**fields)
+
+
+class TestFingerprint:
+    """Test profile_fingerprint"""
+    
+    def test_ignores_company_and_lead_names(self):
+        """Test that names do not affect the fingerprint"""
+        other = make_data(companyName="Bright Smiles", securityLead=SecurityLead(type="dedicated", name="Bob Lee"))
+        assert profile_fingerprint(make_data()) == profile_fingerprint(other)
+        assert "Acme" not in profile_fingerprint(make_data())
+    
+    def test_reflects_profile(self):
+        """Test that tools and concerns are part of the fingerprint"""
+        fingerprint = profile_fingerprint(make_data())
+        assert "Industry: healthcare" in fingerprint
+        assert "Communication: slack" in fingerprint
+        assert "Concerns: ransomware" in fingerprint
+        assert "Security lead: dedicated" in fingerprint
+
+
+class TestPersonalizePlan:
+    """Test plan_template and personalize_plan"""
+    
+    def test_substitutes_company_and_lead(self):
+        """Test that the source company and lead names are replaced"""
+        plan = "# Incident Response Plan for Acme Dental\n\nJane Smith leads Acme Dental's response."
+        target = make_data(companyName="Bright Smiles", securityLead=SecurityLead(type="dedicated", name="Bob Lee"))
+        
+        template = plan_template(plan, make_data())
+        
+        assert "Acme" not in template and "Jane" not in template
+        assert personalize_plan(template, target) == (
+            "# Incident Response Plan for Bright Smiles\n\nBob Lee leads Bright Smiles's response."
+        )
+    
+    def test_does_not_replace_inside_words(self):
+        """Test that only whole-name occurrences are replaced"""
+        source = make_data(companyName="Acme")
+        target = make_data(companyName="Zenith")
+        assert personalize_plan(plan_template("Acme uses Acmesoft", source), target) == "Zenith uses Acmesoft"
+    
+    def test_unnamed_target_lead_hides_source_lead(self):
+        """Test that the source lead's name is replaced even when the target named no lead"""
+        plan = "Escalate to Jane Smith. Jane Smith approves containment."
+        target = make_data(companyName="Bright Smiles", securityLead=SecurityLead(type="dedicated"))
+        
+        result = personalize_plan(plan_template(plan, make_data()), target)
+        
+        assert "Jane" not in result
+        assert result == "Escalate to the security lead. the security lead approves containment."
+    
+    @pytest.mark.parametrize("overrides,plan", [
+        ({"companyName": "Target"}, "# Incident Response Plan for Target\n\nAttackers target backups first."),
+        ({"companyName": "Response"}, "# Incident Response Plan for Response\n\n## 4. Response Procedures"),
+        ({"securityLead": SecurityLead(type="dedicated", name="Will")}, "Will approves. The team will restore."),
+    ])
+    def test_common_word_names_are_not_templated(self, overrides, plan):
+        """Test that a plan using a source name as an ordinary word is not reusable"""
+        assert plan_template(plan, make_data(**overrides)) is None
+    
+    def test_target_names_are_inserted_verbatim(self):
+        """Test that placeholders in the new company's names are not expanded again"""
+        target = make_data(companyName="{{security_lead}} Inc", securityLead=SecurityLead(type="dedicated", name="Bob Lee"))
+        template = plan_template("Acme Dental and Jane Smith", make_data())
+        
+        assert personalize_plan(template, target) == "{{security_lead}} Inc and Bob Lee"
+
+
+class TestSemanticPlanCache:
+    """Test SemanticPlanCache"""
+    
+    def test_returns_best_match_above_threshold(self):
+        """Test lookup by cosine similarity"""
+        cache = SemanticPlanCache(threshold=0.9)
+        cache.add(make_data(), [1.0, 0.0, 0.0], "# Plan A", generation_seconds=20.0)
+        cache.add(make_data(companyName="Other Co"), [0.0, 1.0, 0.0], "# Plan B", generation_seconds=20.0)
+        
+        entry, score = cache.lookup(make_data(companyName="New Co"), [0.99, 0.1, 0.0])
+        
+        assert entry.markdown == "# Plan A"
+        assert score > 0.9
+        assert cache.lookup(make_data(), [0.7, 0.7, 0.0]) is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_never_crosses_industry_or_lead_type(self):
+        """Test that profiles in another industry or lead type are not reused"""
+        cache = SemanticPlanCache(threshold=0.9)
+        cache.add(make_data(), [1.0, 0.0], "# Plan", generation_seconds=20.0)
+        
+        assert cache.lookup(make_data(industry="finance"), [1.0, 0.0]) is None
+        assert cache.lookup(make_data(securityLead=SecurityLead(type="owner")), [1.0, 0.0]) is None
+    
+    def test_never_crosses_tool_sets(self):
+        """Test that a plan naming other tools is not reused"""
+        cache = SemanticPlanCache(threshold=0.9)
+        cache.add(make_data(), [1.0, 0.0], "# Plan", generation_seconds=20.0)
+        
+        outlook = make_data(tools=ToolsData(email=["Outlook"], storage=["Google Drive"], communication=["Slack"]))
+        assert cache.lookup(outlook, [1.0, 0.0]) is None
+        respelled = make_data(tools=ToolsData(email=[" gmail "], storage=["Google Drive"], communication=["Slack"]))
+        assert cache.lookup(respelled, [1.0, 0.0]) is not None
+    
+    def test_plans_with_common_word_names_are_not_cached(self):
+        """Test that a plan whose company name is an ordinary word is never served to another company"""
+        cache = SemanticPlanCache(threshold=0.9)
+        cache.add(make_data(companyName="Target"), [1.0, 0.0], "Target is where attackers target", generation_seconds=20.0)
+        
+        assert len(cache) == 0
+        assert cache.lookup(make_data(companyName="Other Co"), [1.0, 0.0]) is None
+    
+    def test_bounded_size(self):
+        """Test that the oldest entries are dropped beyond max_entries"""
+        cache = SemanticPlanCache(max_entries=2)
+        for i in range(3):
+            cache.add(make_data(), [1.0, float(i)], f"# Plan {i}", generation_seconds=1.0)
+        assert len(cache) == 2
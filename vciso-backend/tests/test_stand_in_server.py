@@ -0,0 +1,229 @@
+import json
+import random
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from openai import AsyncOpenAI, RateLimitError
+from app.core.meta_prompting import MetaPromptEngine
+from app.models.gap_analysis import Gap
+from app.models.plan import OnboardingData, SecurityLead, ToolsData
+from app.scripts.stand_in_server import LatencyModel, StandInConfig, create_app, embed_text
+from app.services.gap_analyzer import GAP_ANALYSIS_SYSTEM_PROMPT, GapAnalyzer
+
+
+def make_data() -> OnboardingData:
+    return OnboardingData(
+        companyName="Acme Corporation",
+        employeeCount="51-200",
+        industry="healthcare",
+        tools=ToolsData(email=["Gmail"], storage=["Google Drive"], communication=["Slack"], crm=[]),
+        currentSecurity=["MFA"],
+        mainConcerns=["Ransomware", "Phishing attacks"],
+        securityLead=SecurityLead(type="dedicated", name="Jane Smith")
+    )
+
+
+def openai_client(app) -> AsyncOpenAI:
+    return AsyncOpenAI(
+        api_key="sk-test",
+        base_url="http://stand-in/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+    )
+
+
+class TestStandInOpenAI:
+    """Test the OpenAI endpoints of the stand-in server"""
+    
+    @pytest.mark.asyncio
+    async def test_models_endpoint_answers_health_probes(self):
+        """Test that the health monitor's OpenAI probe succeeds against the stand-in"""
+        client = openai_client(create_app(StandInConfig(error_rate=1.0)))
+        
+        models = await client.models.list()
+        
+        assert [model.id for model in models.data]
+    
+    @pytest.mark.asyncio
+    async def test_plan_completion(self):
+        """Test that plan prompts get a deterministic plan with every required section"""
+        engine = MetaPromptEngine()
+        client = openai_client(create_app())
+        messages = [
+            {"role": "system", "content": engine.system_prompt},
+            {"role": "user", "content": engine.build_prompt(make_data())},
+        ]
+        
+        first = await client.chat.completions.create(model="gpt-4o", messages=messages)
+        second = await client.chat.completions.create(model="gpt-4o", messages=messages)
+        
+        plan = first.choices[0].message.content
+        assert plan == second.choices[0].message.content
+        assert "# Incident Response Plan for Acme Corporation" in plan
+        for section in ["Executive Summary", "Incident Response Team", "Response Procedures", "Communication Plan"]:
+            assert section in plan
+        assert first.usage.completion_tokens > 0
+    
+    @pytest.mark.asyncio
+    async def test_streaming_matches_plain_completion(self):
+        """Test that streamed deltas add up to the plain completion and end with usage"""
+        engine = MetaPromptEngine()
+        client = openai_client(create_app())
+        messages = [
+            {"role": "system", "content": engine.system_prompt},
+            {"role": "user", "content": engine.build_prompt(make_data())},
+        ]
+        
+        plain = await client.chat.completions.create(model="gpt-4o", messages=messages)
+        stream = await client.chat.completions.create(
+            model="gpt-4o", messages=messages, stream=True, stream_options={"include_usage": True}
+        )
+        parts, usage = [], None
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            if chunk.usage:
+                usage = chunk.usage
+        
+        assert len(parts) > 1
+        assert "".join(parts) == plain.choices[0].message.content
+        assert usage.total_tokens == plain.usage.total_tokens
+    
+    def test_gap_json_parses_into_gaps(self):
+        """Test that gap-analysis prompts get JSON that GapAnalyzer's schema accepts"""
+        analyzer = GapAnalyzer.__new__(GapAnalyzer)  # prompt building needs no services
+        prompt = analyzer._build_gap_analysis_prompt(
+            section_name="Communication Plan",
+            section_content="- Tell the owner.",
+            framework_context='[1] CISA, Communication and Notification (Page 14) [Relevance: 0.80]:\n"..."\n'
+        )
+        client = TestClient(create_app())
+        
+        response = client.post("/v1/chat/completions", json={
+            "model": "gpt-4o",
+            "messages": [
+                {"role": "system", "content": GAP_ANALYSIS_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+        })
+        result = json.loads(response.json()["choices"][0]["message"]["content"])
+        
+        assert result["gaps"] and result["strengths"]
+        for gap_data in result["gaps"]:
+            gap = Gap(id="g", section="Communication Plan", **gap_data)
+            assert gap.framework_references == ["CISA, Communication and Notification"]
+    
+    @pytest.mark.asyncio
+    async def test_embeddings(self):
+        """Test that embeddings are deterministic unit vectors in either encoding"""
+        app = create_app()
+        client = openai_client(app)
+        
+        # The SDK requests base64 by default; the float form must decode to the same values
+        response = await client.embeddings.create(model="text-embedding-3-small", input=["ransomware", "phishing"])
+        floats = TestClient(app).post("/v1/embeddings", json={"input": "ransomware", "encoding_format": "float"})
+        
+        vector = response.data[0].embedding
+        assert len(vector) == 1536
+        assert vector == pytest.approx(floats.json()["data"][0]["embedding"], abs=1e-5)
+        assert sum(v * v for v in vector) == pytest.approx(1.0, abs=1e-4)
+        assert response.data[1].embedding != vector
+    
+    def test_related_texts_score_higher(self):
+        """Test that shared words raise similarity"""
+        query = embed_text("ransomware containment and recovery", 256)
+        related = embed_text("containment and recovery after ransomware", 256)
+        unrelated = embed_text("quarterly marketing newsletter", 256)
+        
+        assert query @ related > query @ unrelated
+
+
+class TestStandInPinecone:
+    """Test the Pinecone endpoints of the stand-in server"""
+    
+    def test_index_lifecycle(self):
+        """Test that created indexes are listed and described with the server as host"""
+        client = TestClient(create_app(seed_index=False), base_url="http://127.0.0.1:8100")
+        
+        created = client.post("/indexes", json={"name": "frameworks", "dimension": 8, "metric": "cosine"})
+        assert created.status_code == 201
+        assert client.post("/indexes", json={"name": "frameworks", "dimension": 8}).status_code == 409
+        
+        listed = client.get("/indexes").json()["indexes"]
+        assert [index["name"] for index in listed] == ["frameworks"]
+        assert listed[0]["host"] == "http://127.0.0.1:8100"
+        assert client.get("/indexes/missing").status_code == 404
+    
+    def test_upsert_query_filter_delete(self):
+        """Test upsert, filtered query and delete against the in-memory index"""
+        client = TestClient(create_app(seed_index=False))
+        client.post("/indexes", json={"name": "frameworks", "dimension": 3})
+        client.post("/vectors/upsert", json={"vectors": [
+            {"id": "a", "values": [1, 0, 0], "metadata": {"source": "NIST SP 800-61"}},
+            {"id": "b", "values": [0.9, 0.1, 0], "metadata": {"source": "CISA", "sources": ["CISA", "SANS"]}},
+        ]})
+        
+        result = client.post("/query", json={"vector": [1, 0, 0], "topK": 5, "includeMetadata": True}).json()
+        assert [m["id"] for m in result["matches"]] == ["a", "b"]
+        assert result["matches"][0]["score"] == pytest.approx(1.0)
+        
+        filtered = client.post("/query", json={
+            "vector": [1, 0, 0], "topK": 5,
+            "filter": {"$or": [{"source": "SANS"}, {"sources": {"$in": ["SANS"]}}]},
+        }).json()
+        assert [m["id"] for m in filtered["matches"]] == ["b"]
+        assert "metadata" not in filtered["matches"][0]
+        
+        client.post("/vectors/delete", json={"ids": ["a"]})
+        assert client.post("/describe_index_stats", json={}).json()["totalVectorCount"] == 1
+    
+    def test_seed_guidance_is_retrievable(self):
+        """Test that the seed passages answer a typical section query above the RAG threshold"""
+        client = TestClient(create_app())
+        query = embed_text("Communication Plan: internal notifications and external notifications", 1536)
+        
+        result = client.post("/query", json={"vector": query.tolist(), "topK": 1, "includeMetadata": True}).json()
+        
+        assert result["matches"][0]["metadata"]["section"] == "Communication and Notification"
+        assert result["matches"][0]["score"] >= 0.7
+
+
+class TestStandInFaults:
+    """Test latency models and fault injection"""
+    
+    def test_latency_specs(self):
+        """Test parsing and sampling of latency distributions"""
+        rng = random.Random(0)
+        assert LatencyModel.parse("fixed:0.25").sample(rng) == 0.25
+        assert 1 <= LatencyModel.parse("uniform:1:2").sample(rng) <= 2
+        samples = sorted(LatencyModel.parse("lognormal:2:0.5").sample(rng) for _ in range(2001))
+        assert samples[1000] == pytest.approx(2, rel=0.1)
+        with pytest.raises(ValueError):
+            LatencyModel.parse("normal:1")
+    
+    @pytest.mark.asyncio
+    async def test_injected_rate_limit(self):
+        """Test that injected 429s carry Retry-After headers the SDK surfaces"""
+        client = openai_client(create_app(StandInConfig(rate_limit_rate=1.0, retry_after_ms=250)))
+        
+        with pytest.raises(RateLimitError) as exc_info:
+            await client.embeddings.create(model="text-embedding-3-small", input="x")
+        
+        assert exc_info.value.response.headers["retry-after-ms"] == "250"
+    
+    def test_quota_and_runtime_config(self):
+        """Test the simulated RPM quota, runtime reconfiguration and stats"""
+        client = TestClient(create_app(StandInConfig(requests_per_minute=1)))
+        body = {"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}]}
+        
+        assert client.post("/v1/chat/completions", json=body).status_code == 200
+        assert client.post("/v1/chat/completions", json=body).status_code == 429
+        
+        config = client.put("/_stand_in/config", json={"requests_per_minute": 0, "error_rate": 1}).json()
+        assert config["error_rate"] == 1.0
+        assert client.post("/v1/chat/completions", json=body).status_code == 500
+        assert client.put("/_stand_in/config", json={"bogus": 1}).status_code == 400
+        
+        assert client.get("/_stand_in/stats").json() == {
+            "chat.requests": 3, "chat.429": 1, "chat.500": 1
+        }
@@ -0,0 +1,93 @@
+import pytest
+from app.core.task_profiles import TaskProfile
+from app.core.token_budget import (
+    TRUNCATION_MARKER,
+    TokenBudgetError,
+    completion_budget,
+    context_window,
+    truncate_to_tokens,
+)
+from app.core.tokenizer import count_tokens
+
+
+def profile(model="gpt-4o", max_tokens=4000, input_tokens=8000):
+    return TaskProfile(task="plan", model=model, max_tokens=max_tokens, temperature=0.7, input_tokens=input_tokens)
+
+
+class TestCompletionBudget:
+    """Test max_tokens chosen per call"""
+    
+    def test_context_window_matches_longest_prefix(self):
+        """Test that dated and unknown model names resolve to a window"""
+        assert context_window("gpt-4o-2024-08-06") == 128_000
+        assert context_window("gpt-4-0613") == 8_192
+        assert context_window("my-local-model") == 128_000
+    
+    def test_expected_output_lowers_max_tokens(self):
+        """Test that the expected output size caps max_tokens below the profile's"""
+        assert completion_budget(profile(), 500, expected_output_tokens=900) == 900
+        assert completion_budget(profile(), 500, expected_output_tokens=9000) == 4000
+        assert completion_budget(profile(), 500) == 4000
+    
+    def test_context_window_caps_max_tokens(self):
+        """Test that max_tokens never asks for more than the context window has left"""
+        assert completion_budget(profile(model="gpt-4", input_tokens=8000), 6000) == 8_192 - 6000
+    
+    def test_prompt_over_budget_is_refused(self):
+        """Test that an oversized prompt fails before it is sent"""
+        with pytest.raises(TokenBudgetError, match="over its budget"):
+            completion_budget(profile(input_tokens=1000), 1001)
+        with pytest.raises(TokenBudgetError, match="context window"):
+            completion_budget(profile(model="gpt-4", input_tokens=10_000), 8_100)
+
+
+class TestTruncateToTokens:
+    """Test trimming text to a token budget"""
+    
+    def test_short_text_is_unchanged(self):
+        """Test that text within budget is returned as is"""
+        assert truncate_to_tokens("Short text.", 100) == "Short text."
+    
+    def test_long_text_fits_budget(self):
+        """Test that long text is cut at a line break and marked"""
+        text = "\n".join(f"Line {i}: contain the affected systems quickly." for i in range(500))
+        
+        trimmed = truncate_to_tokens(text, 200)
+        
+        assert count_tokens(trimmed) <= 200
+        assert trimmed.endswith(TRUNCATION_MARKER)
+        assert trimmed[:-len(TRUNCATION_MARKER)].endswith("quickly.")
+        assert text.startswith(trimmed[:-len(TRUNCATION_MARKER)])
+
+
+class TestClientMaxTokens:
+    """Test that OpenAIClient sends the computed max_tokens"""
+    
+    @pytest.mark.asyncio
+    async def test_expected_output_sets_request_max_tokens(self):
+        """Test that expected_output_tokens reaches the API request"""
+        import json
+        import httpx
+        from openai import AsyncOpenAI
+        from app.core.llm_client import OpenAIClient
+        from app.scripts.stand_in_server import create_app
+        
+        bodies = []
+        
+        async def capture(request):
+            bodies.append(json.loads(request.content))
+        
+        client = OpenAIClient()
+        client.client = AsyncOpenAI(
+            api_key="sk-test",
+            base_url="http://stand-in/v1",
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=create_app(seed_index=False)),
+                event_hooks={"request": [capture]},
+            ),
+        )
+        
+        await client.complete("summarize", "Summarize.", "Some text", expected_output_tokens=120)
+        
+        assert bodies[0]["max_tokens"] == 120
@@ -0,0 +1,67 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from app.core.vector_db import VectorDBService
+
+
+@pytest.fixture
+def vector_db():
+    with patch('app.core.vector_db.Pinecone') as mock_pinecone_class:
+        mock_pinecone_class.return_value.list_indexes.return_value = []
+        service = VectorDBService()
+    service.index = MagicMock()
+    return service
+
+
+def make_vector(idx: int, dimension: int = 8, text: str = "chunk"):
+    return {"id": f"vec-{idx}", "values": [0.1] * dimension, "metadata": {"text": text}}
+
+
+class TestVectorBatching:
+    """Test size-aware upsert batching"""
+    
+    def test_batches_respect_vector_limit(self, vector_db):
+        """Test that no batch exceeds the max vector count"""
+        vector_db.max_batch_vectors = 10
+        batches = list(vector_db.batch_vectors([make_vector(i) for i in range(25)]))
+        assert [len(b) for b in batches] == [10, 10, 5]
+    
+    def test_batches_respect_byte_limit(self, vector_db):
+        """Test that large vectors are split by estimated request size"""
+        vectors = [make_vector(i, text="x" * 1000) for i in range(10)]
+        vector_bytes = vector_db.estimate_vector_bytes(vectors[0])
+        vector_db.max_batch_bytes = vector_bytes * 3
+        batches = list(vector_db.batch_vectors(vectors))
+        assert all(len(b) <= 3 for b in batches)
+        assert sum(len(b) for b in batches) == 10
+    
+    @pytest.mark.asyncio
+    async def test_upsert_sends_every_batch(self, vector_db):
+        """Test that upsert_vectors sends all batches"""
+        vector_db.max_batch_vectors = 4
+        await vector_db.upsert_vectors([make_vector(i) for i in range(10)])
+        sent = [v["id"] for call in vector_db.index.upsert.call_args_list for v in call.kwargs["vectors"]]
+        assert sorted(sent) == sorted(f"vec-{i}" for i in range(10))
+        assert vector_db.index.upsert.call_count == 3
+
+
+class TestVectorQuery:
+    """Test queries against the synchronous Pinecone client"""
+    
+    @pytest.mark.asyncio
+    async def test_query_runs_off_the_event_loop(self, vector_db):
+        """Test that the blocking query call (and lazy index setup) runs in a worker thread"""
+        import threading
+        
+        loop_thread = threading.current_thread()
+        query_threads = []
+        
+        def query(**kwargs):
+            query_threads.append(threading.current_thread())
+            return MagicMock(matches=[MagicMock(id="a", score=0.9, metadata={"text": "t"})])
+        
+        vector_db.index.query.side_effect = query
+        
+        results = await vector_db.query([0.1] * 8, top_k=1)
+        
+        assert results == [{"id": "a", "score": 0.9, "metadata": {"text": "t"}}]
+        assert query_threads and query_threads[0] is not loop_thread